@@ -0,0 +1,378 @@
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import argparse
+from django.conf import settings
+
+
+class DJFakerBenchmark(object):
+    """
+    Measures throughput of representative fakers (native values, simple,
+    lazy and unique replacers, hashed passwords, DEPENDS_ON chains) on a
+    synthetic table, with several write strategies, or of each builtin
+    replacer (micro-benchmark).
+
+    Results are appended to a JSON lines file, so that runs of different
+    versions can be compared.
+
+    Example usage:
+
+        >>> DJFakerBenchmark(rows=10000).run()
+    """
+    APPS = (
+        'django.contrib.contenttypes',
+        'django.contrib.auth',
+        'djfaker',
+        'djfaker.tests.benchapp',
+    )
+    ENGINES = {
+        'sqlite': 'django.db.backends.sqlite3',
+        'postgresql': 'django.db.backends.postgresql_psycopg2',
+    }
+    # name -> faker of djfaker.tests.benchapp.fakers
+    SCENARIOS = (
+        ('native', 'BenchNativeFaker'),
+        ('simple', 'BenchSimpleFaker'),
+        ('lazy', 'BenchLazyFaker'),
+        ('unique', 'BenchUniqueFaker'),
+        ('unique-lazy', 'BenchUniqueLazyFaker'),
+        ('password', 'BenchPasswordFaker'),
+        ('chain', 'BenchChainFaker'),
+    )
+    # name -> options of run_fakers()
+    STRATEGIES = {
+        'row': {},
+        'batch': {'batch_size': 1000},
+        'chunked': {'batch_size': 1000, 'chunk_size': 10000},
+        'pushdown': {'batch_size': 1000, 'pushdown': True},
+        'seeded': {'batch_size': 1000, 'seed': 'benchmark'},
+    }
+    # Companies created by person
+    COMPANY_RATIO = 10
+    INSERT_SIZE = 5000
+
+    def __init__(self, rows=10000, engine='sqlite', database=None,
+                 user='', password='', host='', port='', scenarios=None,
+                 strategies=('row', 'batch'), micro=False,
+                 iterations=10000, results='benchmarks.jsonl', label=None,
+                 compare=False, stdout=sys.stdout):
+        self.rows = rows
+        self.engine = engine
+        self.database = database
+        self.user, self.password = user, password
+        self.host, self.port = host, port
+        self.scenarios = [s for s in self.SCENARIOS
+                          if not scenarios or s[0] in scenarios]
+        self.strategies = strategies
+        self.micro = micro
+        self.iterations = iterations
+        self.results = results
+        self.label = label or self.get_version()
+        self.compare = compare
+        self.stdout = stdout
+        self.tmpdir = None
+
+    @staticmethod
+    def get_version():
+        """ Returns the git revision of djfaker, or 'unknown' """
+        try:
+            return subprocess.check_output(
+                ['git', 'describe', '--always', '--dirty'],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stderr=open(os.devnull, 'w')).strip()
+        except (OSError, subprocess.CalledProcessError):
+            return 'unknown'
+
+    def write(self, line=''):
+        self.stdout.write(line + '\n')
+
+    def configure(self):
+        """ Configures Django and creates tables of the benchmark """
+        name = self.database
+        if self.engine == 'sqlite' and not name:
+            self.tmpdir = tempfile.mkdtemp()
+            name = os.path.join(self.tmpdir, 'benchmark.db')
+        settings.configure(
+            DATABASES={
+                'default': {
+                    'ENGINE': self.ENGINES[self.engine],
+                    'NAME': name,
+                    'USER': self.user,
+                    'PASSWORD': self.password,
+                    'HOST': self.host,
+                    'PORT': self.port,
+                }
+            },
+            INSTALLED_APPS=self.APPS,
+        )
+        from django.core.management import call_command
+        call_command('syncdb', interactive=False, verbosity=0)
+
+    def populate(self):
+        """ Creates `rows` persons and their companies (existing ones are
+            deleted first)
+        """
+        from django.db import connection, transaction
+        from djfaker import data
+        from djfaker.tests.benchapp.models import BenchCompany, BenchPerson
+
+        cursor = connection.cursor()
+        for model in (BenchPerson, BenchCompany):
+            cursor.execute('DELETE FROM {0}'.format(
+                connection.ops.quote_name(model._meta.db_table)))
+        transaction.commit_unless_managed()
+
+        size = self.INSERT_SIZE
+        companies = max(1, self.rows // self.COMPANY_RATIO)
+        for start in xrange(0, companies, size):
+            BenchCompany.objects.bulk_create([
+                BenchCompany(name=data.COMPANIES[i % len(data.COMPANIES)],
+                             website='www.example.com')
+                for i in xrange(start, min(companies, start + size))
+            ])
+        company_ids = list(BenchCompany.objects.values_list('pk', flat=True))
+        firsts, lasts = data.FIRST_NAMES, data.LAST_NAMES
+        for start in xrange(0, self.rows, size):
+            BenchPerson.objects.bulk_create([
+                BenchPerson(company_id=company_ids[i % len(company_ids)],
+                            first_name=firsts[i % len(firsts)],
+                            last_name=lasts[i % len(lasts)],
+                            email='{0}@example.com'.format(i),
+                            username='user{0}'.format(i),
+                            password='!', phone='0000000000', serial='0')
+                for i in xrange(start, min(self.rows, start + size))
+            ])
+
+    def run_scenarios(self):
+        """ Runs each scenario with each write strategy. Returns a list of
+            results (one by faker run)
+        """
+        from djfaker.scheduler import run_fakers
+        from djfaker.tests.benchapp import fakers
+
+        bench_fakers = [getattr(fakers, name) for s, name in self.SCENARIOS]
+        bench_fakers.append(fakers.BenchCompanyFaker)
+        results = []
+        for strategy in self.strategies:
+            for scenario, name in self.scenarios:
+                for faker in bench_fakers:
+                    faker._ran = False
+                profiles = run_fakers([getattr(fakers, name)], no_dels=True,
+                                      profile=True,
+                                      **self.STRATEGIES[strategy])
+                for profile in profiles:
+                    rows = profile['rows']
+                    results.append({
+                        'scenario': scenario,
+                        'strategy': strategy,
+                        'faker': profile['faker'].rsplit('.', 1)[-1],
+                        'rows': rows,
+                        'rows_per_second': profile['rows_per_second'],
+                        'queries_per_row': (float(profile['queries']) / rows
+                                            if rows else 0.0),
+                        'peak_memory': profile['peak_memory'],
+                        'total': profile['total'],
+                        'phases': profile['phases'],
+                    })
+        return results
+
+    def get_replacers(self):
+        """ Returns (name, replacer) of builtin replacers """
+        from djfaker import data, replacers
+        from djfaker.pools import name_pool, number_suffixes
+
+        name = ['first_name', 'last_name']
+        return (
+            ('ChoiceReplacer', replacers.ChoiceReplacer(data.FIRST_NAMES)),
+            ('ChoiceUniqueReplacer', replacers.ChoiceUniqueReplacer(
+                pool=name_pool(number_suffixes(100)), with_shuffle=True)),
+            ('CompanyReplacer', replacers.CompanyReplacer()),
+            ('EmailReplacer', replacers.EmailReplacer()),
+            ('EmailReplacer(unique)', replacers.EmailReplacer(unique=True)),
+            ('PhoneReplacer', replacers.PhoneReplacer()),
+            ('MobileReplacer', replacers.MobileReplacer()),
+            ('SerialReplacer', replacers.SerialReplacer()),
+            ('LazyEmailReplacer', replacers.LazyEmailReplacer(name)),
+            ('LazyEmailReplacer(unique)',
+             replacers.LazyEmailReplacer(name, unique=True)),
+            ('LazyUsernameReplacer', replacers.LazyUsernameReplacer(name)),
+            ('LazyUsernameReplacer(unique)',
+             replacers.LazyUsernameReplacer(name, unique=True)),
+            ('LazyPasswordReplacer', replacers.LazyPasswordReplacer(name)),
+            ('LazyCompanyWebsiteReplacer',
+             replacers.LazyCompanyWebsiteReplacer(['last_name'])),
+            ('LazyCompanyEmailReplacer', replacers.LazyCompanyEmailReplacer(
+                ['first_name', 'last_name', 'phone'])),
+            ('TextReplacer', replacers.TextReplacer('{0} {1}', name)),
+        )
+
+    def run_micro(self):
+        """ Measures apply() and apply_many() of each builtin replacer.
+            Returns a list of results (microseconds by value)
+        """
+        from djfaker import data
+        from djfaker.replacers import SimpleReplacer
+        from djfaker.tests.benchapp.models import BenchPerson
+
+        n = self.iterations
+        firsts, lasts = data.FIRST_NAMES, data.LAST_NAMES
+        instances = [BenchPerson(first_name=firsts[i % len(firsts)],
+                                 last_name=lasts[i % len(lasts)],
+                                 phone=str(i)) for i in xrange(n)]
+        results = []
+        # Each method is measured on its own replacer : states and caches
+        # (e.g. hashed passwords) are not shared
+        for (name, replacer), (name, other) in zip(self.get_replacers(),
+                                                   self.get_replacers()):
+            simple = isinstance(replacer, SimpleReplacer)
+            start = time.time()
+            if simple:
+                for i in xrange(n):
+                    replacer.apply()
+            else:
+                for instance in instances:
+                    replacer.apply(instance)
+            applied = time.time() - start
+            start = time.time()
+            other.apply_many(n if simple else instances)
+            applied_many = time.time() - start
+            results.append({
+                'replacer': name,
+                'apply': applied * 1e6 / n,
+                'apply_many': applied_many * 1e6 / n,
+            })
+        return results
+
+    def report_scenarios(self, results, previous=None):
+        previous = dict(((r['scenario'], r['strategy'], r['faker']), r)
+                        for r in previous or [])
+        self.write('{0:<12} {1:<9} {2:<22} {3:>9} {4:>10} {5:>11} {6:>8}'
+                   '{7}'.format('Scenario', 'Strategy', 'Faker', 'Rows',
+                                'Rows/s', 'Queries/row', 'Peak MB',
+                                previous and '  Change' or ''))
+        for r in results:
+            change = ''
+            before = previous.get((r['scenario'], r['strategy'], r['faker']))
+            if before and before['rows_per_second']:
+                change = '  {0:+.1f}%'.format(
+                    100 * r['rows_per_second'] / before['rows_per_second']
+                    - 100)
+            self.write('{0:<12} {1:<9} {2:<22} {3:>9} {4:>10.1f} {5:>11.3f} '
+                       '{6:>8.1f}{7}'.format(
+                           r['scenario'], r['strategy'], r['faker'],
+                           r['rows'], r['rows_per_second'],
+                           r['queries_per_row'], r['peak_memory'] / 1024.0,
+                           change))
+
+    def report_micro(self, results, previous=None):
+        previous = dict((r['replacer'], r) for r in previous or [])
+        self.write('{0:<30} {1:>12} {2:>17}{3}'.format(
+            'Replacer', 'apply (us)', 'apply_many (us)',
+            previous and '  Change' or ''))
+        for r in results:
+            change = ''
+            before = previous.get(r['replacer'])
+            if before and r['apply']:
+                change = '  {0:+.1f}%'.format(
+                    100 * before['apply'] / r['apply'] - 100)
+            self.write('{0:<30} {1:>12.2f} {2:>17.2f}{3}'.format(
+                r['replacer'], r['apply'], r['apply_many'], change))
+
+    def load_previous(self, record):
+        """ Returns results of the last recorded run comparable to
+            `record`, or None
+        """
+        if not os.path.exists(self.results):
+            return None
+        keys = ('mode', 'engine', 'rows', 'iterations')
+        previous = None
+        with open(self.results) as results:
+            for line in results:
+                other = json.loads(line)
+                if all(other.get(k) == record.get(k) for k in keys):
+                    previous = other
+        return previous
+
+    def run(self):
+        import django
+        self.configure()
+        try:
+            record = {
+                'label': self.label,
+                'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'mode': self.micro and 'micro' or 'fakers',
+                'engine': self.engine,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            }
+            if self.micro:
+                record['iterations'] = self.iterations
+                record['results'] = self.run_micro()
+            else:
+                record['rows'] = self.rows
+                self.populate()
+                record['results'] = self.run_scenarios()
+
+            previous = self.compare and self.load_previous(record)
+            if previous:
+                self.write('Compared with {0} ({1})'.format(
+                    previous['label'], previous['date']))
+            report = self.micro and self.report_micro or self.report_scenarios
+            report(record['results'], previous and previous['results'])
+
+            if self.results:
+                with open(self.results, 'a') as results:
+                    results.write(json.dumps(record) + '\n')
+        finally:
+            if self.tmpdir:
+                shutil.rmtree(self.tmpdir)
+        return record
+
+if __name__ == '__main__':
+    """
+    What do when the user hits this file from the shell.
+
+    Example usage:
+
+        $ python benchmark.py --rows 100000 --strategies row batch pushdown
+        $ python benchmark.py --engine postgresql --database djfaker_bench
+        $ python benchmark.py --micro --compare
+
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark djfaker fakers, replacers and write "
+                    "strategies.")
+    parser.add_argument('--rows', type=int, default=10000,
+                        help='Number of persons to fake (10 by company)')
+    parser.add_argument('--engine', choices=sorted(DJFakerBenchmark.ENGINES),
+                        default='sqlite')
+    parser.add_argument('--database',
+                        help='Database name (a temporary SQLite file by '
+                             'default). Its benchmark tables are emptied')
+    parser.add_argument('--user', default='')
+    parser.add_argument('--password', default='')
+    parser.add_argument('--host', default='')
+    parser.add_argument('--port', default='')
+    parser.add_argument('--scenarios', nargs='+',
+                        choices=[s for s, f in DJFakerBenchmark.SCENARIOS],
+                        help='Scenarios to run (all by default)')
+    parser.add_argument('--strategies', nargs='+', default=['row', 'batch'],
+                        choices=sorted(DJFakerBenchmark.STRATEGIES),
+                        help='Write strategies of each scenario')
+    parser.add_argument('--micro', action='store_true',
+                        help='Measure apply() of each builtin replacer')
+    parser.add_argument('--iterations', type=int, default=10000,
+                        help='Values generated by replacer (--micro)')
+    parser.add_argument('--results', default='benchmarks.jsonl',
+                        help='JSON lines file recording runs')
+    parser.add_argument('--label',
+                        help='Name of the run (git revision by default)')
+    parser.add_argument('--compare', action='store_true',
+                        help='Compare with the last recorded run')
+    args = parser.parse_args()
+    DJFakerBenchmark(**vars(args)).run()
@@ -1,17 +1,69 @@
-from django.utils.importlib import import_module
-from django.core.exceptions import ValidationError, ImproperlyConfigured
+import time
+from itertools import islice
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, router
+from django.db.models import Min, Max
 
 from .exceptions import FakerUnicityError
-from .replacers import BaseReplacer, SimpleReplacer, LazyReplacer
-from .signals import pre_fake_model, post_fake_model
-from .settings import DJFAKER_MAX_TRIES
+from .plans import NATIVE, SIMPLE, LAZY, compile_plan
+from .signals import pre_fake_model, post_fake_model, fake_progress, \
+    post_fake_deletion
+from .settings import DJFAKER_MAX_TRIES, DJFAKER_BATCH_SIZE, \
+    DJFAKER_CHUNK_SIZE, DJFAKER_SEED, DJFAKER_FAST_DELETION, \
+    DJFAKER_DELETION_SIGNALS, DJFAKER_DELETION_CHUNK_SIZE, DJFAKER_PIPELINE, \
+    DJFAKER_PIPELINE_DEPTH, DJFAKER_REWRITE, DJFAKER_MAINTENANCE
+from .writers import RowWriter, BatchWriter, get_concrete_fields, \
+    get_max_params
+from .unicity import UnicityChecker
+from .rng import SeededRandom, replacers_rng
+from .locales import use_locale
+from .profiling import FakerProfile, NullProfile
+from .scheduler import get_faker_path, run_partitions
+from .registry import registry
+from .deletion import plan_deletion, has_signals
+from .pipeline import Pipeline, Sequential
+from .maintenance import maintenance_session
+from .rewrite import CopyWriter, TableRewrite, can_drop, \
+    is_supported as is_rewrite_supported
+from . import pushdown
+
+# Number of instances for which replacers generate values at once
+GENERATION_SIZE = 1000
 
 # Special declarations
 FAKER_DECLARATIONS = [
-    'FAKER_FOR', 'QS_FOR_DELETION', 'QS_FOR_UPDATE', 'DEPENDS_ON']
+    'FAKER_FOR', 'QS_FOR_DELETION', 'QS_FOR_UPDATE', 'DEPENDS_ON',
+    'BATCH_SIZE', 'CHUNK_SIZE', 'ONLY_NEEDED_FIELDS', 'PARTITIONS',
+    'PUSHDOWN', 'SEED', 'WATERMARK', 'FAST_DELETION', 'LOCALE', 'PIPELINE',
+    'REWRITE', 'MAINTENANCE', 'AUTODISCOVER']
+
+
+def iter_groups(iterable, size):
+    """ Yields lists of `size` items of `iterable` """
+    iterator = iter(iterable)
+    while True:
+        group = list(islice(iterator, size))
+        if not group:
+            return
+        yield group
+
+
+class ModelFakerMetaclass(type):
+    """ Compiles replacers of fakers when their class is created, and
+        registers them (see registry)
+    """
+
+    def __new__(mcs, name, bases, attrs):
+        cls = super(ModelFakerMetaclass, mcs).__new__(mcs, name, bases, attrs)
+        cls._plan = compile_plan(cls, FAKER_DECLARATIONS)
+        if any(isinstance(base, ModelFakerMetaclass) for base in bases):
+            registry.register(cls)
+        return cls
 
 
 class ModelFaker(object):
+    __metaclass__ = ModelFakerMetaclass
 
     # Django model class you wan to fake
     FAKER_FOR = None
@@ -26,27 +78,90 @@ class ModelFaker(object):
     # Which fakers (ModelFaker subclasses) should be run before this one
     DEPENDS_ON = []
 
-    # Internal utility : set to True when this faker is ran
+    # Number of faked instances written together by a multi-row UPDATE
+    # if None, instances are saved one by one
+    BATCH_SIZE = None
+
+    # Number of instances loaded together from database : instances to fake
+    # are walked by chunks ordered by primary key (keyset pagination)
+    # if None, all instances are loaded at once
+    CHUNK_SIZE = None
+
+    # If True, only loads fields which are replaced or used as tokens by lazy
+    # replacers (other fields would be loaded by one query per instance)
+    ONLY_NEEDED_FIELDS = False
+
+    # Number of primary key ranges faked in parallel, each one by a process
+    # with its own connection and transaction
+    # if None, instances are faked by the current process
+    PARTITIONS = None
+
+    # If True, replacers which can be compiled to SQL are run by the database
+    # with UPDATE statements, without loading instances (no signal is sent)
+    PUSHDOWN = False
+
+    # Seed making faked values reproducible : values of an instance only
+    # depend on the seed, the model and the instance primary key
+    # if None, values are random
+    SEED = None
+
+    # Field (a date, a datetime or an increasing number) whose greatest value
+    # is recorded by the journal when the faker is completed : incremental
+    # runs only fake instances whose field value is greater
+    WATERMARK = None
+
+    # If True, instances selected by QS_FOR_DELETION and their cascades are
+    # deleted by chunks with set-based statements (see djfaker.deletion)
+    FAST_DELETION = False
+
+    # Locale of corpora and formats used by replacers (see djfaker.locales),
+    # None for DJFAKER_LOCALE
+    LOCALE = None
+
+    # If True, instances are read and written by threads (with their own
+    # connections) while they are faked (see djfaker.pipeline)
+    PIPELINE = False
+
+    # If True, the whole table is rewritten with COPY into a new table,
+    # instances to delete being dropped by the same pass (PostgreSQL only,
+    # see djfaker.rewrite)
+    REWRITE = False
+
+    # If True, non-unique indexes on replaced columns are dropped and update
+    # triggers are disabled while instances are faked, then rebuilt, and the
+    # connection is tuned for bulk writes (see djfaker.maintenance)
+    MAINTENANCE = False
+
+    # If False, this faker (but not its subclasses : the flag is not
+    # inherited) is only run by djfaker_fake_db when it is given, e.g. for
+    # abstract fakers or variants of another faker
+    AUTODISCOVER = True
+
+    # Internal utility : set to True when this faker is ran (read from the
+    # class itself : subclasses of a faker ran are still to run)
     _ran = False
 
+    # Internal utility : replacers compiled when the class is created
+    # (tuple of djfaker.plans.Step)
+    _plan = ()
+
+    # Internal utility : if not None, only instances whose WATERMARK field
+    # is greater are faked (incremental run)
+    _since = None
+
+    # Internal utility : measures of the run (see djfaker.profiling)
+    _profile = NullProfile()
+
     def _get_replacers(self, replacerClass=None):
         """ Returns declared replacers that will be applied on instances.
             if `replacerClass` is None, returns simple builtin values
             if `replacerClass` is given, returns subclasses of `replacerClass`
         """
-        attrs = []
-        for attr_name in dir(self):
-            attr = getattr(self, attr_name)
-            if attr_name in FAKER_DECLARATIONS or attr_name.startswith('_'):
-                # Skip special declarations and native python attributes
-                continue
-            if not replacerClass and not issubclass(type(attr), BaseReplacer):
-                # Not a *Replacer class, just a builtin value (int, bool, ...)
-                attrs.append(attr_name)
-            elif replacerClass and issubclass(type(attr), replacerClass):
-                # faker.replacer.*Replacer attribute
-                attrs.append(attr_name)
-        return attrs
+        if not replacerClass:
+            return [step.attr for step in self._plan if step.kind == NATIVE]
+        return [step.attr for step in self._plan
+                if step.kind != NATIVE
+                and isinstance(step.replacer, replacerClass)]
 
     @classmethod
     def _validate(cls):
@@ -59,19 +174,36 @@ class ModelFaker(object):
             raise ImproperlyConfigured()
 
     @classmethod
-    def _run_dependencies(cls):
+    def _run_dependencies(cls, **options):
         """ Runs dependencies declared in cls.DEPENDS_ON """
-        for dependency in cls.DEPENDS_ON:
-            app, module, klass = dependency.rsplit('.', 2)
-            import_module(app)
-            fakers = import_module('%s.fakers' % app)
-            #print cls, " need dependency ", klass
-            getattr(fakers, klass)()._run()
-
-    def _run_deletion(self):
-        """ Deletes instances selected by cls.QS_FOR_DELETION """
-        if self.QS_FOR_DELETION:
-            self.QS_FOR_DELETION().delete()
+        for dependency in registry.get_dependencies(cls):
+            dependency()._run(**options)
+
+    def _run_deletion(self, fast_deletion=False):
+        """ Deletes instances selected by cls.QS_FOR_DELETION
+            If `fast_deletion` (or cls.FAST_DELETION or DJFAKER_FAST_DELETION)
+            is True, instances and their cascades are deleted with set-based
+            statements, unless their deletion can not be planned or is
+            listened by signals (and DJFAKER_DELETION_SIGNALS is True) : a
+            post_fake_deletion signal reports deleted rows, which are also
+            returned ({table: count}).
+        """
+        if not self.QS_FOR_DELETION:
+            return None
+        qs = self.QS_FOR_DELETION()
+        plan = None
+        if fast_deletion or self.FAST_DELETION or DJFAKER_FAST_DELETION:
+            plan = plan_deletion(qs.model)
+        if plan and DJFAKER_DELETION_SIGNALS \
+                and has_signals(plan.get_models()):
+            plan = None
+        if plan is None:
+            qs.delete()
+            return None
+        deleted = plan.run(qs, DJFAKER_DELETION_CHUNK_SIZE)
+        post_fake_deletion.send(None, faked_model=self.__class__,
+                                deleted=deleted)
+        return deleted
 
     def _get_update_qs(self):
         """ Returns queryset that selects instances to be faked (updated) """
@@ -79,81 +211,544 @@ class ModelFaker(object):
             qs = self.QS_FOR_UPDATE()
         else:
             qs = self.FAKER_FOR.objects.all()
+        if self._since is not None:
+            qs = qs.filter(**{'%s__gt' % self.WATERMARK: self._since})
         return qs
 
-    def _run_update(self):
-        """ Fakes instances by applying declared replacers """
-        cls = self.__class__
+    def _get_watermark(self):
+        """ Returns the greatest value of cls.WATERMARK field (serializable
+            by the journal), or None
+        """
+        if not self.WATERMARK:
+            return None
+        value = self.FAKER_FOR._default_manager.aggregate(
+            watermark=Max(self.WATERMARK))['watermark']
+        if value is None or isinstance(value, (int, long, float)):
+            return value
+        return unicode(value)
 
-        # Simple builtin values
-        native_attrs = self._get_replacers()
-        # Replacers which are not dependent of the instance other fields
-        simple_attrs = self._get_replacers(SimpleReplacer)
-        # Replacers which can be dependent of the instance other fields
-        lazy_attrs = self._get_replacers(LazyReplacer)
+    def _load_watermark(self, value):
+        """ Converts a watermark read from the journal """
+        if value is None:
+            return None
+        return self.FAKER_FOR._meta.get_field(self.WATERMARK).to_python(value)
 
-        if not any([native_attrs, simple_attrs, lazy_attrs]):
-            # Nothing to do !
-            return
+    def _get_needed_fields(self, plan, unicity):
+        """ Returns names of fields needed to fake instances : replaced
+            fields, fields used as tokens and fields checked for unicity
+        """
+        names = set(step.attr for step in plan)
+        for step in plan:
+            if step.kind == LAZY:
+                names.update(step.replacer.tokens)
+        names.update(unicity.get_field_names())
+        return [f.name for f in get_concrete_fields(self.FAKER_FOR, names)]
 
+    def _get_pk_ranges(self, partitions):
+        """ Splits primary keys of instances to be faked into `partitions`
+            ranges : [(first pk, last pk), ...]
+            Non-integer primary keys can not be split : [(None, None)]
+        """
+        bounds = self._get_update_qs().aggregate(
+            first=Min('pk'), last=Max('pk'))
+        first, last = bounds['first'], bounds['last']
+        if first is None:
+            return []
+        if not isinstance(first, (int, long)):
+            return [(None, None)]
+        step = (last - first) // partitions + 1
+        return [(start, min(start + step - 1, last))
+                for start in range(first, last + 1, step)]
+
+    def _get_range_qs(self, pk_range=None):
+        """ Returns queryset that selects instances to be faked whose
+            primary key is in `pk_range`, if given
+        """
         qs = self._get_update_qs()
-        for instance in qs:
+        if pk_range and pk_range[0] is not None:
+            qs = qs.filter(pk__gte=pk_range[0], pk__lte=pk_range[1])
+        return qs
+
+    def _iter_update_qs(self, chunk_size=None, fields=None, pk_range=None,
+                        after_pk=None, ordered=False):
+        """ Yields instances to be faked.
+            If `chunk_size` (or cls.CHUNK_SIZE or DJFAKER_CHUNK_SIZE) is
+            given, instances are loaded by chunks of `chunk_size`, walking
+            primary keys, so memory usage does not depend on table size
+            If `fields` is given, only these fields are loaded
+            If `pk_range` is given, only instances whose primary key is in
+            this (first, last) range are loaded
+            If `after_pk` is given, only instances whose primary key is
+            greater are loaded. Instances are then ordered by primary key,
+            like if `ordered` is True
+        """
+        qs = self._get_range_qs(pk_range)
+        if fields:
+            qs = qs.only(*fields)
+        if ordered or after_pk is not None:
+            qs = qs.order_by('pk')
+        chunk_size = chunk_size or self.CHUNK_SIZE or DJFAKER_CHUNK_SIZE
+        if not chunk_size:
+            if after_pk is not None:
+                qs = qs.filter(pk__gt=after_pk)
+            for instance in qs:
+                yield instance
+            return
+
+        qs = qs.order_by('pk')
+        last_pk = after_pk
+        while True:
+            chunk = qs
+            if last_pk is not None:
+                chunk = chunk.filter(pk__gt=last_pk)
+            count = 0
+            for instance in chunk[:chunk_size].iterator():
+                count += 1
+                last_pk = instance.pk
+                yield instance
+            if count < chunk_size:
+                break
+
+    def _get_writer(self, attrs, batch_size=None, unicity=None):
+        """ Returns the writer which will save faked instances.
+            `batch_size` overrides cls.BATCH_SIZE and DJFAKER_BATCH_SIZE
+        """
+        batch_size = batch_size or self.BATCH_SIZE or DJFAKER_BATCH_SIZE
+        if batch_size:
+            return BatchWriter(self.FAKER_FOR, attrs, batch_size, unicity)
+        return RowWriter(self.FAKER_FOR, attrs, unicity)
+
+    def _apply_replacers(self, instance, plan, rng=None, tries=0):
+        """ Applies replacers of `plan` on an instance
+            If `rng` (a SeededRandom used by replacers) is given, it is
+            seeded for each attribute from the instance pk and `tries`
+        """
+        profile = self._profile
+        for attr, replacer, kind in plan:
+            if rng is not None:
+                rng.reseed(instance.pk, attr, tries)
+            if kind == NATIVE:
+                setattr(instance, attr, replacer)
+                continue
+            with profile.replacer_timer(attr):
+                if kind == SIMPLE:
+                    value = replacer.apply()
+                else:
+                    value = replacer.apply(instance)
+            setattr(instance, attr, value)
 
+    def _apply_replacers_many(self, instances, plan):
+        """ Applies replacers of `plan` on a list of instances, generating
+            values of each replacer for all instances at once (apply_many)
+        """
+        for attr, replacer, kind in plan:
+            if kind == NATIVE:
+                values = [replacer] * len(instances)
+            else:
+                with self._profile.replacer_timer(attr):
+                    if kind == SIMPLE:
+                        values = replacer.apply_many(len(instances))
+                    else:
+                        values = replacer.apply_many(instances)
+            for instance, value in zip(instances, values):
+                setattr(instance, attr, value)
+
+    def _run_pushdown(self, plan, unicity, pk_range=None):
+        """ Runs replacers which can be compiled to SQL with UPDATE
+            statements (see _plan_pushdown()). Returns (attributes replaced,
+            number of rows)
+        """
+        pushed, stages = self._plan_pushdown(plan, unicity, pk_range)
+        if not stages:
+            return [], 0
+        model = self.FAKER_FOR
+        return pushed, pushdown.run_pushdown(
+            model, connections[router.db_for_write(model)],
+            self._get_range_qs(pk_range), stages)
+
+    def _plan_pushdown(self, plan, unicity, pk_range=None):
+        """ Returns (compiled attributes, stages) of replacers which can be
+            compiled to SQL (see _compile_pushdown()), nothing is run.
+            Are not compiled :
+            - fields checked for unicity (checked in memory)
+            - fields stored in parent models tables
+            - lazy replacers reading fields replaced in Python or by other
+              lazy replacers (UPDATE reads values before the statement)
+            - replacers binding more than half of the parameters a statement
+              can bind (e.g. long choices lists) : primary keys would be
+              updated one by one
+            - if some replacers are left to Python, fields filtering
+              instances to fake (they are selected again after the UPDATE)
+        """
+        model = self.FAKER_FOR
+        connection = connections[router.db_for_write(model)]
+        if not pushdown.is_supported(connection):
+            return [], []
+
+        excluded = set(unicity.get_field_names())
+        pushed, stages = self._compile_pushdown(plan, connection, excluded)
+        if len(pushed) < len(plan):
+            excluded.update(pushdown.get_filtered_fields(
+                model, connection, self._get_range_qs(pk_range)))
+            pushed, stages = self._compile_pushdown(
+                plan, connection, excluded)
+        return pushed, stages
+
+    def _compile_pushdown(self, plan, connection, excluded):
+        """ Returns (compiled attributes, stages) : stages of assignments
+            run by _run_pushdown() are (field, sql, params) lists, simple
+            replacers then lazy ones. Fields named in `excluded` are not
+            compiled
+        """
+        model = self.FAKER_FOR
+        max_params = get_max_params(connection)
+        fields = {}
+        for field in model._meta.local_fields:
+            if not field.primary_key and field.name not in excluded:
+                fields[field.name] = fields[field.attname] = field
+
+        simple, lazy, tokens = [], [], {}
+        for attr, replacer, kind in plan:
+            if attr not in fields:
+                continue
+            if kind == NATIVE:
+                value = fields[attr].get_db_prep_save(
+                    replacer, connection=connection)
+                simple.append((attr, '%s', [value]))
+                continue
+            compiled = replacer.as_sql(model, connection)
+            if compiled and max_params and len(compiled[1]) > max_params // 2:
+                compiled = None
+            if compiled and kind == SIMPLE:
+                simple.append((attr, ) + compiled)
+            elif compiled:
+                lazy.append((attr, ) + compiled)
+                tokens[attr] = replacer.tokens
+
+        python_attrs = set(step.attr for step in plan if step.kind != LAZY)
+        python_attrs.difference_update(a for a, sql, params in simple)
+        python_attrs.update(step.attr for step in plan if step.kind == LAZY)
+        lazy = [l for l in lazy if not python_attrs.intersection(tokens[l[0]])]
+
+        return [a for a, sql, params in simple + lazy], [
+            [(fields[a], sql, params) for a, sql, params in stage]
+            for stage in (simple, lazy) if stage]
+
+    def _get_rng(self, seed=None):
+        """ Returns the SeededRandom used by replacers, or None if no seed
+            is given (nor cls.SEED, nor DJFAKER_SEED)
+        """
+        for value in (seed, self.SEED, DJFAKER_SEED):
+            if value is not None:
+                opts = self.FAKER_FOR._meta
+                return SeededRandom(
+                    value, '%s.%s' % (opts.app_label, opts.object_name))
+        return None
+
+    def _run_update(self, batch_size=None, chunk_size=None, partitions=None,
+                    pushdown=False, seed=None, journal=None, since=None,
+                    profile=False, progress=None, locale=None,
+                    pipeline=False, rewrite=False, drop_deleted=False,
+                    pk_range=None, partition=None, reservations=None):
+        """ Fakes instances by applying declared replacers
+            If `partitions` (or cls.PARTITIONS) is given, instances are split
+            into primary key ranges faked in parallel.
+            If `pushdown` (or cls.PUSHDOWN) is True, replacers which can be
+            compiled to SQL are run by the database.
+            If `seed` (or cls.SEED) is given, faked values are reproducible :
+            values are generated instance by instance, and pushdown is
+            disabled (database random generators can not be seeded)
+            If `journal` is given, progress is recorded in it, and instances
+            already written by the run are skipped (resumed run)
+            If `since` is given, only instances whose cls.WATERMARK field is
+            greater are faked (incremental run)
+            If `progress` is given, a fake_progress signal is sent every
+            `progress` seconds. Measures are recorded by self._profile
+            (`profile` is given to partition workers)
+            Replacers use corpora and formats of `locale` (or cls.LOCALE, or
+            DJFAKER_LOCALE)
+            If `pipeline` (or cls.PIPELINE or DJFAKER_PIPELINE) is True,
+            instances are read and written by threads while they are faked,
+            except by partitions (written in a single transaction) and with
+            SQLite (which locks the whole database while writing)
+            If `rewrite` (or cls.REWRITE or DJFAKER_REWRITE) is True, the
+            table is rewritten with COPY (PostgreSQL only, see
+            _run_rewrite()), instances selected by cls.QS_FOR_DELETION being
+            dropped if `drop_deleted` is True
+            `pk_range`, `partition` (djfaker.rng.Partition) and
+            `reservations` (unique values shared between partitions) are
+            given to partition workers
+            Returns number of faked instances
+        """
+        cls = self.__class__
+        self._since = since
+        # Builtin values, simple replacers then lazy replacers
+        plan = self._plan
+
+        if not plan:
+            # Nothing to do !
+            return 0
+
+        if self._is_rewritten(rewrite, pk_range):
+            return self._run_rewrite(plan, seed, locale, drop_deleted)
+
+        partitions = partitions or self.PARTITIONS
+        if partitions > 1 and pk_range is None:
+            # A resumed run keeps the ranges of the first one
+            path = journal and get_faker_path(cls)
+            ranges = path and journal.get_ranges(path)
+            if ranges is None:
+                ranges = self._get_pk_ranges(partitions)
+                if path:
+                    journal.split(path, ranges)
+            sizes = [self._get_range_qs(pk_range).count()
+                     for pk_range in ranges]
+            return run_partitions(cls, ranges, self._profile, sizes,
+                                  batch_size=batch_size,
+                                  chunk_size=chunk_size, pushdown=pushdown,
+                                  seed=seed, journal=journal, since=since,
+                                  progress=progress, locale=locale)
+
+        attrs = [step.attr for step in plan]
+        unicity = UnicityChecker(
+            self.FAKER_FOR, get_concrete_fields(self.FAKER_FOR, attrs),
+            reservations)
+
+        rng = self._get_rng(seed)
+        locale = locale or self.LOCALE
+        if (pushdown or self.PUSHDOWN) and rng is None:
+            with self._profile.timer('pushdown'), use_locale(locale):
+                pushed, count = self._run_pushdown(plan, unicity, pk_range)
+            plan = tuple(step for step in plan if step.attr not in pushed)
+            attrs = [step.attr for step in plan]
+            if not plan:
+                self._profile.rows += count
+                self._profile.written += count
+                return count
+        writer = self._get_writer(attrs, batch_size, unicity)
+        fields = None
+        if self.ONLY_NEEDED_FIELDS:
+            fields = self._get_needed_fields(plan, unicity)
+        count = 0
+        # Partitions are written in a single transaction : they are only
+        # recorded once completed (see run_partitions)
+        path = journal and pk_range is None and get_faker_path(cls)
+        after_pk = path and journal.get_pk(path)
+        instances = self._iter_update_qs(
+            chunk_size, fields, pk_range, after_pk, ordered=bool(path))
+        replacers = [s.replacer for s in plan if s.kind != NATIVE]
+        for replacer in replacers:
+            replacer.reset(partition)
+        groups = iter_groups(instances, GENERATION_SIZE)
+        if self._is_pipelined(pipeline, pk_range):
+            stages = Pipeline(groups, writer, self._profile,
+                              DJFAKER_PIPELINE_DEPTH)
+        else:
+            stages = Sequential(groups, writer, self._profile)
+        started = reported = time.time()
+        with replacers_rng(replacers if rng else [], rng), \
+                use_locale(locale), stages:
+            for group in stages:
+                count += self._fake_group(
+                    group, plan, unicity, stages.target, rng)
+                if path and writer.last_pk not in (None, after_pk):
+                    after_pk = writer.last_pk
+                    journal.checkpoint(path, after_pk)
+                if progress and time.time() - reported >= progress:
+                    reported = time.time()
+                    fake_progress.send(
+                        None, faked_model=cls, pk_range=pk_range,
+                        count=count, rate=count / (reported - started))
+        self._profile.written += writer.written
+        self._profile.skipped += writer.skipped
+        return count
+
+    def _is_pipelined(self, pipeline=False, pk_range=None):
+        """ Returns True if the run is pipelined (see _run_update()) """
+        if pk_range is not None:
+            return False
+        vendor = connections[router.db_for_write(self.FAKER_FOR)].vendor
+        return bool(pipeline or self.PIPELINE or DJFAKER_PIPELINE) \
+            and vendor != 'sqlite'
+
+    def _is_rewritten(self, rewrite=False, pk_range=None):
+        """ Returns True if the table is rewritten (see _run_update()) :
+            with PostgreSQL, for models without parents (multi-table
+            inheritance)
+        """
+        model = self.FAKER_FOR
+        if pk_range is not None or model._meta.parents:
+            return False
+        connection = connections[router.db_for_write(model)]
+        return bool(rewrite or self.REWRITE or DJFAKER_REWRITE) \
+            and is_rewrite_supported(connection)
+
+    def _run_rewrite(self, plan, seed=None, locale=None, drop_deleted=False):
+        """ Rewrites the table with COPY (see djfaker.rewrite) : instances
+            to fake are loaded with needed fields only, by groups faked like
+            other runs, rows of other instances are copied unchanged and
+            instances selected by cls.QS_FOR_DELETION are dropped if
+            `drop_deleted` is True. Returns number of faked instances
+        """
+        model = self.FAKER_FOR._meta.concrete_model
+        connection = connections[router.db_for_write(model)]
+        attrs = [step.attr for step in plan]
+        unicity = UnicityChecker(
+            self.FAKER_FOR, get_concrete_fields(self.FAKER_FOR, attrs))
+        writer = CopyWriter(model, attrs, connection, [
+            f.column for f in model._meta.local_fields], unicity)
+        rng = self._get_rng(seed)
+        replacers = [s.replacer for s in plan if s.kind != NATIVE]
+        for replacer in replacers:
+            replacer.reset()
+
+        def fake(instances):
+            self._fake_group(instances, plan, unicity, writer, rng)
+
+        deletion_qs = None
+        if drop_deleted and self.QS_FOR_DELETION:
+            deletion_qs = self.QS_FOR_DELETION()
+        table = TableRewrite(
+            model, connection, writer, fake, self._get_update_qs(),
+            deletion_qs, self._get_needed_fields(plan, unicity),
+            GENERATION_SIZE)
+        with replacers_rng(replacers if rng else [], rng), \
+                use_locale(locale or self.LOCALE):
+            count = table.run()
+        if deletion_qs is not None:
+            post_fake_deletion.send(None, faked_model=self.__class__,
+                                    deleted={model._meta.db_table:
+                                             table.dropped})
+        self._profile.written += writer.written
+        self._profile.skipped += writer.skipped
+        return count
+
+    def _get_maintenance(self, maintenance=False):
+        """ Returns the maintenance session the update runs in : it does
+            nothing unless `maintenance` (or cls.MAINTENANCE or
+            DJFAKER_MAINTENANCE) is True
+        """
+        return maintenance_session(
+            self.FAKER_FOR, [step.attr for step in self._plan],
+            bool(maintenance or self.MAINTENANCE or DJFAKER_MAINTENANCE))
+
+    def _fake_group(self, group, plan, unicity, writer, rng=None):
+        """ Fakes a group of instances, then hands them to `writer`.
+            Returns number of faked instances
+        """
+        cls = self.__class__
+        profile = self._profile
+        # Values before faking : unchanged instances are not written
+        originals = [writer.get_values(instance) for instance in group]
+        with profile.timer('generation'):
+            if rng is None:
+                # First try : values are generated for the whole group at once
+                self._apply_replacers_many(group, plan)
+            else:
+                for instance in group:
+                    self._apply_replacers(instance, plan, rng)
+
+        for instance, original in zip(group, originals):
             """
-            Dumb validation methods : Faking data can generate unicity error
+            Validation : Faking data can generate unicity error
             Algorithm is :
             - Apply replacers on an instance
-            - Run validate_unique()
-                - If OK : save instance and go forward
-                - If ValidationError is raised : retry !
+            - Check unique constraints against values loaded once by the
+              unicity engine
+                - If OK : reserve values, write instance and go forward
+                - If a constraint is broken : retry from the original values
+              (lazy replacers, e.g. pseudonyms, never read values of a
+              previous try)
             DJFAKER_MAX_TRIES limits number of tries and raises a
             FakerUnicityError if it is reached
             """
             tries = 0
             while tries <= DJFAKER_MAX_TRIES:
+                if tries:
+                    with profile.timer('generation'):
+                        writer.set_values(instance, original)
+                        self._apply_replacers(instance, plan, rng, tries)
 
-                for attr in native_attrs:
-                    replacer = getattr(cls, attr)
-                    setattr(instance, attr, replacer)
-
-                for attr in simple_attrs:
-                    replacer = getattr(cls, attr)
-                    setattr(instance, attr, replacer.apply())
-
-                for attr in lazy_attrs:
-                    replacer = getattr(cls, attr)
-                    setattr(instance, attr, replacer.apply(instance))
-
-                try:
-                    instance.validate_unique()
-                except ValidationError, e:
+                with profile.timer('unicity'):
+                    broken = unicity.check(instance)
+                if broken:
                     tries += 1
+                    profile.retries += 1
                     if DJFAKER_MAX_TRIES == tries:
-                        raise FakerUnicityError(e.message_dict.keys())
+                        fields = []
+                        for check in broken:
+                            fields.extend(
+                                f for f in check if f not in fields)
+                        raise FakerUnicityError(fields, broken, cls)
                 else:
-                    instance.save()
+                    with profile.timer('unicity'):
+                        unicity.reserve(instance)
+                    with profile.timer('write'):
+                        writer.write(instance, original)
                     break
 
-    def _run(self, no_deps=False, no_dels=False):
-        """ Main method which orchestrates faking of a model instances """
+        profile.rows += len(group)
+        return len(group)
+
+    def _run(self, no_deps=False, no_dels=False, incremental=False,
+             fast_deletion=False, **options):
+        """ Main method which orchestrates faking of a model instances
+            `options` are given to _run_update() and to dependencies
+            If `incremental` is True, only instances whose cls.WATERMARK
+            field changed since the last run recorded by the journal are
+            faked
+            If `profile` option is True, the run is measured by
+            self._profile (a FakerProfile)
+        """
         cls = self.__class__
+        journal = options.get('journal')
+        path = get_faker_path(cls)
 
-        if cls._ran:
+        if cls.__dict__.get('_ran'):
             #print "Already ran ", cls
             return
 
+        if journal and journal.is_done(path):
+            # Completed by the resumed run
+            cls._ran = True
+            return
+
         pre_fake_model.send(None, faked_model=cls)
         #print "Run ", cls
 
         cls._validate()
 
         if not no_deps:
-            cls._run_dependencies()
+            cls._run_dependencies(incremental=incremental,
+                                  fast_deletion=fast_deletion, **options)
+
+        if options.get('profile'):
+            self._profile = FakerProfile(path)
+        # Rewritten tables drop instances to delete while they are copied
+        drop_deleted = not no_dels and bool(self._plan) and \
+            self._is_rewritten(options.get('rewrite')) and \
+            can_drop(self.FAKER_FOR)
+        self._profile.start()
+        try:
+            if not no_dels and not drop_deleted:
+                with self._profile.timer('deletion'):
+                    self._run_deletion(fast_deletion)
 
-        if not no_dels:
-            self._run_deletion()
+            since = None
+            if incremental and journal and self.WATERMARK:
+                since = self._load_watermark(journal.get_watermark(path))
+            if journal:
+                # Instances changed while they are faked are faked again by
+                # the next incremental run
+                journal.begin(path, self._get_watermark())
+            with self._get_maintenance(options.pop('maintenance', False)):
+                self._run_update(since=since, drop_deleted=drop_deleted,
+                                 **options)
+        finally:
+            self._profile.stop()
 
-        self._run_update()
+        if journal:
+            journal.done(path, journal.get_begin_watermark(path))
 
         post_fake_model.send(None, faked_model=cls)
         #print "Ran ", cls
@@ -0,0 +1,186 @@
+""" Corpora : word lists (names, companies, ...) used by replacers, loaded
+    on first use.
+
+    Large corpora are stored in files mapped in memory : a header, an index
+    of offsets, then words encoded in UTF-8. A word is read by index without
+    loading the others, and pages of a file are shared by processes (forked
+    workers do not copy them).
+"""
+import mmap
+import struct
+
+from .exceptions import FakerCorpusError
+from .settings import DJFAKER_CORPORA
+
+# Header of corpus files : magic, version, number of words
+MAGIC = 'DJFC'
+VERSION = 1
+HEADER = struct.Struct('<4sBxxxI')
+# Offsets of words in the blob (number of words + 1 offsets)
+OFFSET = struct.Struct('<I')
+BOUNDS = struct.Struct('<II')
+
+# Builtin corpora : name -> list of djfaker.data
+BUILTIN_CORPORA = {
+    'first_names': 'FIRST_NAMES',
+    'last_names': 'LAST_NAMES',
+    'companies': 'COMPANIES',
+    'companies_extra': 'COMPANIES_EXTRA',
+    'mail_exts': 'MAIL_EXTS',
+}
+
+# Loaded corpora : name -> sequence of words
+_corpora = {}
+
+
+class Corpus(object):
+    """ Words of a corpus file (see write_corpus()), as a read-only
+        sequence of unicode strings. The file is mapped in memory on first
+        access
+    """
+    # Words of a corpus file are written once
+    distinct = True
+
+    def __init__(self, path):
+        self.path = path
+        self._map = None
+        self._size = None
+
+    def _open(self):
+        try:
+            with open(self.path, 'rb') as corpus:
+                mapped = mmap.mmap(corpus.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+        except (IOError, ValueError, mmap.error), e:
+            raise FakerCorpusError(self.path, e)
+        magic = version = size = None
+        if len(mapped) >= HEADER.size:
+            magic, version, size = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC or version != VERSION:
+            mapped.close()
+            raise FakerCorpusError(self.path, 'not a corpus file')
+        self._size = size
+        self._map = mapped
+
+    def __len__(self):
+        if self._map is None:
+            self._open()
+        return self._size
+
+    def __getitem__(self, index):
+        if self._map is None:
+            self._open()
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        start, end = BOUNDS.unpack_from(
+            self._map, HEADER.size + OFFSET.size * index)
+        blob = HEADER.size + OFFSET.size * (self._size + 1)
+        return self._map[blob + start:blob + end].decode('utf-8')
+
+    def __iter__(self):
+        for index in xrange(len(self)):
+            yield self[index]
+
+    def __repr__(self):
+        return '<Corpus: {0}>'.format(self.path)
+
+    def close(self):
+        """ Unmaps the file, which is mapped again on next access """
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+class LazyCorpus(object):
+    """ Corpus `name` (see get_corpus()), resolved on use by the active
+        locale provider (see djfaker.locales) : replacers can declare
+        corpora as class attributes without loading them
+    """
+    distinct = True
+
+    def __init__(self, name):
+        self.name = name
+
+    def resolve(self):
+        """ Returns the sequence of words """
+        from .locales import active_provider
+        return active_provider().get_corpus(self.name)
+
+    def __len__(self):
+        return len(self.resolve())
+
+    def __getitem__(self, index):
+        return self.resolve()[index]
+
+    def __iter__(self):
+        return iter(self.resolve())
+
+    def __repr__(self):
+        return '<LazyCorpus: {0}>'.format(self.name)
+
+
+def resolve(words):
+    """ Returns words of `words` if it is a LazyCorpus, else `words` """
+    if isinstance(words, LazyCorpus):
+        return words.resolve()
+    return words
+
+
+def write_corpus(path, words):
+    """ Writes `words` (unicode or UTF-8 encoded strings) to corpus file
+        `path`, in the same order, without duplicates and empty words.
+        Returns number of written words
+    """
+    encoded, seen = [], set()
+    for word in words:
+        if isinstance(word, unicode):
+            word = word.encode('utf-8')
+        if word and word not in seen:
+            seen.add(word)
+            encoded.append(word)
+    offsets, offset = [], 0
+    for word in encoded:
+        offsets.append(offset)
+        offset += len(word)
+    offsets.append(offset)
+    with open(path, 'wb') as corpus:
+        corpus.write(HEADER.pack(MAGIC, VERSION, len(encoded)))
+        corpus.write(struct.pack('<%dI' % len(offsets), *offsets))
+        corpus.write(''.join(encoded))
+    return len(encoded)
+
+
+def register_corpus(name, words):
+    """ Registers corpus `name` : the path of a corpus file, or a sequence
+        of words (kept without duplicates)
+    """
+    if isinstance(words, basestring):
+        words = Corpus(words)
+    elif not getattr(words, 'distinct', False):
+        from .pools import unique
+        words = unique(words)
+    _corpora[name] = words
+
+
+def has_corpus(name):
+    """ Returns True if corpus `name` is registered, declared or builtin """
+    return (name in _corpora or name in DJFAKER_CORPORA
+            or name in BUILTIN_CORPORA)
+
+
+def get_corpus(name):
+    """ Returns words of corpus `name` : registered by register_corpus(),
+        declared by DJFAKER_CORPORA (path of a corpus file), or builtin
+        (djfaker.data lists, without duplicates)
+    """
+    if name not in _corpora:
+        if name in DJFAKER_CORPORA:
+            register_corpus(name, DJFAKER_CORPORA[name])
+        elif name in BUILTIN_CORPORA:
+            from . import data
+            register_corpus(name, getattr(data, BUILTIN_CORPORA[name]))
+        else:
+            raise FakerCorpusError(name, 'unknown corpus')
+    return _corpora[name]
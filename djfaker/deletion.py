@@ -0,0 +1,204 @@
+""" Deletion : deletes instances and their cascades with set-based DELETE
+    statements planned from models metadata, without loading instances
+"""
+from collections import namedtuple
+
+from django.db import connections, router
+from django.db.models import signals
+from django.db.models.deletion import (
+    CASCADE, PROTECT, SET_NULL, SET_DEFAULT, DO_NOTHING, ProtectedError)
+
+from .writers import atomic, get_max_params
+
+# Placeholder of the primary keys of a chunk of instances to delete
+PKS = '{pks}'
+
+# Statements of a plan
+PROTECT_CHECK, UPDATE, DELETE = 'protect', 'update', 'delete'
+
+
+class CannotPlan(Exception):
+    """ Raised if a deletion can not be run with set-based statements """
+
+
+class Operation(namedtuple('Operation', ['action', 'model', 'sql', 'params',
+                                        'field'])):
+    """ A statement of a deletion plan : `sql` contains PKS once, `params`
+        are bound before primary keys. `field` is the foreign key checked
+        (PROTECT_CHECK) or updated (UPDATE)
+    """
+
+
+class DeletionPlan(object):
+    """ Statements deleting instances of `model` (selected by primary keys)
+        and their cascades, children first :
+        - protected foreign keys are checked before anything is deleted
+        - CASCADE foreign keys (and many to many tables) are deleted,
+          SET_NULL and SET_DEFAULT ones are updated, DO_NOTHING ones are left
+        - tables of parent models (multi-table inheritance) are deleted
+          after their children
+        Raises CannotPlan for generic relations, circular cascades, parent
+        links which are not primary keys, and custom on_delete handlers.
+    """
+
+    def __init__(self, model, connection):
+        self.model = model._meta.concrete_model
+        self.connection = connection
+        self.checks = []
+        self.operations = []
+        self._plan(self.model, PKS, [])
+
+    def _quote(self, name):
+        return self.connection.ops.quote_name(name)
+
+    def _select(self, model, column, where):
+        return 'SELECT {0} FROM {1} WHERE {2}'.format(
+            self._quote(column), self._quote(model._meta.db_table), where)
+
+    def _plan(self, model, selector, path, link=None):
+        """ Plans deletion of `model` rows whose primary key is selected by
+            SQL `selector`. `link` is the parent link (multi-table
+            inheritance) whose rows are deleted by the caller
+        """
+        opts = model._meta
+        if model in path:
+            raise CannotPlan('circular cascade : {0}'.format(' -> '.join(
+                m.__name__ for m in path[path.index(model):] + [model])))
+        path = path + [model]
+        for relation in opts.many_to_many:
+            if not relation.rel.through:
+                raise CannotPlan('generic relation {0}.{1}'.format(
+                    model.__name__, relation.name))
+
+        # Relations of parent models are planned with them
+        for related in opts.get_all_related_objects(
+                local_only=True, include_hidden=True, include_proxy_eq=True):
+            field = related.field
+            if field is link:
+                continue
+            child = related.model
+            target = field.rel.get_related_field()
+            values = selector
+            if not target.primary_key:
+                values = self._select(
+                    model, target.column, '{0} IN ({1})'.format(
+                        self._quote(opts.pk.column), selector))
+            where = '{0} IN ({1})'.format(self._quote(field.column), values)
+            on_delete = field.rel.on_delete
+            if on_delete is CASCADE:
+                self._plan(child, self._select(
+                    child, child._meta.pk.column, where), path,
+                    link=field if field.rel.parent_link else None)
+            elif on_delete is PROTECT:
+                self.checks.append(Operation(
+                    PROTECT_CHECK, child,
+                    self._select(child, child._meta.pk.column, where),
+                    [], field))
+            elif on_delete in (SET_NULL, SET_DEFAULT):
+                value = None
+                if on_delete is SET_DEFAULT:
+                    value = field.get_db_prep_save(
+                        field.get_default(), connection=self.connection)
+                self.operations.append(Operation(
+                    UPDATE, child, 'UPDATE {0} SET {1} = %s WHERE {2}'.format(
+                        self._quote(child._meta.db_table),
+                        self._quote(field.column), where), [value], field))
+            elif on_delete is not DO_NOTHING:
+                raise CannotPlan('custom on_delete of {0}.{1}'.format(
+                    child.__name__, field.name))
+
+        self.operations.append(Operation(
+            DELETE, model, 'DELETE FROM {0} WHERE {1} IN ({2})'.format(
+                self._quote(opts.db_table), self._quote(opts.pk.column),
+                selector), [], None))
+
+        for parent, ptr in opts.parents.items():
+            if ptr is None or ptr is link:
+                continue
+            if ptr is not opts.pk:
+                raise CannotPlan('parent link {0}.{1} is not a primary key'
+                                 .format(model.__name__, ptr.name))
+            self._plan(parent, selector, path, link=ptr)
+
+    def get_models(self):
+        """ Returns models whose rows are deleted or updated """
+        models = []
+        for operation in self.checks + self.operations:
+            if operation.model not in models:
+                models.append(operation.model)
+        return models
+
+    def get_chunk_size(self, chunk_size):
+        """ Returns number of primary keys bound by a statement """
+        max_params = get_max_params(self.connection)
+        if max_params:
+            chunk_size = min(chunk_size, max_params - 1)
+        return chunk_size
+
+    def _execute(self, cursor, operation, pks):
+        sql = operation.sql.replace(PKS, ', '.join(['%s'] * len(pks)))
+        cursor.execute(sql, operation.params + list(pks))
+
+    def run_chunk(self, pks, deleted):
+        """ Deletes instances whose primary key is in `pks` and their
+            cascades. Adds numbers of deleted rows to `deleted`
+            ({table: count})
+        """
+        cursor = self.connection.cursor()
+        for check in self.checks:
+            self._execute(cursor, check, pks)
+            protected = [row[0] for row in cursor.fetchmany(10)]
+            if protected:
+                raise ProtectedError(
+                    "Cannot delete some instances of model '{0}' because "
+                    "they are referenced through a protected foreign key: "
+                    "'{1}.{2}'".format(
+                        check.field.rel.to.__name__, check.model.__name__,
+                        check.field.name),
+                    list(check.model._base_manager.filter(pk__in=protected)))
+        for operation in self.operations:
+            self._execute(cursor, operation, pks)
+            if operation.action == DELETE:
+                table = operation.model._meta.db_table
+                deleted[table] = deleted.get(table, 0) + cursor.rowcount
+
+    def run(self, qs, chunk_size):
+        """ Deletes instances of `qs` by chunks of `chunk_size`, each one in
+            its own transaction. Returns numbers of deleted rows by table
+        """
+        using = self.connection.alias
+        chunk_size = self.get_chunk_size(chunk_size)
+        table = self.model._meta.db_table
+        qs = qs.using(using).order_by()
+        deleted = {}
+        while True:
+            pks = list(qs.values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                break
+            count = deleted.get(table, 0)
+            with atomic(using=using):
+                self.run_chunk(pks, deleted)
+            if deleted.get(table, 0) == count:
+                # Rows selected again would never be deleted
+                break
+        return deleted
+
+
+def has_signals(models):
+    """ Returns True if deletion of instances of `models` is listened """
+    for model in models:
+        for signal in (signals.pre_delete, signals.post_delete):
+            if signal.has_listeners(model):
+                return True
+    return False
+
+
+def plan_deletion(model, using=None):
+    """ Returns the DeletionPlan of `model`, or None if it can not be
+        planned
+    """
+    using = using or router.db_for_write(model)
+    try:
+        return DeletionPlan(model, connections[using])
+    except CannotPlan:
+        return None
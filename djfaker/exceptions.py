@@ -5,12 +5,110 @@ from django.utils.translation import ugettext as ug
 class FakerUnicityError(Exception):
     """ Exception raised if faker could not satisfy unicity contraints """
 
-    def __init__(self, fields):
+    def __init__(self, fields, constraints=None, faker=None):
         self.fields = fields
+        # Unique constraints (tuples of field names) which ran out of values
+        self.constraints = constraints or []
+        # ModelFaker subclass which raised the error
+        self.faker = faker
 
     def __str__(self):
         msg = '{0} : {1}'.format(
             ug("Can't find a unique value for field(s)"),
             ', '.join(self.fields)
         )
+        if self.constraints:
+            msg = '{0} ({1} : {2})'.format(
+                msg,
+                ug("broken unique constraint(s)"),
+                ', '.join('({0})'.format(', '.join(c))
+                          for c in self.constraints)
+            )
+        if self.faker:
+            msg = '{0} : {1}'.format(self.faker.__name__, msg)
         return msg
+
+
+class FakerDependencyError(Exception):
+    """ Exception raised if fakers dependencies contain a cycle """
+
+    def __init__(self, cycle):
+        # Dotted paths of fakers, the first one is repeated at the end
+        self.cycle = cycle
+
+    def __str__(self):
+        msg = '{0} : {1}'.format(
+            ug("Circular dependency between fakers"),
+            ' -> '.join(self.cycle)
+        )
+        return msg
+
+
+class FakerWorkerError(Exception):
+    """ Exception raised if a faker failed in a worker process """
+
+    def __init__(self, faker, traceback):
+        self.faker = faker
+        self.traceback = traceback
+
+    def __str__(self):
+        msg = '{0} {1} :\n{2}'.format(
+            ug("Worker failed to run faker"),
+            self.faker,
+            self.traceback
+        )
+        return msg
+
+
+class FakerPoolExhaustedError(IndexError):
+    """ Exception raised if a pool of unique values has not enough values
+        left (an IndexError, like popping from an empty list)
+    """
+
+    def __init__(self, size, drawn, requested, pool=None):
+        self.size = size
+        self.drawn = drawn
+        self.requested = requested
+        # Description of the pool
+        self.pool = pool
+
+    def __str__(self):
+        msg = '{0} : {1} {2}, {3} {4} ({5}/{6} {7})'.format(
+            ug("Pool of unique values exhausted"),
+            self.requested,
+            ug("value(s) requested"),
+            self.size - self.drawn,
+            ug("left"),
+            self.drawn,
+            self.size,
+            ug("drawn")
+        )
+        if self.pool:
+            msg = '{0} : {1}'.format(self.pool, msg)
+        return msg
+
+
+class FakerCorpusError(Exception):
+    """ Exception raised if a corpus (word list) is unknown or can not be
+        read
+    """
+
+    def __init__(self, name, reason):
+        # Name or path of the corpus
+        self.name = name
+        self.reason = reason
+
+    def __str__(self):
+        msg = '{0} {1} : {2}'.format(
+            ug("Invalid corpus"),
+            self.name,
+            self.reason
+        )
+        return msg
+
+
+class FakerManifestWarning(UserWarning):
+    """ Warning issued when the manifest of fakers modules (see
+        djfaker.registry) is stale : an app it lists without fakers has a
+        `fakers` module
+    """
@@ -0,0 +1,62 @@
+""" Hashing : memoizes password hashes of faked users """
+import random
+from collections import OrderedDict
+
+from django.contrib.auth.hashers import make_password, get_hasher
+
+from .rng import derive_seed
+
+SALT_CHARS = ('abcdefghijklmnopqrstuvwxyz'
+              'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789')
+
+
+class PasswordCache(object):
+    """ Bounded LRU cache of password hashes, keyed on raw password and
+        hasher algorithm.
+
+        Faked raw passwords have few distinct values : hashing each of
+        them once saves the cost of slow hashers (PBKDF2, bcrypt) for
+        every instance. Each raw password gets a pool of `pool_size`
+        hashes (with different salts) computed at once, a random one of
+        them being returned : with a single hash, all instances sharing a
+        raw password would share its salt and hash.
+
+        With a seeded generator (djfaker.rng.SeededRandom), salts are
+        derived from the run seed, so hashes are reproducible.
+    """
+
+    def __init__(self, size=1024, pool_size=4):
+        self.size = size
+        self.pool_size = max(1, pool_size)
+        self.hashes = OrderedDict()
+
+    def _get_salt(self, hasher, raw_password, index, run_seed):
+        """ Returns a salt derived from `run_seed`, or a random one """
+        salt = hasher.salt()
+        if run_seed is None or not salt.isalnum():
+            # Salts of some hashers (bcrypt) have their own format
+            return salt
+        rng = random.Random(derive_seed(
+            run_seed, raw_password, hasher.algorithm, index))
+        return ''.join(rng.choice(SALT_CHARS) for c in salt)
+
+    def get(self, raw_password, hasher='default', rng=random):
+        """ Returns a hash of `raw_password` computed by `hasher`
+            (a hasher algorithm name, or 'default'), picked with `rng`
+        """
+        hasher = get_hasher(hasher)
+        run_seed = getattr(rng, 'run_seed', None)
+        key = (raw_password, hasher.algorithm, run_seed)
+        pool = self.hashes.pop(key, None)
+        if pool is None:
+            pool = [make_password(raw_password, self._get_salt(
+                hasher, raw_password, i, run_seed), hasher)
+                for i in xrange(self.pool_size)]
+            if self.size and len(self.hashes) >= self.size:
+                # Forget least recently used password
+                self.hashes.popitem(last=False)
+        self.hashes[key] = pool
+        return pool[0] if len(pool) == 1 else rng.choice(pool)
+
+    def clear(self):
+        self.hashes.clear()
@@ -0,0 +1,137 @@
+""" Journal : checkpoints of fakers runs, to resume them or to fake only
+    instances changed since the last run
+"""
+import json
+import os
+
+
+class Journal(object):
+    """ Records progress of fakers in a file, one JSON event by line :
+        - start : a new run starts (progress of previous run is forgotten)
+        - begin : a faker starts, with the watermark of its instances
+        - ranges : primary key ranges a faker is split into (partitions)
+        - checkpoint : instances of a faker are written up to a primary key
+        - partition : a primary key range of a faker is written
+        - done : a faker is completed, with the watermark of its instances
+        Lines are appended and flushed one by one, so that a run killed at
+        any time leaves a readable journal, and processes of a run can
+        share it. Watermarks are kept from a run to the next one.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        # faker path -> {'pk': ..., 'partitions': [...], 'done': ...,
+        #                'ranges': [...], 'watermark': ...}
+        self.progress = {}
+        # faker path -> watermark of the last completed run
+        self.watermarks = {}
+        self.load()
+        if not resume:
+            self._write({'event': 'start'})
+            self.progress = {}
+
+    def load(self):
+        """ Replays events of the journal file """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as journal:
+            for line in journal:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # Line truncated by a killed run
+                    continue
+                self._replay(event)
+
+    def _replay(self, event):
+        if event['event'] == 'start':
+            self.progress = {}
+            return
+        progress = self.progress.setdefault(
+            event['faker'], {'pk': None, 'partitions': [], 'done': False})
+        if event['event'] == 'begin':
+            progress['watermark'] = event.get('watermark')
+        elif event['event'] == 'ranges':
+            progress['ranges'] = [tuple(r) for r in event['ranges']]
+        elif event['event'] == 'checkpoint':
+            progress['pk'] = event['pk']
+        elif event['event'] == 'partition':
+            progress['partitions'].append(tuple(event['range']))
+        elif event['event'] == 'done':
+            progress['done'] = True
+            self.watermarks[event['faker']] = event.get('watermark')
+
+    def _write(self, event):
+        with open(self.path, 'a') as journal:
+            journal.write(json.dumps(event) + '\n')
+            journal.flush()
+            os.fsync(journal.fileno())
+        if event['event'] != 'start':
+            self._replay(event)
+
+    def _get(self, faker):
+        return self.progress.get(faker, {})
+
+    def is_done(self, faker):
+        """ Returns True if faker (dotted path) was completed by the run """
+        return self._get(faker).get('done', False)
+
+    def get_pk(self, faker):
+        """ Returns the last primary key written by faker, or None """
+        return self._get(faker).get('pk')
+
+    def is_partition_done(self, faker, pk_range):
+        """ Returns True if primary key range `pk_range` of faker is
+            written
+        """
+        return tuple(pk_range) in self._get(faker).get('partitions', [])
+
+    def get_ranges(self, faker):
+        """ Returns primary key ranges faker was split into by the run, or
+            None
+        """
+        return self._get(faker).get('ranges')
+
+    def get_begin_watermark(self, faker):
+        """ Returns the watermark of instances of faker when the run
+            started it, or None
+        """
+        return self._get(faker).get('watermark')
+
+    def get_watermark(self, faker):
+        """ Returns the watermark recorded by the last completed run of
+            faker, or None
+        """
+        return self.watermarks.get(faker)
+
+    def begin(self, faker, watermark=None):
+        """ Records that faker starts. `watermark` is the greatest watermark
+            of its instances before they are faked : a resumed faker keeps
+            the one of its first start
+        """
+        if 'watermark' not in self._get(faker):
+            self._write({'event': 'begin', 'faker': faker,
+                         'watermark': watermark})
+
+    def split(self, faker, ranges):
+        """ Records primary key `ranges` faker is split into : partitions
+            of a resumed run are the same ones
+        """
+        self._write({'event': 'ranges', 'faker': faker,
+                     'ranges': [list(r) for r in ranges]})
+
+    def checkpoint(self, faker, pk):
+        """ Records that instances of faker are written up to `pk` """
+        self._write({'event': 'checkpoint', 'faker': faker, 'pk': pk})
+
+    def partition_done(self, faker, pk_range):
+        """ Records that primary key range `pk_range` of faker is written """
+        self._write({'event': 'partition', 'faker': faker,
+                     'range': list(pk_range)})
+
+    def done(self, faker, watermark=None):
+        """ Records that faker is completed. `watermark` (a JSON
+            serializable value) is the greatest watermark of its instances
+        """
+        self._write({'event': 'done', 'faker': faker,
+                     'watermark': watermark})
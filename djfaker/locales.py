@@ -0,0 +1,201 @@
+""" Locales : providers of corpora and formats used by replacers, by locale.
+
+    Providers are created on first use from builtin declarations and from
+    DJFAKER_LOCALES : unused locales cost nothing. A faker run activates the
+    provider of its locale (see use_locale()), replacers resolve their
+    corpora and compiled formats through the active provider.
+"""
+import re
+from contextlib import contextmanager
+
+from django.utils.translation import get_language
+
+from .corpus import has_corpus, get_corpus, register_corpus
+from .settings import DJFAKER_LOCALE, DJFAKER_LOCALES
+
+# Locale used when no provider is declared for the requested one
+DEFAULT_LOCALE = 'fr'
+
+# Builtin declarations : locale -> {'formats': {kind: patterns}}
+# In patterns, '#' is a digit and '%' a non-zero digit starting a number
+BUILTIN_LOCALES = {
+    'fr': {'formats': {
+        'phone': ['(+33)%%#######'],
+        'mobile': ['(+33)6%#######', '(+33)7%#######'],
+    }},
+    'en-us': {'formats': {
+        'phone': ['(+1)%##%######'],
+    }},
+    'en-gb': {'formats': {
+        'phone': ['(+44)%#########'],
+        'mobile': ['(+44)7%########'],
+    }},
+    'de': {'formats': {
+        'phone': ['(+49)%#########'],
+        'mobile': ['(+49)15%########', '(+49)16%#######',
+                   '(+49)17%########'],
+    }},
+    'es': {'formats': {
+        'phone': ['(+34)9%#######'],
+        'mobile': ['(+34)6%#######', '(+34)7%#######'],
+    }},
+    'it': {'formats': {
+        'phone': ['(+39)0%########'],
+        'mobile': ['(+39)3%########'],
+    }},
+}
+
+# Created providers : locale -> Provider
+_providers = {}
+# Providers activated by use_locale()
+_active = []
+
+TOKENS = re.compile(r'%#*|#+|[^%#]+')
+
+
+class NumberFormat(object):
+    """ Compiled pattern : `parts` are literal strings and numbers
+        (lowest value, number of values, width), `tpl` formats values of
+        numbers with the % operator
+    """
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.parts = []
+        tpl = []
+        for token in TOKENS.findall(pattern):
+            if token[0] == '%':
+                digits = len(token) - 1
+                self.parts.append((10 ** digits, 9 * 10 ** digits, 1))
+                tpl.append('%d')
+            elif token[0] == '#':
+                self.parts.append((0, 10 ** len(token), len(token)))
+                tpl.append('%0{0}d'.format(len(token)))
+            else:
+                self.parts.append(token)
+                tpl.append(token)
+        self.tpl = ''.join(tpl)
+        self.numbers = [part for part in self.parts
+                        if not isinstance(part, basestring)]
+        self.cardinality = reduce(
+            lambda a, b: a * b, [span for low, span, w in self.numbers], 1)
+
+    def apply_many(self, n, rng):
+        """ Returns `n` values drawn with `rng` """
+        rand = rng.random
+        numbers = [(low, span) for low, span, width in self.numbers]
+        tpl = self.tpl
+        return [tpl % tuple([low + int(rand() * span)
+                             for low, span in numbers])
+                for i in xrange(n)]
+
+    def __repr__(self):
+        return '<NumberFormat: {0}>'.format(self.pattern)
+
+
+class Provider(object):
+    """ Corpora and formats of a locale. `formats` maps kinds of values
+        (e.g. 'phone') to patterns, `corpora` maps corpus names to a
+        sequence of words or the path of a corpus file : they are registered
+        as corpora '<name>.<locale>' (see djfaker.corpus)
+    """
+
+    def __init__(self, locale, formats=None, corpora=None):
+        self.locale = locale
+        self.formats = formats or {}
+        for name, words in (corpora or {}).items():
+            register_corpus('{0}.{1}'.format(name, locale), words)
+        self._compiled = {}
+        self._corpora = {}
+
+    def get_formats(self, *kinds):
+        """ Returns compiled formats (NumberFormat list) of the first of
+            `kinds` declared by the locale, or by the default locale
+        """
+        for kind in kinds:
+            if kind in self._compiled:
+                return self._compiled[kind]
+            if kind in self.formats:
+                compiled = [NumberFormat(p) for p in self.formats[kind]]
+                self._compiled[kind] = compiled
+                return compiled
+        if self.locale != DEFAULT_LOCALE:
+            return get_provider(DEFAULT_LOCALE).get_formats(*kinds)
+        raise KeyError(kinds)
+
+    def get_corpus(self, name):
+        """ Returns words of corpus `name` for the locale : corpus
+            '<name>.<locale>', '<name>.<language>', else `name`
+        """
+        if name not in self._corpora:
+            for candidate in get_candidates(self.locale):
+                localized = '{0}.{1}'.format(name, candidate)
+                if has_corpus(localized):
+                    break
+            else:
+                localized = name
+            self._corpora[name] = get_corpus(localized)
+        return self._corpora[name]
+
+    def __repr__(self):
+        return '<Provider: {0}>'.format(self.locale)
+
+
+def get_candidates(locale):
+    """ Returns `locale` ('de-ch'), then its language ('de') """
+    candidates = [locale]
+    if '-' in locale:
+        candidates.append(locale.split('-')[0])
+    return candidates
+
+
+def get_default_locale():
+    """ Returns DJFAKER_LOCALE, or the active language if it is None """
+    return DJFAKER_LOCALE or get_language() or DEFAULT_LOCALE
+
+
+def get_provider(locale=None):
+    """ Returns the Provider of `locale` (or of the default locale), created
+        on first use. A locale without declaration falls back to its
+        language, then to DEFAULT_LOCALE
+    """
+    locale = (locale or get_default_locale()).lower().replace('_', '-')
+    if locale in _providers:
+        return _providers[locale]
+    for candidate in get_candidates(locale):
+        if candidate in _providers:
+            provider = _providers[candidate]
+            break
+        builtin = BUILTIN_LOCALES.get(candidate)
+        declared = DJFAKER_LOCALES.get(candidate)
+        if builtin or declared:
+            formats = dict((builtin or {}).get('formats', {}))
+            formats.update((declared or {}).get('formats', {}))
+            provider = Provider(candidate, formats,
+                                (declared or {}).get('corpora'))
+            _providers[candidate] = provider
+            break
+    else:
+        provider = get_provider(DEFAULT_LOCALE)
+    _providers[locale] = provider
+    return provider
+
+
+def active_provider():
+    """ Returns the provider activated by use_locale(), or the one of the
+        default locale
+    """
+    if _active:
+        return _active[-1]
+    return get_provider()
+
+
+@contextmanager
+def use_locale(locale=None):
+    """ Activates the provider of `locale` (or of the default locale) """
+    provider = get_provider(locale)
+    _active.append(provider)
+    try:
+        yield provider
+    finally:
+        _active.pop()
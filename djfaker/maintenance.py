@@ -0,0 +1,199 @@
+""" Maintenance : sessions lifting per-row costs of faked tables.
+
+    While a faker runs, non-unique indexes on replaced columns are dropped
+    and triggers fired by updates of these columns are disabled (dropped
+    with SQLite), then they are rebuilt once, even if the run fails. Unique
+    indexes are kept : they guard values checked by the unicity engine.
+    The connection is also tuned for bulk writes (e.g. asynchronous commits
+    with PostgreSQL), then restored.
+
+    Indexes and triggers are found from models metadata (replaced fields and
+    their tables) and database catalogs, for PostgreSQL and SQLite. Other
+    databases only get tunings.
+"""
+import re
+
+from django.db import connections, router
+
+from .settings import DJFAKER_MAINTENANCE_TUNINGS
+from .writers import atomic, get_concrete_fields
+
+# Default tunings of connections : {vendor: {setting: value}}
+TUNINGS = {
+    'postgresql': {'synchronous_commit': 'off'},
+    'sqlite': {'synchronous': 'OFF'},
+}
+
+# Event and columns of a SQLite trigger
+SQLITE_TRIGGER_RE = re.compile(
+    r'\b(?:DELETE|INSERT|UPDATE(?:\s+OF\s+(?P<columns>.+?))?)\s+ON\s',
+    re.IGNORECASE | re.DOTALL)
+
+
+def get_tables(model, attrs):
+    """ Returns {table: columns} of fields of `model` matching `attrs` : with
+        multi-table inheritance, fields can be stored in parent tables
+    """
+    tables = {}
+    for field in get_concrete_fields(model, attrs):
+        tables.setdefault(field.model._meta.db_table, set()).add(field.column)
+    return tables
+
+
+def get_tunings(connection):
+    """ Returns tunings of `connection` : DJFAKER_MAINTENANCE_TUNINGS, or
+        TUNINGS by default
+    """
+    tunings = DJFAKER_MAINTENANCE_TUNINGS
+    if tunings is None:
+        tunings = TUNINGS
+    return tunings.get(connection.vendor, {})
+
+
+class MaintenanceSession(object):
+    """ Context manager dropping (or disabling) indexes and triggers of
+        `tables` ({table: replaced columns}) on `connection`, and applying
+        `tunings` ({setting: value}), until it exits.
+        Tunings are applied outside of transactions : some settings can not
+        be changed inside one (e.g. PRAGMA synchronous of SQLite)
+    """
+
+    def __init__(self, connection, tables, tunings=None):
+        self.connection = connection
+        self.tables = tables
+        self.tunings = tunings or {}
+        # Statements run on exit
+        self.restore = []
+        # Previous values of tunings, restored on exit
+        self.settings = []
+
+    def _quote(self, name):
+        return self.connection.ops.quote_name(name)
+
+    def _plan_postgresql(self, cursor, table, columns):
+        """ Returns (statements run on enter, statements run on exit) """
+        before, after = [], []
+        cursor.execute(
+            "SELECT i.indexrelid::regclass::text, "
+            "pg_get_indexdef(i.indexrelid) FROM pg_index i "
+            "WHERE i.indrelid = %s::regclass AND NOT i.indisunique "
+            "AND NOT EXISTS (SELECT 1 FROM pg_constraint c "
+            "WHERE c.conindid = i.indexrelid) "
+            "AND EXISTS (SELECT 1 FROM pg_attribute a "
+            "WHERE a.attrelid = i.indrelid "
+            "AND a.attnum = ANY(i.indkey::int2[]) AND a.attname = ANY(%s)) "
+            "ORDER BY 1",
+            [self._quote(table), list(columns)])
+        for name, definition in cursor.fetchall():
+            before.append('DROP INDEX {0}'.format(name))
+            after.append(definition)
+        # Update triggers (1 << 4), for any column or replaced ones
+        cursor.execute(
+            "SELECT t.tgname FROM pg_trigger t "
+            "WHERE t.tgrelid = %s::regclass AND NOT t.tgisinternal "
+            "AND t.tgenabled <> 'D' AND t.tgtype & 16 <> 0 "
+            "AND (array_length(t.tgattr::int2[], 1) IS NULL "
+            "OR EXISTS (SELECT 1 FROM pg_attribute a "
+            "WHERE a.attrelid = t.tgrelid "
+            "AND a.attnum = ANY(t.tgattr::int2[]) AND a.attname = ANY(%s))) "
+            "ORDER BY 1", [self._quote(table), list(columns)])
+        for name, in cursor.fetchall():
+            before.append('ALTER TABLE {0} DISABLE TRIGGER {1}'.format(
+                self._quote(table), self._quote(name)))
+            after.append('ALTER TABLE {0} ENABLE TRIGGER {1}'.format(
+                self._quote(table), self._quote(name)))
+        return before, after
+
+    def _plan_sqlite(self, cursor, table, columns):
+        """ Returns (statements run on enter, statements run on exit) """
+        before, after = [], []
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+            "AND tbl_name = %s AND sql IS NOT NULL ORDER BY name", [table])
+        for name, sql in cursor.fetchall():
+            if re.match(r'\s*CREATE\s+UNIQUE\s', sql, re.IGNORECASE):
+                continue
+            cursor.execute('PRAGMA index_info({0})'.format(self._quote(name)))
+            if columns.intersection(row[2] for row in cursor.fetchall()):
+                before.append('DROP INDEX {0}'.format(self._quote(name)))
+                after.append(sql)
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' "
+            "AND tbl_name = %s ORDER BY name", [table])
+        for name, sql in cursor.fetchall():
+            match = SQLITE_TRIGGER_RE.search(sql)
+            if not match or not match.group(0).upper().startswith('UPDATE'):
+                continue
+            names = match.group('columns')
+            if names and not columns.intersection(
+                    n.strip().strip('"`[]') for n in names.split(',')):
+                continue
+            before.append('DROP TRIGGER {0}'.format(self._quote(name)))
+            after.append(sql)
+        return before, after
+
+    def _get_setting(self, cursor, name):
+        vendor = self.connection.vendor
+        if vendor == 'postgresql':
+            cursor.execute('SELECT current_setting(%s)', [name])
+        elif vendor == 'mysql':
+            cursor.execute('SELECT @@SESSION.{0}'.format(name))
+        else:
+            cursor.execute('PRAGMA {0}'.format(name))
+        return cursor.fetchone()[0]
+
+    def _set_setting(self, cursor, name, value):
+        vendor = self.connection.vendor
+        if vendor == 'postgresql':
+            cursor.execute('SELECT set_config(%s, %s, false)',
+                           [name, unicode(value)])
+        elif vendor == 'mysql':
+            cursor.execute('SET SESSION {0} = %s'.format(name), [value])
+        else:
+            cursor.execute('PRAGMA {0} = {1}'.format(name, value))
+
+    def __enter__(self):
+        vendor = self.connection.vendor
+        plan = getattr(self, '_plan_%s' % vendor, None)
+        tunings = self.tunings
+        if vendor not in ('postgresql', 'mysql', 'sqlite'):
+            tunings = {}
+        if tunings:
+            cursor = self.connection.cursor()
+            for name, value in sorted(tunings.items()):
+                previous = self._get_setting(cursor, name)
+                self._set_setting(cursor, name, value)
+                self.settings.append((name, previous))
+        if not (plan and self.tables):
+            return self
+        with atomic(using=self.connection.alias):
+            cursor = self.connection.cursor()
+            for table, columns in sorted(self.tables.items()):
+                before, after = plan(cursor, table, set(columns))
+                for sql in before:
+                    cursor.execute(sql)
+                self.restore.extend(after)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        restore, self.restore = self.restore, []
+        settings, self.settings = self.settings, []
+        if restore:
+            with atomic(using=self.connection.alias):
+                cursor = self.connection.cursor()
+                for sql in restore:
+                    cursor.execute(sql)
+        if settings:
+            cursor = self.connection.cursor()
+            for name, value in settings:
+                self._set_setting(cursor, name, value)
+
+def maintenance_session(model, attrs, enabled=True):
+    """ Returns the MaintenanceSession of a faker of `model` replacing
+        `attrs`, doing nothing unless `enabled`
+    """
+    connection = connections[router.db_for_write(model)]
+    if not enabled:
+        return MaintenanceSession(connection, {})
+    return MaintenanceSession(connection, get_tables(model, attrs),
+                              get_tunings(connection))
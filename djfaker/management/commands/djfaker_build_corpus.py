@@ -0,0 +1,28 @@
+""" Build a corpus file (see djfaker.corpus) from text files """
+import codecs
+
+from django.core.management.base import BaseCommand, CommandError
+
+from djfaker.corpus import write_corpus
+
+
+class Command(BaseCommand):
+    """ Django command """
+    help = ('Build a corpus file from UTF-8 text files containing a word '
+            'by line')
+    args = '<corpus file> <text file> [<text file> ...]'
+
+    def _iter_words(self, paths):
+        for path in paths:
+            with codecs.open(path, encoding='utf-8') as lines:
+                for line in lines:
+                    yield line.strip()
+
+    def handle(self, output=None, *inputs, **options):
+        """ Django command handle function ... """
+        if not output or not inputs:
+            raise CommandError('Usage : djfaker_build_corpus {0}'.format(
+                self.args))
+        count = write_corpus(output, self._iter_words(inputs))
+        if int(options.get('verbosity', 1)) >= 1:
+            self.stdout.write('{0} : {1} word(s)'.format(output, count))
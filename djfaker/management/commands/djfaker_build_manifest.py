@@ -0,0 +1,23 @@
+""" Build the manifest (see djfaker.registry) of modules defining fakers """
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from djfaker.registry import write_manifest
+from djfaker.settings import DJFAKER_MANIFEST
+
+
+class Command(BaseCommand):
+    """ Django command """
+    help = ('Build the manifest listing modules defining fakers of installed '
+            'apps (DJFAKER_MANIFEST by default)')
+    args = '[<manifest file>]'
+
+    def handle(self, output=None, **options):
+        """ Django command handle function ... """
+        output = output or DJFAKER_MANIFEST
+        if not output:
+            raise CommandError('Usage : djfaker_build_manifest {0} (or set '
+                               'DJFAKER_MANIFEST)'.format(self.args))
+        count = write_manifest(output, settings.INSTALLED_APPS)
+        if int(options.get('verbosity', 1)) >= 1:
+            self.stdout.write('{0} : {1} faker(s)'.format(output, count))
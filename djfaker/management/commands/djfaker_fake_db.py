@@ -1,16 +1,26 @@
 """ Anonymize database for dev or demo instances of a django application """
-import sys
+import json
 from optparse import make_option
 
 from django.core.exceptions import ImproperlyConfigured
-from django.core.management.base import BaseCommand
-from django.utils.module_loading import module_has_submodule
+from django.core.management.base import BaseCommand, CommandError
 from django.utils.translation import activate
-from django.utils.importlib import import_module
 from django.conf import settings
 
-from djfaker.signals import pre_fake_all, post_fake_all
-from djfaker import ModelFaker
+from djfaker.signals import pre_fake_all, post_fake_all, \
+    post_fake_partition, post_fake_deletion, fake_progress
+from djfaker.profiling import format_summary
+from djfaker.planner import plan_run, format_plan
+from djfaker.scheduler import run_fakers
+from djfaker.journal import Journal
+from djfaker.registry import registry, discover, read_manifest
+from djfaker.settings import DJFAKER_JOURNAL, DJFAKER_BENCHMARKS, \
+    DJFAKER_MANIFEST
+
+# Options of the command given to fakers (see ModelFaker._run())
+FAKER_OPTIONS = ('no_dels', 'fast_deletion', 'batch_size', 'chunk_size',
+                 'partitions', 'pushdown', 'pipeline', 'rewrite',
+                 'maintenance', 'seed', 'incremental', 'progress', 'locale')
 
 
 def autodiscover_models(given_app=None, given_model=None):
@@ -22,23 +32,18 @@ def autodiscover_models(given_app=None, given_model=None):
     if given_model and not given_app:
         raise ImproperlyConfigured("If model is given, app must be given too ")
 
-    # Autodiscover fakers
+    # Autodiscover fakers (only modules listed by the manifest, if any)
     apps = given_app and [given_app] or settings.INSTALLED_APPS
-    for app in apps:
-        mod = import_module(app)
-        # Attempt to import the app's fakers module.
-        if module_has_submodule(mod, 'fakers'):
-            import_module('%s.fakers' % app)
+    discover(apps, read_manifest(DJFAKER_MANIFEST))
 
-    models = ModelFaker.__subclasses__()
+    if given_model:
+        return [registry.get('%s.fakers.%s' % (given_app, given_model))]
     if given_app:
-        module_fakers = getattr(sys.modules.get(given_app), 'fakers')
-        models = [m for m in models
-                  if m.__module__.startswith(module_fakers.__name__)]
-        if given_model:
-            models = [getattr(module_fakers, given_model)]
-
-    return models
+        models = registry.get_module_fakers('%s.fakers' % given_app)
+    else:
+        models = registry.get_all()
+    # Fakers declaring AUTODISCOVER = False are only run when they are given
+    return [m for m in models if m.__dict__.get('AUTODISCOVER', True)]
 
 
 class Command(BaseCommand):
@@ -51,18 +56,160 @@ class Command(BaseCommand):
         make_option(
             '--no-dels', action='store_true', dest='no_dels', default=False,
             help='Do not run deletions'),
+        make_option(
+            '--fast-deletion', action='store_true', dest='fast_deletion',
+            default=False,
+            help='Delete instances and their cascades with set-based '
+                 'statements, by chunks'),
+        make_option(
+            '--batch-size', action='store', type='int', dest='batch_size',
+            default=None,
+            help='Write faked instances by batches of BATCH_SIZE'),
+        make_option(
+            '--chunk-size', action='store', type='int', dest='chunk_size',
+            default=None,
+            help='Load instances to fake by chunks of CHUNK_SIZE'),
+        make_option(
+            '--jobs', action='store', type='int', dest='jobs', default=1,
+            help='Run independent fakers in JOBS processes'),
+        make_option(
+            '--partitions', action='store', type='int', dest='partitions',
+            default=None,
+            help='Split instances of each faker into PARTITIONS primary key '
+                 'ranges faked in parallel'),
+        make_option(
+            '--pushdown', action='store_true', dest='pushdown', default=False,
+            help='Run replacers which can be compiled to SQL in database'),
+        make_option(
+            '--pipeline', action='store_true', dest='pipeline',
+            default=False,
+            help='Read and write instances in threads while they are faked'),
+        make_option(
+            '--rewrite', action='store_true', dest='rewrite', default=False,
+            help='Rewrite whole tables with COPY (PostgreSQL), dropping '
+                 'instances to delete in the same pass'),
+        make_option(
+            '--maintenance', action='store_true', dest='maintenance',
+            default=False,
+            help='Drop indexes on replaced columns and disable update '
+                 'triggers while fakers run, and tune connections for bulk '
+                 'writes'),
+        make_option(
+            '--seed', action='store', dest='seed', default=None,
+            help='Make faked values reproducible : values of an instance '
+                 'only depend on SEED, its model and its primary key'),
+        make_option(
+            '--journal', action='store', dest='journal', default=None,
+            help='Record progress of fakers in JOURNAL file'),
+        make_option(
+            '--resume', action='store_true', dest='resume', default=False,
+            help='Resume the run recorded by the journal'),
+        make_option(
+            '--incremental', action='store_true', dest='incremental',
+            default=False,
+            help='Only fake instances changed since the last run recorded '
+                 'by the journal (fakers declaring a WATERMARK)'),
+        make_option(
+            '--profile', action='store_true', dest='profile', default=False,
+            help='Measure fakers and print a summary : throughput, time '
+                 'spent in each phase and by each replacer, retries, '
+                 'queries, peak memory'),
+        make_option(
+            '--profile-json', action='store', dest='profile_json',
+            default=None,
+            help='Measure fakers and write measures to PROFILE_JSON file'),
+        make_option(
+            '--progress', action='store', type='float', dest='progress',
+            default=None,
+            help='Report progress of fakers every PROGRESS seconds'),
+        make_option(
+            '--locale', action='store', dest='locale', default=None,
+            help='Fake values of LOCALE (corpora and formats of replacers)'),
+        make_option(
+            '--plan', action='store_true', dest='plan', default=False,
+            help='Print what fakers would do and estimate their time, '
+                 'without writing anything'),
+        make_option(
+            '--benchmarks', action='store', dest='benchmarks', default=None,
+            help='Estimate times of --plan from BENCHMARKS file '
+                 '(benchmark.py results)'),
     )
 
-    def handle(self, app=None, model=None, no_deps=False, no_dels=False,
-               *args, **options):
+    def _report_partition(self, sender, faked_model, partition, partitions,
+                          pk_range, count, **kwargs):
+        """ Writes progress of partitioned fakers """
+        self.stdout.write('{0} : partition {1}/{2} (pk {3} - {4}) : '
+                          '{5} instance(s) faked'.format(
+                              faked_model.__name__, partition + 1, partitions,
+                              pk_range[0], pk_range[1], count))
+
+    def _report_deletion(self, sender, faked_model, deleted, **kwargs):
+        """ Writes rows deleted by fast deletion """
+        for table, count in sorted(deleted.items()):
+            self.stdout.write('{0} : {1} row(s) deleted from {2}'.format(
+                faked_model.__name__, count, table))
+
+    def _report_progress(self, sender, faked_model, pk_range, count, rate,
+                         **kwargs):
+        """ Writes progress of running fakers """
+        name = faked_model.__name__
+        if pk_range is not None:
+            name = '{0} (pk {1} - {2})'.format(name, pk_range[0], pk_range[1])
+        self.stdout.write('{0} : {1} instance(s) faked ({2:.1f}/s)'.format(
+            name, count, rate))
+
+    def handle(self, app=None, model=None, **options):
         """ Django command handle function ... """
 
         activate(settings.LANGUAGE_CODE)
+        faker_options = dict((name, options[name]) for name in FAKER_OPTIONS
+                             if name in options)
+
+        if options.get('plan'):
+            plans = plan_run(autodiscover_models(app, model),
+                             options.get('no_deps'),
+                             options.get('benchmarks') or DJFAKER_BENCHMARKS,
+                             **faker_options)
+            for line in format_plan(plans):
+                self.stdout.write(line)
+            return
+
+        journal = options.get('journal') or DJFAKER_JOURNAL
+        if (options.get('resume') or options.get('incremental')) \
+                and not journal:
+            raise CommandError('--resume and --incremental need a journal '
+                               '(--journal or DJFAKER_JOURNAL)')
+        if journal:
+            journal = Journal(journal, options.get('resume'))
+
+        profile, profile_json = options.get('profile'), \
+            options.get('profile_json')
+        receivers = []
+        if int(options.get('verbosity', 1)) >= 1:
+            receivers.append((post_fake_partition, self._report_partition))
+            receivers.append((post_fake_deletion, self._report_deletion))
+        if options.get('progress'):
+            receivers.append((fake_progress, self._report_progress))
+        for signal, receiver in receivers:
+            signal.connect(receiver)
+
+        try:
+            faked_models = autodiscover_models(app, model)
+            pre_fake_all.send(None, faked_models=faked_models)
 
-        faked_models = autodiscover_models(app, model)
-        pre_fake_all.send(None, faked_models=faked_models)
+            profiles = run_fakers(faked_models, options.get('jobs') or 1,
+                                  options.get('no_deps'), journal=journal,
+                                  profile=bool(profile or profile_json),
+                                  **faker_options)
 
-        for model_faker in faked_models:
-            model_faker()._run(no_deps, no_dels)
+            post_fake_all.send(None, faked_models=faked_models)
+        finally:
+            for signal, receiver in receivers:
+                signal.disconnect(receiver)
 
-        post_fake_all.send(None, faked_models=faked_models)
+        if profile and profiles:
+            for line in format_summary(profiles):
+                self.stdout.write(line)
+        if profile_json:
+            with open(profile_json, 'w') as output:
+                json.dump(profiles, output, indent=2)
@@ -0,0 +1,181 @@
+""" Pipeline : overlaps reading, generation and writing of a faker run.
+
+    Instances are read by a reader thread, faked by the calling thread and
+    written by a writer thread, stages being connected by queues of `depth`
+    groups : database round trips of the reader and of the writer overlap
+    with generation, and memory is bounded by the queues. Threads have their
+    own database connections (and transactions).
+"""
+import sys
+from Queue import Queue, Empty, Full
+from threading import Thread, Event
+
+from django.db import connections
+
+# End of a stream of groups
+END = object()
+
+# Seconds a blocked stage waits before checking if the pipeline is stopped
+POLL_INTERVAL = 0.1
+
+
+class PipelineStopped(Exception):
+    """ Raised in a stage when another one failed """
+
+
+class Stage(Thread):
+    """ Thread running `target`, stopping the pipeline if it fails """
+
+    def __init__(self, target, stopped):
+        super(Stage, self).__init__()
+        self.daemon = True
+        self.target = target
+        self.stopped = stopped
+        self.error = None
+
+    def run(self):
+        try:
+            self.target()
+        except PipelineStopped:
+            pass
+        except BaseException:
+            self.error = sys.exc_info()
+            self.stopped.set()
+        finally:
+            # Connections opened by the thread
+            for connection in connections.all():
+                connection.close()
+
+
+class QueuedWriter(object):
+    """ Stands for `writer` in the generation stage : validated instances
+        are collected by groups, then written by the writer stage (drain())
+    """
+
+    def __init__(self, writer, profile):
+        self.writer = writer
+        self.profile = profile
+        self.items = []
+
+    def get_values(self, instance):
+        return self.writer.get_values(instance)
+
+    def set_values(self, instance, values):
+        self.writer.set_values(instance, values)
+
+    def write(self, instance, original=None):
+        self.items.append((instance, original))
+
+    def pop(self):
+        """ Returns collected (instance, original values) couples """
+        items, self.items = self.items, []
+        return items
+
+    def drain(self, items):
+        """ Writes `items` (pop() result) """
+        with self.profile.timer('write'):
+            for instance, original in items:
+                self.writer.write(instance, original)
+
+    def flush(self):
+        with self.profile.timer('write'):
+            self.writer.flush()
+
+
+class Sequential(object):
+    """ Runs stages one after another in the calling thread : iterating
+        yields groups of `source`, to be written by `target` (`writer`).
+        Exiting the `with` block flushes the writer
+    """
+
+    def __init__(self, source, writer, profile):
+        self.source = source
+        self.target = writer
+        self.profile = profile
+
+    def __enter__(self):
+        return self
+
+    def __iter__(self):
+        return iter(self.source)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            with self.profile.timer('write'):
+                self.target.flush()
+
+
+class Pipeline(object):
+    """ Reads groups of `source` in a reader thread : iterating yields them.
+        Instances written to `target` (a QueuedWriter) while a group is
+        faked are handed to `writer` in a writer thread when the next group
+        is requested. Exiting the `with` block waits for the writer, errors
+        of stages are raised in the calling thread
+    """
+
+    def __init__(self, source, writer, profile, depth=2):
+        self.source = source
+        self.target = QueuedWriter(writer, profile)
+        self.stopped = Event()
+        self.read = Queue(max(1, depth))
+        self.results = Queue(max(1, depth))
+        self.reading = Stage(self._read, self.stopped)
+        self.writing = Stage(self._write, self.stopped)
+
+    def _put(self, queue, item):
+        while True:
+            try:
+                return queue.put(item, True, POLL_INTERVAL)
+            except Full:
+                if self.stopped.is_set():
+                    raise PipelineStopped()
+
+    def _get(self, queue):
+        while True:
+            try:
+                return queue.get(True, POLL_INTERVAL)
+            except Empty:
+                if self.stopped.is_set():
+                    raise PipelineStopped()
+
+    def _read(self):
+        for group in self.source:
+            self._put(self.read, group)
+        self._put(self.read, END)
+
+    def _write(self):
+        while True:
+            items = self._get(self.results)
+            if items is END:
+                break
+            self.target.drain(items)
+        self.target.flush()
+
+    def __enter__(self):
+        self.reading.start()
+        self.writing.start()
+        return self
+
+    def __iter__(self):
+        while True:
+            group = self._get(self.read)
+            if group is END:
+                return
+            yield group
+            self._put(self.results, self.target.pop())
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self._put(self.results, END)
+                self.writing.join()
+        except PipelineStopped:
+            pass
+        finally:
+            self.stopped.set()
+            self.reading.join()
+            self.writing.join()
+        for stage in (self.reading, self.writing):
+            if stage.error and (exc_type is None
+                                or exc_type is PipelineStopped):
+                raise stage.error[0], stage.error[1], stage.error[2]
@@ -0,0 +1,297 @@
+""" Planner : estimates the cost of a run before touching the database.
+    Only counts rows and inspects models metadata and replacers : nothing
+    is written
+"""
+import json
+import os
+
+from django.db import connections, router
+
+from .deletion import plan_deletion
+from .locales import use_locale
+from .plans import NATIVE, get_attr_names
+from .scheduler import build_graph, sort_graph, get_faker_path
+from .settings import DJFAKER_MAX_TRIES, DJFAKER_BATCH_SIZE, \
+    DJFAKER_FAST_DELETION
+from .unicity import UnicityChecker
+from .writers import get_concrete_fields
+
+# Microseconds by value of builtin replacers : (apply(), apply_many()),
+# measured by benchmark.py --micro. Names are suffixed by '(unique)' for
+# unique replacers
+REPLACER_COSTS = {
+    'ChoiceReplacer': (0.8, 0.3),
+    'ChoiceUniqueReplacer': (6.0, 4.3),
+    'CompanyReplacer': (3.0, 1.6),
+    'EmailReplacer': (14.5, 2.0),
+    'EmailReplacer(unique)': (24.0, 11.8),
+    'PhoneReplacer': (3.4, 1.6),
+    'SerialReplacer': (2.5, 0.8),
+    'LazyEmailReplacer': (31.6, 13.0),
+    'LazyEmailReplacer(unique)': (45.3, 28.7),
+    'LazyUsernameReplacer': (32.8, 12.7),
+    'LazyUsernameReplacer(unique)': (39.1, 14.5),
+    # Hashes of distinct raw passwords (cached ones are much cheaper)
+    'LazyPasswordReplacer': (5760.0, 5760.0),
+    'LazyCompanyWebsiteReplacer': (19.8, 4.0),
+    'LazyCompanyEmailReplacer': (56.3, 36.3),
+    'TextReplacer': (1.8, 1.3),
+}
+
+# Microseconds by value of replacers which have not been measured
+UNMEASURED_COST = 50.0
+
+# Microseconds by written row (benchmark.py 'native' scenario, SQLite) :
+# one UPDATE by row, multi-row UPDATE, pushdown
+WRITE_COSTS = {
+    'row': 2400.0,
+    'batch': 46.0,
+    'pushdown': 2.0,
+}
+
+# Microseconds by deleted instance : collected by Django, fast deletion
+DELETION_COSTS = {
+    'collector': 500.0,
+    'fast': 50.0,
+}
+
+# Levels of risks
+EXHAUSTED, AT_RISK = 'exhausted', 'at risk'
+
+
+class Costs(object):
+    """ Microseconds used to estimate times : builtin costs, overriden by
+        measures of benchmark.py if a results file is loaded
+    """
+
+    def __init__(self, replacers=None, writes=None, deletions=None):
+        self.replacers = dict(REPLACER_COSTS, **(replacers or {}))
+        self.writes = dict(WRITE_COSTS, **(writes or {}))
+        self.deletions = dict(DELETION_COSTS, **(deletions or {}))
+
+    @classmethod
+    def load(cls, path, engine=None):
+        """ Returns costs measured by the last runs recorded in `path` (a
+            benchmark.py results file), on `engine` if given
+        """
+        records = {}
+        with open(path) as results:
+            for line in results:
+                record = json.loads(line)
+                if engine is None or record.get('engine') == engine:
+                    records[record.get('mode')] = record
+        replacers, writes = {}, {}
+        for result in records.get('micro', {}).get('results', []):
+            replacers[result['replacer']] = (result['apply'],
+                                             result['apply_many'])
+        for result in records.get('fakers', {}).get('results', []):
+            if result['scenario'] == 'native' and result['rows_per_second'] \
+                    and result['strategy'] in WRITE_COSTS:
+                writes[result['strategy']] = 1e6 / result['rows_per_second']
+        return cls(replacers, writes)
+
+    def get_replacer_cost(self, replacer, seeded=False):
+        """ Returns microseconds by value of `replacer` (or of its closest
+            measured base class). Seeded runs call apply() for each value
+        """
+        for klass in type(replacer).__mro__:
+            names = [klass.__name__]
+            if getattr(replacer, 'unique', False):
+                names.insert(0, '{0}(unique)'.format(klass.__name__))
+            for name in names:
+                if name in self.replacers:
+                    return self.replacers[name][0 if seeded else 1]
+        return UNMEASURED_COST
+
+
+class FakerPlan(object):
+    """ What a run of a faker would do :
+        - `deletion` : number of instances selected by QS_FOR_DELETION
+          (None if nothing is deleted), `cascades` : tables fast deletion
+          would delete or update (None if instances are collected by Django)
+        - `update` : number of instances selected by QS_FOR_UPDATE (before
+          deletion), `rows` : number of rows of the table
+        - `steps` : (attribute, kind, replacer name, True if pushed down)
+        - `risks` : (level, attribute names, message) of unique values
+          which would be exhausted or broken
+        - `estimate` : estimated time, in seconds
+    """
+
+    def __init__(self, faker):
+        self.faker = faker
+        self.path = get_faker_path(faker)
+        self.deletion = None
+        self.cascades = None
+        self.update = 0
+        self.rows = 0
+        self.writer = None
+        self.partitions = 1
+        self.steps = []
+        self.risks = []
+        self.estimate = 0.0
+
+
+def get_replacer_name(kind, replacer):
+    """ Returns name of the replacer (or builtin value) of a step """
+    if kind == NATIVE:
+        return repr(replacer)
+    return type(replacer).__name__
+
+
+def _get_risks(faker, plan, unicity, update, rows):
+    """ Returns risks of unique values : pools handing out less values
+        than instances to fake, unique constraints on fields whose replacers
+        generate less distinct values than rows (or too few to avoid
+        FakerUnicityError within DJFAKER_MAX_TRIES tries)
+    """
+    risks = []
+    cardinalities = {}
+    names = get_attr_names(faker.FAKER_FOR)
+    for attr, replacer, kind in plan:
+        name = names.get(attr, attr)
+        if kind == NATIVE:
+            cardinalities[name] = 1
+            continue
+        cardinality = replacer.get_cardinality()
+        cardinalities[name] = cardinality
+        if getattr(replacer, 'unique', False) and cardinality is not None:
+            # Values are distinct within the run
+            cardinalities[name] = None
+            if update > cardinality:
+                risks.append((EXHAUSTED, [name], (
+                    'pool of {0} value(s) exhausted by {1} instance(s)'
+                ).format(cardinality, update)))
+
+    for model_class, check in unicity.checks:
+        if any(cardinalities.get(name) is None for name in check):
+            # Fields which are not replaced, or unbounded values
+            continue
+        cardinality = 1
+        for name in check:
+            cardinality *= cardinalities[name]
+        if not rows:
+            continue
+        if rows > cardinality:
+            risks.append((EXHAUSTED, list(check), (
+                'unique constraint : {0} distinct value(s) for {1} row(s)'
+            ).format(cardinality, rows)))
+        elif update * (float(rows) / cardinality) ** DJFAKER_MAX_TRIES >= 1:
+            risks.append((AT_RISK, list(check), (
+                'unique constraint : {0} distinct value(s) for {1} row(s), '
+                'values may still be taken after {2} tries'
+            ).format(cardinality, rows, DJFAKER_MAX_TRIES)))
+    return risks
+
+
+def plan_faker(faker, costs=None, no_dels=False, batch_size=None,
+               partitions=None, pushdown=False, seed=None,
+               fast_deletion=False, locale=None, **options):
+    """ Returns the FakerPlan of `faker` run with `options` (see
+        ModelFaker._run()), from rows counts and `costs` (a Costs)
+    """
+    costs = costs or Costs()
+    instance = faker()
+    result = FakerPlan(faker)
+    connection = connections[router.db_for_write(faker.FAKER_FOR)]
+
+    if instance.QS_FOR_DELETION and not no_dels:
+        qs = instance.QS_FOR_DELETION()
+        result.deletion = qs.count()
+        deletion = None
+        if fast_deletion or faker.FAST_DELETION or DJFAKER_FAST_DELETION:
+            deletion = plan_deletion(qs.model)
+        if deletion is not None:
+            result.cascades = [model._meta.db_table
+                               for model in deletion.get_models()]
+        result.estimate += result.deletion * costs.deletions[
+            'fast' if deletion else 'collector'] / 1e6
+
+    plan = faker._plan
+    if not plan:
+        return result
+    result.update = instance._get_update_qs().count()
+    result.rows = faker.FAKER_FOR._default_manager.count()
+    unicity = UnicityChecker(faker.FAKER_FOR, get_concrete_fields(
+        faker.FAKER_FOR, [step.attr for step in plan]))
+    with use_locale(locale or faker.LOCALE):
+        result.risks = _get_risks(faker, plan, unicity, result.update,
+                                  result.rows)
+
+    seeded = instance._get_rng(seed) is not None
+    pushed = []
+    if (pushdown or faker.PUSHDOWN) and not seeded:
+        pushed = instance._plan_pushdown(plan, unicity)[0]
+    result.writer = 'batch' if (batch_size or faker.BATCH_SIZE
+                                or DJFAKER_BATCH_SIZE) else 'row'
+    result.partitions = partitions or faker.PARTITIONS or 1
+
+    micros = 0.0
+    for attr, replacer, kind in plan:
+        result.steps.append((attr, kind, get_replacer_name(kind, replacer),
+                             attr in pushed))
+        if attr not in pushed and kind != NATIVE:
+            micros += costs.get_replacer_cost(replacer, seeded)
+    if pushed:
+        micros += costs.writes['pushdown']
+    if len(pushed) < len(plan):
+        micros += costs.writes[result.writer]
+    seconds = result.update * micros / 1e6
+    if connection.vendor != 'sqlite':
+        # Partitions are faked in parallel
+        seconds /= result.partitions
+    result.estimate += seconds
+    return result
+
+
+def plan_run(fakers, no_deps=False, benchmarks=None, **options):
+    """ Returns FakerPlans of `fakers` (and of their dependencies unless
+        `no_deps`), in the order run_fakers() runs them. Times are estimated
+        from `benchmarks` (a benchmark.py results file) if given, else from
+        builtin costs
+    """
+    costs = Costs()
+    if benchmarks and os.path.exists(benchmarks):
+        costs = Costs.load(benchmarks, connections['default'].vendor)
+    graph = build_graph(fakers, not no_deps)
+    return [plan_faker(faker, costs, **options) for faker in sort_graph(graph)]
+
+
+def format_duration(seconds):
+    """ Returns `seconds` as a readable duration (e.g. 1h02m03s) """
+    if seconds < 60:
+        return '{0:.1f}s'.format(seconds)
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return '{0}h{1:02d}m{2:02d}s'.format(hours, minutes, seconds)
+    return '{0}m{1:02d}s'.format(minutes, seconds)
+
+
+def format_plan(plans):
+    """ Returns a report (list of lines) of `plans` (FakerPlans) """
+    lines = ['Plan : {0} faker(s), estimated time {1}'.format(
+        len(plans), format_duration(sum(p.estimate for p in plans)))]
+    for i, p in enumerate(plans):
+        opts = p.faker.FAKER_FOR._meta
+        lines.append('')
+        lines.append('{0}. {1} ({2}.{3})'.format(
+            i + 1, p.path, opts.app_label, opts.object_name))
+        if p.deletion is not None:
+            deletion = 'collected by Django'
+            if p.cascades is not None:
+                deletion = 'fast deletion of {0}'.format(', '.join(p.cascades))
+            lines.append('   Deletion : {0} instance(s), {1}'.format(
+                p.deletion, deletion))
+        if p.steps:
+            lines.append('   Update : {0} of {1} instance(s), {2} writes, '
+                         '{3} partition(s)'.format(p.update, p.rows, p.writer,
+                                                   p.partitions))
+        for attr, kind, name, pushed in p.steps:
+            lines.append('   {0} : {1} ({2}){3}'.format(
+                attr, kind, name, pushed and ', pushed down' or ''))
+        for level, names, message in p.risks:
+            lines.append('   ! {0} : {1} : {2}'.format(
+                ', '.join(names), level, message))
+        lines.append('   Estimated time : {0}'.format(
+            format_duration(p.estimate)))
+    return lines
@@ -0,0 +1,117 @@
+""" Plans : replacers of a faker, compiled once when the faker class is
+    created
+"""
+from collections import namedtuple
+from inspect import isroutine
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .replacers import BaseReplacer, SimpleReplacer, LazyReplacer
+
+# Kinds of steps, applied in this order
+NATIVE, SIMPLE, LAZY = 'native', 'simple', 'lazy'
+KINDS = (NATIVE, SIMPLE, LAZY)
+
+
+class Step(namedtuple('Step', ['attr', 'replacer', 'kind'])):
+    """ Replaces attribute `attr` of instances by `replacer` : a builtin
+        value (NATIVE kind), a SimpleReplacer or a LazyReplacer
+    """
+    __slots__ = ()
+
+
+def get_kind(value):
+    """ Returns kind of step replacing an attribute by `value`, or None
+        if `value` is not a replacer
+    """
+    if isinstance(value, SimpleReplacer):
+        return SIMPLE
+    if isinstance(value, LazyReplacer):
+        return LAZY
+    if isinstance(value, BaseReplacer) or isroutine(value):
+        return None
+    return NATIVE
+
+
+def get_attr_names(model):
+    """ Returns {attribute name: field name} for fields of `model` """
+    names = {}
+    for field in model._meta.fields + model._meta.many_to_many:
+        names[field.name] = names[field.attname] = field.name
+    return names
+
+
+def _sort_lazy(faker, steps, names):
+    """ Orders lazy `steps` so that replacers reading an attribute replaced
+        by another lazy replacer are applied after it.
+        Raises ImproperlyConfigured on circular dependencies
+    """
+    by_name = dict((names.get(s.attr, s.attr), s) for s in steps)
+    ordered, states = [], {}
+
+    def _visit(step, path):
+        states[step] = 1
+        for token in step.replacer.tokens:
+            dependency = by_name.get(names.get(token, token))
+            if dependency is None or dependency is step:
+                continue
+            if states.get(dependency) == 1:
+                cycle = path[path.index(dependency):] + [dependency]
+                raise ImproperlyConfigured(
+                    '%s : circular dependency between lazy replacers : %s'
+                    % (faker.__name__, ' -> '.join(s.attr for s in cycle)))
+            if dependency not in states:
+                _visit(dependency, path + [dependency])
+        states[step] = 2
+        ordered.append(step)
+
+    for step in steps:
+        if step not in states:
+            _visit(step, [step])
+    return ordered
+
+
+def compile_plan(faker, skipped=()):
+    """ Returns the plan of `faker` : a tuple of steps ordered by kind,
+        lazy replacers being applied after the attributes they read.
+        Attributes in `skipped` and private attributes are ignored.
+        If faker.FAKER_FOR is set, replaced attributes and tokens of lazy
+        replacers are checked against its fields (ImproperlyConfigured is
+        raised)
+    """
+    steps = dict((kind, []) for kind in KINDS)
+    for attr in dir(faker):
+        if attr in skipped or attr.startswith('_'):
+            continue
+        value = getattr(faker, attr)
+        kind = get_kind(value)
+        if kind:
+            steps[kind].append(Step(attr, value, kind))
+
+    model = faker.FAKER_FOR
+    names = {}
+    if model is not None:
+        names = get_attr_names(model)
+        for kind in KINDS:
+            for step in steps[kind]:
+                _check_attr(faker, model, names, step.attr)
+        for step in steps[LAZY]:
+            for token in step.replacer.tokens:
+                _check_attr(faker, model, names, token, step.attr)
+    steps[LAZY] = _sort_lazy(faker, steps[LAZY], names)
+    return tuple(steps[NATIVE] + steps[SIMPLE] + steps[LAZY])
+
+
+def _check_attr(faker, model, names, attr, replaced=None):
+    """ Raises ImproperlyConfigured if `attr` is not an attribute of
+        `model` instances (a field or a class attribute, like a property)
+    """
+    if attr in names or hasattr(model, attr):
+        return
+    if replaced:
+        raise ImproperlyConfigured(
+            "%s.%s : token '%s' is not a field of %s"
+            % (faker.__name__, replaced, attr, model.__name__))
+    raise ImproperlyConfigured(
+        "%s.%s : %s has no field '%s'"
+        % (faker.__name__, attr, model.__name__, attr))
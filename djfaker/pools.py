@@ -0,0 +1,196 @@
+""" Pools : unique values handed out once each by unique replacers """
+import random
+from operator import mul
+
+from .corpus import LazyCorpus
+from .exceptions import FakerPoolExhaustedError
+from .rng import derive_seed
+
+MASK_64 = (1 << 64) - 1
+
+
+def unique(values):
+    """ Returns `values` without duplicates, in the same order """
+    seen = set()
+    return tuple(v for v in values if not (v in seen or seen.add(v)))
+
+
+class ListPool(object):
+    """ Pool of the values of a list """
+
+    def __init__(self, values):
+        # Corpora are not copied
+        if not getattr(values, 'distinct', False):
+            values = tuple(values)
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def __repr__(self):
+        return '<ListPool: {0} values>'.format(len(self))
+
+
+class ProductPool(object):
+    """ Pool of the cartesian product of `sequences`, formatted by `tpl`.
+        Values are generated on demand from their index, so a pool of
+        millions of values is never materialized. Duplicates are removed
+        from sequences, except from corpora (which have none)
+    """
+
+    def __init__(self, sequences, tpl=None):
+        self.sequences = [
+            sequence if getattr(sequence, 'distinct', False)
+            else unique(sequence) for sequence in sequences]
+        self.tpl = tpl or ' '.join(
+            '{%d}' % i for i in range(len(self.sequences)))
+        self.size = reduce(mul, [len(s) for s in self.sequences], 1)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        parts = []
+        # Index is decoded as a mixed radix number
+        for sequence in reversed(self.sequences):
+            index, i = divmod(index, len(sequence))
+            parts.append(sequence[i])
+        parts.reverse()
+        return self.tpl.format(*parts)
+
+    def __repr__(self):
+        return '<ProductPool: {0} values of {1!r}>'.format(
+            self.size, self.tpl)
+
+
+def number_suffix(n):
+    """ Returns suffix number `n` : no suffix for 0, then '.1', '.2', ... """
+    return '.%d' % n if n else ''
+
+
+def number_suffixes(n):
+    """ Returns the first `n` suffixes """
+    return [number_suffix(i) for i in xrange(n)]
+
+
+def name_pool(suffixes=('', ), tpl='{0} {1}{2}'):
+    """ Returns a pool of full names : first names x last names corpora
+        x `suffixes`
+    """
+    return ProductPool([LazyCorpus('first_names'), LazyCorpus('last_names'),
+                        suffixes], tpl)
+
+
+class Permutation(object):
+    """ Lazy Fisher-Yates shuffle of range(`size`) : each index is drawn
+        in constant time, and memory only grows with drawn indexes
+    """
+
+    def __init__(self, size, rng=random):
+        self.size = size
+        self.rng = rng
+        self.position = 0
+        # Swapped indexes : position -> index (identity if missing)
+        self.swaps = {}
+
+    def next(self):
+        i = self.position
+        if i >= self.size:
+            raise StopIteration
+        j = i + int(self.rng.random() * (self.size - i))
+        index = self.swaps.get(j, j)
+        if j != i:
+            self.swaps[j] = self.swaps.get(i, i)
+        self.swaps.pop(i, None)
+        self.position += 1
+        return index
+
+    def __iter__(self):
+        return self
+
+
+class KeyedPermutation(object):
+    """ Bijection of range(`size`) chosen by `key` : a Feistel network on
+        the smallest even number of bits covering `size`, walking cycles
+        until an index lower than `size` is found. Any index is permuted
+        in constant time and memory
+    """
+    ROUNDS = 4
+
+    def __init__(self, size, key):
+        self.size = size
+        bits = max(2, (size - 1).bit_length())
+        self.half = (bits + 1) // 2
+        self.mask = (1 << self.half) - 1
+        self.keys = [derive_seed(key, i) for i in range(self.ROUNDS)]
+
+    def _round(self, value, key):
+        value = ((value ^ key) * 0x9E3779B97F4A7C15) & MASK_64
+        value ^= value >> 32
+        value = (value * 0xBF58476D1CE4E5B9) & MASK_64
+        return (value ^ (value >> 29)) & self.mask
+
+    def _encrypt(self, index):
+        left, right = index >> self.half, index & self.mask
+        for key in self.keys:
+            left, right = right, left ^ self._round(right, key)
+        return (left << self.half) | right
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        index = self._encrypt(index)
+        while index >= self.size:
+            index = self._encrypt(index)
+        return index
+
+
+class PoolCursor(object):
+    """ Hands out each value of `pool` once : in a random order if
+        `shuffle` (along a lazy Fisher-Yates permutation), along the
+        permutation chosen by `key` if given (constant memory), else from
+        the last value to the first one (like list.pop()).
+        With a `partition` (djfaker.rng.Partition), only its share of this
+        order (a slice sized by its number of rows) is handed out : cursors
+        of the partitions of a run never hand out the same value (a
+        shuffled order must then be chosen by `key`)
+    """
+
+    def __init__(self, pool, shuffle=False, rng=random, key=None,
+                 partition=None):
+        self.pool = pool
+        self.total = len(pool)
+        self.start, stop = partition.slice(self.total) if partition \
+            else (0, self.total)
+        self.size = stop - self.start
+        self.drawn = 0
+        self.permutation = self.keyed = None
+        if key is not None:
+            self.keyed = KeyedPermutation(self.total, key)
+        elif shuffle:
+            if partition:
+                raise ValueError('Partitions need a keyed permutation')
+            self.permutation = Permutation(self.total, rng)
+
+    def draw(self, n=1):
+        """ Returns `n` values, or raises a FakerPoolExhaustedError (no
+            value is drawn) if less than `n` values are left
+        """
+        if n > self.size - self.drawn:
+            raise FakerPoolExhaustedError(
+                self.size, self.drawn, n, repr(self.pool))
+        positions = xrange(self.start + self.drawn,
+                           self.start + self.drawn + n)
+        if self.keyed:
+            indexes = [self.keyed[p] for p in positions]
+        elif self.permutation:
+            indexes = [self.permutation.next() for i in xrange(n)]
+        else:
+            indexes = [self.total - 1 - p for p in positions]
+        self.drawn += n
+        return [self.pool[i] for i in indexes]
@@ -0,0 +1,248 @@
+""" Profiling : time, throughput, queries and memory of fakers runs """
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.util import CursorWrapper
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+# Phases of a faker run
+PHASES = ('deletion', 'pushdown', 'generation', 'unicity', 'write')
+
+# Started profiles : queries are counted by the last one
+_active = []
+# Connection alias -> use_debug_cursor value before counting queries
+_saved = {}
+
+
+def get_peak_memory():
+    """ Returns peak memory (resident set size, in kB) of the process """
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class Timer(object):
+    """ Adds time spent in a `with` block to `times`[`key`] """
+    __slots__ = ('times', 'key', 'start')
+
+    def __init__(self, times, key):
+        self.times = times
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.time()
+
+    def __exit__(self, *exc_info):
+        self.times[self.key] = (self.times.get(self.key, 0.0)
+                                + time.time() - self.start)
+
+
+class NullTimer(object):
+    """ Timer measuring nothing """
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+class CountingCursor(object):
+    """ Cursor wrapper counting executed statements in the last started
+        profile
+    """
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def execute(self, *args, **kwargs):
+        if _active:
+            _active[-1].queries += 1
+        return self.cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        if _active:
+            _active[-1].queries += 1
+        return self.cursor.executemany(*args, **kwargs)
+
+    def __getattr__(self, attr):
+        return getattr(self.cursor, attr)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+
+def _count_queries(connection):
+    """ Makes cursors of `connection` count queries """
+    debug = connection.use_debug_cursor or (
+        connection.use_debug_cursor is None and settings.DEBUG)
+    make_debug_cursor = connection.make_debug_cursor
+    _saved[connection.alias] = connection.use_debug_cursor
+
+    def _make_cursor(cursor):
+        if debug:
+            cursor = make_debug_cursor(cursor)
+        else:
+            cursor = CursorWrapper(cursor, connection)
+        return CountingCursor(cursor)
+    connection.make_debug_cursor = _make_cursor
+    connection.use_debug_cursor = True
+
+
+def _stop_counting_queries(connection):
+    if connection.alias in _saved:
+        connection.__dict__.pop('make_debug_cursor', None)
+        connection.use_debug_cursor = _saved.pop(connection.alias)
+
+
+class FakerProfile(object):
+    """ Measures a faker run : instances (written, or skipped because their
+        values did not change), retries, queries, time spent in each phase
+        and by each replacer, peak memory
+    """
+    enabled = True
+
+    def __init__(self, faker):
+        # Dotted path of the faker
+        self.faker = faker
+        self.rows = 0
+        self.written = 0
+        self.skipped = 0
+        self.retries = 0
+        self.queries = 0
+        self.total = 0.0
+        self.peak_memory = 0
+        # phase -> seconds, replaced attribute -> seconds
+        self.phases = {}
+        self.replacers = {}
+
+    def timer(self, phase):
+        """ Returns a context manager measuring time spent in `phase` """
+        return Timer(self.phases, phase)
+
+    def replacer_timer(self, attr):
+        """ Returns a context manager measuring time spent by the replacer
+            of `attr`
+        """
+        return Timer(self.replacers, attr)
+
+    def start(self):
+        """ Starts counting time and queries run on every connection (by
+            this profile only, until it is stopped or another one started)
+        """
+        self.started = time.time()
+        if not _active:
+            for connection in connections.all():
+                _count_queries(connection)
+        _active.append(self)
+
+    def stop(self):
+        """ Stops counting, records total time and peak memory """
+        _active.remove(self)
+        if not _active:
+            for connection in connections.all():
+                _stop_counting_queries(connection)
+        self.total += time.time() - self.started
+        self.peak_memory = max(self.peak_memory, get_peak_memory())
+
+    def merge(self, data):
+        """ Adds measures of another process (as_dict() result) """
+        self.rows += data['rows']
+        self.written += data.get('written', 0)
+        self.skipped += data.get('skipped', 0)
+        self.retries += data['retries']
+        self.queries += data['queries']
+        self.peak_memory = max(self.peak_memory, data['peak_memory'])
+        for times, other in ((self.phases, data['phases']),
+                             (self.replacers, data['replacers'])):
+            for key, value in other.items():
+                times[key] = times.get(key, 0.0) + value
+
+    def as_dict(self):
+        return {
+            'faker': self.faker,
+            'rows': self.rows,
+            'rows_per_second': self.total and self.rows / self.total or 0.0,
+            'written': self.written,
+            'skipped': self.skipped,
+            'retries': self.retries,
+            'queries': self.queries,
+            'total': self.total,
+            'peak_memory': self.peak_memory,
+            'phases': dict(self.phases),
+            'replacers': dict(self.replacers),
+        }
+
+
+class NullProfile(FakerProfile):
+    """ Profile measuring nothing, used when profiling is disabled.
+        Counters stay at 0 : it is shared by fakers which are not profiled
+    """
+    enabled = False
+    faker = None
+    rows = written = skipped = retries = queries = peak_memory = 0
+    total = 0.0
+
+    def __init__(self):
+        pass
+
+    def __setattr__(self, name, value):
+        pass
+
+    def timer(self, phase):
+        return NULL_TIMER
+
+    def replacer_timer(self, attr):
+        return NULL_TIMER
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def as_dict(self):
+        return None
+
+
+def format_summary(profiles):
+    """ Returns a table (list of lines) summarizing `profiles` (as_dict()
+        results) : one line by faker, then time spent by each replacer
+    """
+    columns = ('Faker', 'Rows', 'Rows/s', 'Written', 'Skipped',
+               'Total') + tuple(
+        p.capitalize() for p in PHASES) + ('Retries', 'Queries', 'Peak MB')
+    rows = []
+    for p in profiles:
+        rows.append((p['faker'].rsplit('.', 1)[-1], str(p['rows']),
+                     '%.1f' % p['rows_per_second'], str(p['written']),
+                     str(p['skipped']), '%.2fs' % p['total'])
+                    + tuple('%.2fs' % p['phases'].get(phase, 0.0)
+                            for phase in PHASES)
+                    + (str(p['retries']), str(p['queries']),
+                       '%.1f' % (p['peak_memory'] / 1024.0)))
+    widths = [max(len(row[i]) for row in [columns] + rows)
+              for i in range(len(columns))]
+    lines = ['  '.join(value.ljust(width) if not i else value.rjust(width)
+                       for i, (value, width) in enumerate(zip(row, widths)))
+             for row in [columns] + rows]
+    lines.insert(1, '  '.join('-' * width for width in widths))
+
+    replacers = [(seconds, '{0}.{1}'.format(p['faker'].rsplit('.', 1)[-1],
+                                            attr))
+                 for p in profiles for attr, seconds in p['replacers'].items()]
+    if replacers:
+        lines.append('')
+        lines.append('Replacers :')
+        for seconds, name in sorted(replacers, reverse=True):
+            lines.append('  {0} : {1:.2f}s'.format(name, seconds))
+    return lines
@@ -0,0 +1,239 @@
+""" Pseudonyms : consistent fake values, an original value getting the same
+    fake value wherever it appears (e.g. an email in users, invoices and
+    logs tables), so that joins on faked values still work.
+
+    Pseudonyms of a namespace are kept in a LRU cache shared by the
+    replacers of a process (see replacers.PseudonymReplacer). They can be
+    recorded by a store (a SQLite file or a database table) shared by
+    processes and runs : the cache then only keeps recently used ones.
+    Stores index digests of original values, which are never recorded.
+"""
+import json
+import os
+import sqlite3
+from collections import OrderedDict
+from hashlib import md5
+
+from django.db import connections
+from django.utils.encoding import smart_str
+
+from .settings import DJFAKER_PSEUDONYM_CACHE_SIZE, DJFAKER_PSEUDONYM_FILE, \
+    DJFAKER_PSEUDONYM_DATABASE
+from .writers import atomic
+
+# Table recording pseudonyms (in a store file, or in a database)
+TABLE = 'djfaker_pseudonym'
+CREATE_TABLE = ('CREATE TABLE IF NOT EXISTS {0} ('
+                'namespace VARCHAR(100) NOT NULL, '
+                'digest CHAR(32) NOT NULL, '
+                'fake TEXT NOT NULL, '
+                'PRIMARY KEY (namespace, digest))').format(TABLE)
+
+# Number of original values looked up by a single query
+LOOKUP_SIZE = 500
+
+# Process-wide cache, created on first use
+_cache = None
+
+
+def get_digest(original):
+    """ Returns the digest identifying `original` (a unicode string) """
+    return md5(smart_str(original)).hexdigest()
+
+
+class BaseStore(object):
+    """ Records pseudonyms out of memory, fake values being encoded in
+        JSON. Subclasses give a DB-API cursor (_get_cursor()) and the
+        transaction writes are run in (_get_transaction())
+    """
+    # Parameters placeholder of the cursor
+    param = '%s'
+    # Vendor of the database (SQL dialect of inserts ignoring duplicates)
+    vendor = 'sqlite'
+
+    def _get_cursor(self):
+        raise NotImplementedError
+
+    def _get_transaction(self):
+        raise NotImplementedError
+
+    def _get_insert_sql(self):
+        sql = 'INSERT INTO {0} (namespace, digest, fake) VALUES ({1})'.format(
+            TABLE, ', '.join([self.param] * 3))
+        if self.vendor == 'sqlite':
+            return sql.replace('INSERT', 'INSERT OR IGNORE', 1)
+        if self.vendor == 'postgresql':
+            return sql + ' ON CONFLICT DO NOTHING'
+        if self.vendor == 'mysql':
+            return sql.replace('INSERT', 'INSERT IGNORE', 1)
+        return sql
+
+    def get_many(self, namespace, originals):
+        """ Returns {original: fake value} of recorded `originals` """
+        digests = dict((get_digest(o), o) for o in originals)
+        keys = list(digests)
+        cursor = self._get_cursor()
+        found = {}
+        for i in range(0, len(keys), LOOKUP_SIZE):
+            chunk = keys[i:i + LOOKUP_SIZE]
+            cursor.execute(
+                'SELECT digest, fake FROM {0} WHERE namespace = {1} '
+                'AND digest IN ({2})'.format(
+                    TABLE, self.param, ', '.join([self.param] * len(chunk))),
+                [namespace] + chunk)
+            for digest, fake in cursor.fetchall():
+                found[digests[digest]] = json.loads(fake)
+        return found
+
+    def add_many(self, namespace, mapping):
+        """ Records `mapping` ({original: fake value}). Originals recorded
+            meanwhile (by another process) keep their fake value : returns
+            recorded mapping
+        """
+        rows = [(namespace, get_digest(original), json.dumps(fake))
+                for original, fake in mapping.items()]
+        if self.vendor not in ('sqlite', 'postgresql', 'mysql'):
+            # No insert ignoring duplicates
+            recorded = set(get_digest(o) for o in self.get_many(
+                namespace, list(mapping)))
+            rows = [row for row in rows if row[1] not in recorded]
+        with self._get_transaction():
+            cursor = self._get_cursor()
+            cursor.executemany(self._get_insert_sql(), rows)
+            inserted = cursor.rowcount
+        if inserted == len(mapping):
+            return mapping
+        return self.get_many(namespace, list(mapping))
+
+    def clear(self, namespace=None):
+        """ Forgets pseudonyms of `namespace`, or all of them """
+        with self._get_transaction():
+            cursor = self._get_cursor()
+            if namespace is None:
+                cursor.execute('DELETE FROM {0}'.format(TABLE))
+            else:
+                cursor.execute('DELETE FROM {0} WHERE namespace = {1}'.format(
+                    TABLE, self.param), [namespace])
+
+
+class FileStore(BaseStore):
+    """ Pseudonyms recorded in a SQLite file, which processes (and runs)
+        can share : each process opens its own connection
+    """
+    param = '?'
+
+    def __init__(self, path, timeout=60):
+        self.path = path
+        self.timeout = timeout
+        self._connection = None
+        self._pid = None
+
+    def _get_connection(self):
+        if self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, self.timeout)
+            self._connection.execute(CREATE_TABLE)
+            self._connection.commit()
+            self._pid = os.getpid()
+        return self._connection
+
+    def _get_cursor(self):
+        return self._get_connection().cursor()
+
+    def _get_transaction(self):
+        # Connections commit (or rollback) on exit
+        return self._get_connection()
+
+    def __repr__(self):
+        return '<FileStore: {0}>'.format(self.path)
+
+
+class DatabaseStore(BaseStore):
+    """ Pseudonyms recorded in a table of database `using`, created on first
+        use. Writes are run in their own transaction
+    """
+
+    def __init__(self, using='default'):
+        self.using = using
+        self.vendor = connections[using].vendor
+        self._created = False
+
+    def _get_cursor(self):
+        cursor = connections[self.using].cursor()
+        if not self._created:
+            with atomic(using=self.using):
+                cursor.execute(CREATE_TABLE)
+            self._created = True
+        return cursor
+
+    def _get_transaction(self):
+        return atomic(using=self.using)
+
+    def __repr__(self):
+        return '<DatabaseStore: {0}>'.format(self.using)
+
+
+class PseudonymCache(object):
+    """ Cache of fake values keyed on (namespace, original value), in front
+        of an optional `store`. With a store, only `size` least recently
+        used values are kept in memory (the others are found again in the
+        store), else all of them are kept
+    """
+
+    def __init__(self, size=None, store=None):
+        self.size = size
+        self.store = store
+        self.values = OrderedDict()
+
+    def get_many(self, namespace, originals, generate):
+        """ Returns {original: fake value} of `originals` (distinct
+            unicode strings). Fake values of originals which are not mapped
+            yet are generated by `generate(originals)` (returning a value
+            for each one) and recorded
+        """
+        values = self.values
+        found, missing = {}, []
+        for original in originals:
+            value = values.pop((namespace, original), values)
+            if value is values:
+                missing.append(original)
+            else:
+                found[original] = value
+        if missing and self.store:
+            found.update(self.store.get_many(namespace, missing))
+            missing = [original for original in missing
+                       if original not in found]
+        if missing:
+            generated = dict(zip(missing, generate(missing)))
+            if self.store:
+                generated = self.store.add_many(namespace, generated)
+            found.update(generated)
+        for original in originals:
+            # Most recently used values are the last ones
+            values[(namespace, original)] = found[original]
+        if self.store and self.size:
+            while len(values) > self.size:
+                values.popitem(last=False)
+        return found
+
+    def clear(self):
+        """ Forgets pseudonyms kept in memory """
+        self.values.clear()
+
+
+def get_store():
+    """ Returns the store of DJFAKER_PSEUDONYM_FILE or
+        DJFAKER_PSEUDONYM_DATABASE, or None
+    """
+    if DJFAKER_PSEUDONYM_FILE:
+        return FileStore(DJFAKER_PSEUDONYM_FILE)
+    if DJFAKER_PSEUDONYM_DATABASE:
+        return DatabaseStore(DJFAKER_PSEUDONYM_DATABASE)
+    return None
+
+
+def get_cache():
+    """ Returns the process-wide PseudonymCache, created on first use """
+    global _cache
+    if _cache is None:
+        _cache = PseudonymCache(DJFAKER_PSEUDONYM_CACHE_SIZE, get_store())
+    return _cache
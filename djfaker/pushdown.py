@@ -0,0 +1,257 @@
+""" Pushdown : fakes columns with UPDATE statements run by the database,
+    without loading instances, for replacers which can be compiled to SQL
+"""
+from string import Formatter
+
+from django.db.models.sql.where import Constraint, ExtraWhere
+
+from .writers import atomic, get_max_params
+
+# Backends on which replacers can be compiled to SQL
+SUPPORTED_VENDORS = ('postgresql', 'sqlite')
+
+# Temporary table storing primary keys of instances to fake
+PKS_TABLE = 'djfaker_pushdown_pks'
+
+# Primary keys updated by each statement when parameters are not limited
+CHUNK_SIZE = 1000
+
+# Fields whose columns can be concatenated without cast
+TEXT_FIELDS = ('CharField', 'TextField', 'SlugField', 'EmailField')
+
+
+def random_index_sql(connection, n):
+    """ Returns a SQL expression of a random integer in [0, n[,
+        evaluated for each row
+    """
+    if connection.vendor == 'postgresql':
+        return 'CAST(floor(random() * {0}) AS integer)'.format(n)
+    # SQLite random() returns a 64 bits signed integer
+    # ('%%' because SQL is given to cursor.execute() with parameters)
+    return '(abs(random()) %% {0})'.format(n)
+
+
+def random_hex_sql(connection):
+    """ Returns a SQL expression of 32 random uppercase hexadecimal chars """
+    if connection.vendor == 'postgresql':
+        return 'upper(md5(CAST(random() AS text)))'
+    return 'hex(randomblob(16))'
+
+
+def random_digits_sql(connection, n):
+    """ Returns a SQL expression of `n` random decimal digits """
+    digit = random_index_sql(connection, 10)
+    if connection.vendor == 'postgresql':
+        digit = 'CAST({0} AS text)'.format(digit)
+    return concat_sql([digit] * n)
+
+
+def choice_sql(connection, values):
+    """ Returns (sql, params) of a value randomly picked in `values` """
+    whens = ' '.join('WHEN {0} THEN %s'.format(i)
+                     for i in range(len(values)))
+    sql = 'CASE {0} {1} END'.format(
+        random_index_sql(connection, len(values)), whens)
+    return sql, list(values)
+
+
+def random_case_sql(connection, expressions):
+    """ Returns (sql, params) of one of `expressions` ((sql, params) list)
+        randomly picked for each row
+    """
+    if len(expressions) == 1:
+        return expressions[0]
+    whens, params = [], []
+    for i, (sql, expression_params) in enumerate(expressions):
+        whens.append('WHEN {0} THEN {1}'.format(i, sql))
+        params.extend(expression_params)
+    sql = 'CASE {0} {1} END'.format(
+        random_index_sql(connection, len(expressions)), ' '.join(whens))
+    return sql, params
+
+
+def concat_sql(parts):
+    """ Returns a SQL concatenation of `parts` """
+    return '({0})'.format(' || '.join(parts))
+
+
+def number_format_sql(connection, parts):
+    """ Returns (sql, params) of a value of a number format (parts of a
+        djfaker.locales.NumberFormat), or None if a number is zero-padded
+    """
+    sqls, params = [], []
+    for part in parts:
+        if isinstance(part, basestring):
+            sqls.append('%s')
+            params.append(part)
+            continue
+        low, span, width = part
+        if width > 1:
+            return None
+        sqls.append('({0} + {1})'.format(
+            low, random_index_sql(connection, span)))
+    return concat_sql(sqls), params
+
+
+def format_sql(model, connection, tpl, tokens):
+    """ Returns (sql, params) of `tpl`.format(*`tokens`), or None if `tpl`
+        can not be compiled : tokens must be text columns of `model` table,
+        replacement fields can not have format specs or conversions
+    """
+    qn = connection.ops.quote_name
+    columns = {}
+    for field in model._meta.local_fields:
+        if field.get_internal_type() in TEXT_FIELDS:
+            columns[field.name] = qn(field.column)
+
+    parts, params = [], []
+    auto_index = 0
+    for literal, name, spec, conversion in Formatter().parse(tpl):
+        if literal:
+            parts.append('%s')
+            params.append(literal)
+        if name is None:
+            continue
+        if spec or conversion:
+            return None
+        if name == '':
+            name = str(auto_index)
+            auto_index += 1
+        if not name.isdigit() or int(name) >= len(tokens) \
+                or tokens[int(name)] not in columns:
+            return None
+        parts.append(columns[tokens[int(name)]])
+    if not parts:
+        return '%s', ['']
+    return concat_sql(parts), params
+
+
+def is_supported(connection):
+    """ Returns True if replacers can be compiled for `connection` """
+    return connection.vendor in SUPPORTED_VENDORS
+
+
+def _iter_where_columns(node):
+    """ Yields (table alias, column) couples read by `node` (a WhereNode).
+        Raw SQL conditions (extra()) are yielded as (None, sql)
+    """
+    for child in node.children:
+        if hasattr(child, 'children'):
+            for column in _iter_where_columns(child):
+                yield column
+        elif isinstance(child, ExtraWhere):
+            for sql in child.sqls:
+                yield None, sql
+        elif isinstance(child, tuple):
+            # (Constraint or (alias, column, type), lookup, annotation, value)
+            lvalue = child[0]
+            if isinstance(lvalue, Constraint):
+                yield lvalue.alias, lvalue.col
+            elif isinstance(lvalue, tuple):
+                yield lvalue[:2]
+        elif hasattr(child, 'lhs'):
+            # Lookup of Django >= 1.7
+            yield getattr(child.lhs, 'alias', None), \
+                getattr(getattr(child.lhs, 'target', None), 'column', None)
+
+
+def get_filtered_fields(model, connection, qs):
+    """ Returns names of `model` fields whose column is read by the WHERE
+        clause of `qs` (read from its nodes : columns of joined tables are
+        not matched, raw conditions are searched for quoted column names)
+    """
+    table = model._meta.db_table
+    qn = connection.ops.quote_name
+    columns = set()
+    for alias, column in _iter_where_columns(qs.query.where):
+        if alias == table:
+            columns.add(column)
+        elif alias is None:
+            columns.update(f.column for f in model._meta.fields
+                           if qn(f.column) in column or f.column in column)
+    return [f.name for f in model._meta.fields if f.column in columns]
+
+
+def _split(stages, max_params, reserved):
+    """ Splits `stages` into statements binding at most `max_params`
+        parameters, `reserved` being bound by the WHERE clause
+    """
+    statements = []
+    for assignments in stages:
+        statements.append([])
+        count = reserved
+        for assignment in assignments:
+            count += len(assignment[2])
+            if max_params and count > max_params and statements[-1]:
+                statements.append([])
+                count = reserved + len(assignment[2])
+            statements[-1].append(assignment)
+    return statements
+
+
+def run_pushdown(model, connection, qs, stages):
+    """ Runs UPDATE statements on instances of `qs`.
+        `stages` is a list of assignments lists run one after another, each
+        assignment being a (field, sql, params) tuple. Columns of a stage
+        are updated by a single statement unless they bind too many
+        parameters.
+        If several statements are needed, primary keys of `qs` are first
+        stored (in a temporary table with PostgreSQL, also dropped if a
+        statement fails) : updated columns could change `qs`. With SQLite,
+        where DDL would commit current transaction, primary keys are read
+        by chunks (in their order, after the last one read) and each chunk
+        is updated by all statements.
+        Returns number of updated rows
+    """
+    qn = connection.ops.quote_name
+    pk = model._meta.pk
+    cursor = connection.cursor()
+    subquery, where_params = qs.order_by().values_list('pk').query \
+        .get_compiler(connection=connection).as_sql()
+
+    max_params = get_max_params(connection)
+
+    statements = _split(stages, max_params, len(where_params))
+    updates = []
+    for statement in statements:
+        sets, params = [], []
+        for field, sql, field_params in statement:
+            sets.append('{0} = {1}'.format(qn(field.column), sql))
+            params.extend(field_params)
+        # Completed by the WHERE clause of the instances to update
+        updates.append(('UPDATE {0} SET {1} WHERE {2} IN ('.format(
+            qn(model._meta.db_table), ', '.join(sets), qn(pk.column)),
+            params))
+
+    def run(where, where_params):
+        # Returns number of rows updated by the last statement
+        for sql, params in updates:
+            cursor.execute(sql + where + ')', params + list(where_params))
+        return cursor.rowcount
+
+    if len(statements) == 1:
+        return run(subquery, where_params)
+
+    if connection.vendor == 'postgresql':
+        temp_table = qn(PKS_TABLE)
+        # The table is created in a transaction (or savepoint) : it is
+        # dropped with its rollback if a statement fails
+        with atomic(using=connection.alias):
+            cursor.execute('CREATE TEMPORARY TABLE {0} AS {1}'.format(
+                temp_table, subquery), where_params)
+            rowcount = run('SELECT * FROM {0}'.format(temp_table), [])
+            cursor.execute('DROP TABLE {0}'.format(temp_table))
+        return rowcount
+
+    # Parameters left for primary keys by the largest statement
+    size = max(1, max_params - max(len(params) for sql, params in updates)) \
+        if max_params else CHUNK_SIZE
+    pks_qs = qs.order_by('pk').values_list('pk', flat=True)
+    rowcount = 0
+    chunk = list(pks_qs[:size])
+    while chunk:
+        rowcount += run(', '.join(['%s'] * len(chunk)), chunk)
+        if len(chunk) < size:
+            break
+        chunk = list(pks_qs.filter(pk__gt=chunk[-1])[:size])
+    return rowcount
@@ -0,0 +1,197 @@
+""" Registry : ModelFaker subclasses (direct or not) recorded when they are
+    defined, indexed by dotted path, app label and faked model.
+
+    Fakers are declared in `fakers` modules (or packages) of installed apps.
+    Discovering them imports these modules : an optional manifest (see
+    write_manifest()) lists the modules defining fakers of each app, so that
+    only them are imported, apps without fakers being skipped. The manifest
+    records the modification time of the directory of these apps : apps
+    changed since then are looked for a `fakers` module again (and a
+    FakerManifestWarning asks to rebuild the manifest if it defines
+    fakers).
+"""
+import json
+import os
+import warnings
+from weakref import WeakValueDictionary
+
+from django.utils.importlib import import_module
+from django.utils.module_loading import module_has_submodule
+
+from .exceptions import FakerManifestWarning
+
+# Version of manifest files
+MANIFEST_VERSION = 2
+
+
+def get_faker_path(faker):
+    """ Returns dotted path of a ModelFaker subclass """
+    return '%s.%s' % (faker.__module__, faker.__name__)
+
+
+class FakerRegistry(object):
+    """ Records fakers classes. Like __subclasses__(), fakers are weakly
+        referenced : classes created on the fly (e.g. by tests) are
+        forgotten once they are collected
+    """
+
+    def __init__(self):
+        # dotted path -> faker
+        self.fakers = WeakValueDictionary()
+        # dotted path -> definition order
+        self.order = {}
+        # Indexes : module / app label / model -> dotted paths
+        self.by_module = {}
+        self.by_label = {}
+        self.by_model = {}
+        # dotted path -> fakers of DEPENDS_ON, resolved once
+        self.dependencies = {}
+
+    def register(self, faker):
+        """ Records `faker` (replacing a faker with the same dotted path) """
+        path = get_faker_path(faker)
+        self.fakers[path] = faker
+        self.order[path] = len(self.order)
+        self.by_module.setdefault(faker.__module__, set()).add(path)
+        model = faker.FAKER_FOR
+        if model is not None:
+            self.by_label.setdefault(model._meta.app_label, set()).add(path)
+            self.by_model.setdefault(model, set()).add(path)
+        # A dependency could have been redefined
+        self.dependencies.clear()
+
+    def _get_all(self, paths):
+        """ Returns fakers of `paths` still defined, in definition order """
+        fakers = [(self.order[p], self.fakers.get(p)) for p in paths]
+        return [faker for order, faker in sorted(fakers) if faker is not None]
+
+    def get(self, path):
+        """ Returns the faker of dotted path `path`, importing its module if
+            it is not registered yet
+        """
+        faker = self.fakers.get(path)
+        if faker is None:
+            module, name = path.rsplit('.', 1)
+            faker = getattr(import_module(module), name)
+        return faker
+
+    def get_all(self):
+        """ Returns registered fakers """
+        return self._get_all(self.fakers.keys())
+
+    def get_module_fakers(self, module):
+        """ Returns fakers defined in `module` or in its submodules """
+        prefix = module + '.'
+        return self._get_all(
+            path for name, paths in self.by_module.items()
+            if name == module or name.startswith(prefix) for path in paths)
+
+    def get_label_fakers(self, app_label):
+        """ Returns fakers of models of app `app_label` """
+        return self._get_all(self.by_label.get(app_label, ()))
+
+    def get_model_fakers(self, model):
+        """ Returns fakers of `model` """
+        return self._get_all(self.by_model.get(model, ()))
+
+    def get_dependencies(self, faker):
+        """ Returns fakers declared in faker.DEPENDS_ON """
+        path = get_faker_path(faker)
+        if path not in self.dependencies:
+            self.dependencies[path] = tuple(
+                self.get(dependency) for dependency in faker.DEPENDS_ON)
+        return self.dependencies[path]
+
+
+registry = FakerRegistry()
+
+
+def read_manifest(path):
+    """ Returns the manifest `path` : {'modules': {app: modules defining
+        fakers}, 'mtimes': {app: [directory, modification time]}}, or None
+        if it does not exist or can not be read
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path) as manifest:
+            data = json.load(manifest)
+    except ValueError:
+        return None
+    if data.get('version') != MANIFEST_VERSION:
+        return None
+    return {'modules': data['modules'], 'mtimes': data.get('mtimes', {})}
+
+
+def find_modules(app):
+    """ Returns fakers modules of `app` (its `fakers` module, if any) """
+    if module_has_submodule(import_module(app), 'fakers'):
+        return ['%s.fakers' % app]
+    return []
+
+
+def get_app_mtime(app):
+    """ Returns [directory, modification time] of the package of `app` """
+    directory = os.path.dirname(os.path.abspath(import_module(app).__file__))
+    return [directory, os.path.getmtime(directory)]
+
+
+def is_changed(mtime):
+    """ Returns True if the directory of a get_app_mtime() result changed
+        since then (or can not be found)
+    """
+    if not mtime:
+        return False
+    directory, recorded = mtime
+    try:
+        return os.path.getmtime(directory) > recorded
+    except OSError:
+        return True
+
+
+def discover(apps, manifest=None):
+    """ Imports fakers modules of `apps` : modules listed by `manifest`
+        (read_manifest() result), else found by find_modules(). Apps listed
+        without fakers whose directory changed since the manifest was
+        written are looked for fakers modules again
+    """
+    manifest = manifest or {}
+    listed = manifest.get('modules', {})
+    mtimes = manifest.get('mtimes', {})
+    for app in apps:
+        modules = listed.get(app)
+        if modules is None:
+            modules = find_modules(app)
+        elif not modules and is_changed(mtimes.get(app)):
+            for module in find_modules(app):
+                import_module(module)
+                if registry.get_module_fakers(module):
+                    warnings.warn(
+                        'Stale fakers manifest : {0} defines fakers, rebuild '
+                        'it with djfaker_build_manifest'.format(module),
+                        FakerManifestWarning)
+        for module in modules:
+            import_module(module)
+
+
+def write_manifest(path, apps):
+    """ Writes manifest `path` : modules defining fakers of `apps` (and
+        modification times of apps without fakers).
+        Returns number of fakers found
+    """
+    modules = {}
+    mtimes = {}
+    count = 0
+    for app in apps:
+        fakers = []
+        for module in find_modules(app):
+            import_module(module)
+            fakers.extend(registry.get_module_fakers(module))
+        modules[app] = sorted(set(faker.__module__ for faker in fakers))
+        if not modules[app]:
+            mtimes[app] = get_app_mtime(app)
+        count += len(fakers)
+    with open(path, 'w') as manifest:
+        json.dump({'version': MANIFEST_VERSION, 'modules': modules,
+                   'mtimes': mtimes}, manifest, indent=2, sort_keys=True)
+    return count
@@ -1,8 +1,20 @@
-from random import choice, randint, shuffle
-from uuid import uuid4
+import random
+from collections import OrderedDict
+from operator import attrgetter
 from django.template.defaultfilters import slugify
-from django.contrib.auth.hashers import make_password
-from . import data
+from django.utils.encoding import force_text
+from .corpus import LazyCorpus, resolve
+from .hashing import PasswordCache
+from .locales import active_provider
+from .pools import (
+    ListPool, ProductPool, PoolCursor, number_suffix, number_suffixes)
+from .pseudonyms import get_cache
+from .rng import derive_seed, run_key, replacers_rng
+from .settings import (DJFAKER_PASSWORD_HASHER, DJFAKER_PASSWORD_CACHE_SIZE,
+                       DJFAKER_PASSWORD_POOL_SIZE, DJFAKER_PSEUDONYM_KEY)
+from .pushdown import (
+    random_hex_sql, random_digits_sql, choice_sql, format_sql,
+    number_format_sql, random_case_sql)
 
 
 # Base classes -----------------------------------------------------------------
@@ -10,7 +22,29 @@ from . import data
 
 class BaseReplacer(object):
     """ Just a base class used to facilitate autodiscovering of replacers """
-    pass
+
+    # Random generator used by replacers : the random module, or a
+    # djfaker.rng.SeededRandom while a seeded faker runs
+    rng = random
+
+    def reset(self, key=None):
+        """ Called before each faker run : replacers keeping a state between
+            values start from scratch. `key` is the djfaker.rng.Partition
+            of the run if it is partitioned, else None
+        """
+        pass
+
+    def as_sql(self, model, connection):
+        """ Returns (sql, params) of a SQL expression computing values in
+            database (see djfaker.pushdown), or None if it is not possible
+        """
+        return None
+
+    def get_cardinality(self):
+        """ Returns number of distinct values the replacer can generate
+            (see djfaker.planner), or None if it is unknown or unbounded
+        """
+        return None
 
 
 class SimpleReplacer(BaseReplacer):
@@ -18,6 +52,12 @@ class SimpleReplacer(BaseReplacer):
     def apply(self):
         raise NotImplementedError
 
+    def apply_many(self, n):
+        """ Returns `n` values. Can be overriden to generate them faster
+            than `n` calls of apply()
+        """
+        return [self.apply() for i in xrange(n)]
+
 
 class LazyReplacer(BaseReplacer):
     """ Replacers which are dependent of the instance other fields """
@@ -30,6 +70,29 @@ class LazyReplacer(BaseReplacer):
     def apply(self, instance):
         raise NotImplementedError
 
+    def apply_many(self, instances):
+        """ Returns a value for each instance of `instances`. Can be
+            overriden to generate them faster than calls of apply()
+        """
+        return [self.apply(instance) for instance in instances]
+
+
+def pick_many(values, n, rng=random):
+    """ Returns `n` values randomly picked in `values` """
+    values = resolve(values)
+    size = len(values)
+    rand = rng.random
+    return [values[int(rand() * size)] for i in xrange(n)]
+
+
+def slugify_many(values):
+    """ Slugifies `values`, only once for each distinct value """
+    slugs = {}
+    for value in values:
+        if value not in slugs:
+            slugs[value] = slugify(value)
+    return [slugs[value] for value in values]
+
 
 # SimpleReplacer subclasses ----------------------------------------------------
 
@@ -42,61 +105,202 @@ class ChoiceReplacer(SimpleReplacer):
             self.choices = choices
 
     def apply(self):
-        return choice(self.choices)
+        return self.rng.choice(self.choices)
+
+    def apply_many(self, n):
+        return pick_many(self.choices, n, self.rng)
+
+    def as_sql(self, model, connection):
+        if not self.choices:
+            return None
+        return choice_sql(connection, self.choices)
+
+    def get_cardinality(self):
+        if getattr(self.choices, 'distinct', False):
+            return len(self.choices)
+        return len(set(self.choices))
 
 
 class ChoiceUniqueReplacer(SimpleReplacer):
+    """ Hands out each value of `choices` (or of a `pool`, see
+        djfaker.pools) once per faker run, in a random order if
+        `with_shuffle`. Raises a FakerPoolExhaustedError when no value
+        is left
+    """
     choices = []
     with_shuffle = False
+    pool = None
+    # Values are handed out once : the pool is exhausted after
+    # get_cardinality() values
+    unique = True
 
-    def __init__(self, choices=None, with_shuffle=None):
+    def __init__(self, choices=None, with_shuffle=None, pool=None):
         if choices:
             self.choices = choices
         self.with_shuffle = with_shuffle or self.with_shuffle
+        self.pool = pool or self.pool or ListPool(self.choices)
+        self.cursor = None
+        self.key = None
+
+    def reset(self, key=None):
+        self.cursor = None
+        self.key = key
+
+    def _get_cursor(self):
+        if self.cursor is None and self.key is not None:
+            # Partitions take disjoint slices of a permutation shared by
+            # the run
+            key = None
+            if self.with_shuffle:
+                key = run_key(self.rng, 'pool', self.key)
+            self.cursor = PoolCursor(self.pool, key=key, partition=self.key)
+        elif self.cursor is None:
+            # Seeded runs shuffle the pool from the run seed
+            rng = random.Random(run_key(self.rng, 'pool', self.key))
+            self.cursor = PoolCursor(self.pool, self.with_shuffle, rng)
+        return self.cursor
 
     def apply(self):
-        if self.with_shuffle:
-            shuffle(self.choices)
-        ch = self.choices.pop()
-        return ch
+        return self._get_cursor().draw(1)[0]
+
+    def apply_many(self, n):
+        return self._get_cursor().draw(n)
+
+    def get_cardinality(self):
+        return len(self.pool)
 
 
 class CompanyReplacer(SimpleReplacer):
-    COMPANIES = data.COMPANIES
-    COMPANIES_EXTRA = data.COMPANIES_EXTRA
+    COMPANIES = LazyCorpus('companies')
+    COMPANIES_EXTRA = LazyCorpus('companies_extra')
 
     def apply(self):
-        tpl = choice(['{0} {1}', '{1} {0}'])
+        tpl = self.rng.choice(['{0} {1}', '{1} {0}'])
         return tpl.format(
-            choice(self.COMPANIES),
-            choice(self.COMPANIES_EXTRA))
+            self.rng.choice(self.COMPANIES),
+            self.rng.choice(self.COMPANIES_EXTRA))
+
+    def apply_many(self, n):
+        tpls = pick_many(['{0} {1}', '{1} {0}'], n, self.rng)
+        return [tpl.format(company, extra) for tpl, company, extra in zip(
+            tpls,
+            pick_many(self.COMPANIES, n, self.rng),
+            pick_many(self.COMPANIES_EXTRA, n, self.rng))]
+
+    def get_cardinality(self):
+        return 2 * len(self.COMPANIES) * len(self.COMPANIES_EXTRA)
 
 
 class EmailReplacer(SimpleReplacer):
-    LAST_NAMES = data.LAST_NAMES
-    FIRST_NAMES = data.FIRST_NAMES
-    MAIL_EXTS = data.MAIL_EXTS
+    """ Random emails from first names, last names and mail extensions.
+        With `unique`, emails are handed out from the product of first
+        names, last names, `suffixes` numeric suffixes and extensions,
+        along a keyed permutation : they are unique within a run
+    """
+    LAST_NAMES = LazyCorpus('last_names')
+    FIRST_NAMES = LazyCorpus('first_names')
+    MAIL_EXTS = LazyCorpus('mail_exts')
+    UNIQUE_TPL = '{0}.{1}{2}@{3}.example.com'
+    unique = False
+    suffixes = 10
+    _slugs = None
+
+    def __init__(self, unique=None, suffixes=None):
+        self.unique = unique or self.unique
+        self.suffixes = suffixes or self.suffixes
+        self.reset()
+
+    def reset(self, key=None):
+        self.cursor = None
+        self.key = key
+
+    def _get_cursor(self):
+        if self.cursor is None:
+            first_names, last_names = self._get_slugs()
+            pool = ProductPool([first_names, last_names,
+                                number_suffixes(self.suffixes),
+                                self.MAIL_EXTS], self.UNIQUE_TPL)
+            self.cursor = PoolCursor(
+                pool, key=run_key(self.rng, 'email', self.key),
+                partition=self.key)
+        return self.cursor
+
+    def _get_slugs(self):
+        """ Returns slugified first and last names, computed once by
+            locale provider
+        """
+        provider = active_provider()
+        if self._slugs is None or self._slugs[0] is not provider:
+            self._slugs = (provider, slugify_many(self.FIRST_NAMES),
+                           slugify_many(self.LAST_NAMES))
+        return self._slugs[1:]
 
     def apply(self):
+        if self.unique:
+            return self._get_cursor().draw(1)[0]
+        first_names, last_names = self._get_slugs()
         return '{0}.{1}@{2}.example.com'.format(
-            slugify(choice(self.FIRST_NAMES)),
-            slugify(choice(self.LAST_NAMES)),
-            choice(self.MAIL_EXTS))
+            self.rng.choice(first_names),
+            self.rng.choice(last_names),
+            self.rng.choice(self.MAIL_EXTS))
+
+    def apply_many(self, n):
+        if self.unique:
+            return self._get_cursor().draw(n)
+        first_names, last_names = self._get_slugs()
+        return ['{0}.{1}@{2}.example.com'.format(*values) for values in zip(
+            pick_many(first_names, n, self.rng),
+            pick_many(last_names, n, self.rng),
+            pick_many(self.MAIL_EXTS, n, self.rng))]
+
+    def get_cardinality(self):
+        cardinality = (len(self.FIRST_NAMES) * len(self.LAST_NAMES)
+                       * len(self.MAIL_EXTS))
+        if self.unique:
+            return cardinality * self.suffixes
+        return cardinality
 
 
 class PhoneReplacer(SimpleReplacer):
+    """ Phone numbers in the formats of the active locale (see
+        djfaker.locales) : the first of FORMATS kinds it declares
+    """
+    FORMATS = ('phone', )
+    # (provider, compiled formats)
+    _formats = None
+
+    def _get_formats(self):
+        """ Returns compiled formats, resolved once by provider """
+        provider = active_provider()
+        if self._formats is None or self._formats[0] is not provider:
+            self._formats = (provider, provider.get_formats(*self.FORMATS))
+        return self._formats[1]
+
     def apply(self):
+        return self.apply_many(1)[0]
 
-        return '(+33){0}{1}'.format(
-            randint(1, 9),
-            randint(10000000, 99999999))
+    def apply_many(self, n):
+        formats = self._get_formats()
+        if len(formats) == 1:
+            return formats[0].apply_many(n, self.rng)
+        indexes = pick_many(range(len(formats)), n, self.rng)
+        values = [iter(f.apply_many(indexes.count(i), self.rng))
+                  for i, f in enumerate(formats)]
+        return [next(values[i]) for i in indexes]
 
+    def as_sql(self, model, connection):
+        compiled = [number_format_sql(connection, f.parts)
+                    for f in self._get_formats()]
+        if None in compiled:
+            return None
+        return random_case_sql(connection, compiled)
 
-class MobileReplacer(SimpleReplacer):
-    def apply(self):
-        return '(+33){0}{1}'.format(
-            randint(1, 9),
-            randint(10000000, 99999999))
+    def get_cardinality(self):
+        return sum(f.cardinality for f in self._get_formats())
+
+
+class MobileReplacer(PhoneReplacer):
+    FORMATS = ('mobile', 'phone')
 
 
 class SerialReplacer(SimpleReplacer):
@@ -108,10 +312,24 @@ class SerialReplacer(SimpleReplacer):
         self.int_only = int_only or self.int_only
 
     def apply(self):
-        uid = uuid4().hex
+        return self.apply_many(1)[0]
+
+    def apply_many(self, n):
+        # Random bits of all values are drawn at once (128 bits by value)
+        uids = '%0*X' % (32 * n, self.rng.getrandbits(128 * n))
+        uids = [uids[i:i + 32] for i in xrange(0, 32 * n, 32)]
+        if self.int_only:
+            uids = [str(int(uid, 16)) for uid in uids]
+        return [uid[:self.len] for uid in uids]
+
+    def as_sql(self, model, connection):
         if self.int_only:
-            uid = uuid4().int
-        return '{0}'.format(uid)[:self.len].upper()
+            return random_digits_sql(connection, min(self.len, 32)), []
+        return 'substr({0}, 1, {1})'.format(
+            random_hex_sql(connection), min(self.len, 32)), []
+
+    def get_cardinality(self):
+        return (self.int_only and 10 or 16) ** min(self.len, 32)
 
 
 # LazyReplacer subclasses ------------------------------------------------------
@@ -122,32 +340,113 @@ class MethodCallbackReplacer(LazyReplacer):
         return getattr(instance, self.tokens[0])()
 
 
-class LazyEmailReplacer(LazyReplacer):
-    MAIL_EXTS = data.MAIL_EXTS
+class UniqueLazyReplacer(LazyReplacer):
+    """ Lazy replacers whose values can be made unique within a run
+        (`unique`) : the n-th occurrence of a base value gets suffix n
+    """
+    unique = False
+
+    def __init__(self, tokens=None, unique=None):
+        super(UniqueLazyReplacer, self).__init__(tokens)
+        self.unique = unique or self.unique
+        self.reset()
+
+    def reset(self, key=None):
+        # base value -> number of occurrences
+        self.counts = {}
+        self.key = key
+        self.run_key = None
+
+    def _count(self, base):
+        """ Returns number of previous occurrences of `base` in the run.
+            Partitions count occurrences index, index + count... : their
+            values never collide
+        """
+        count = self.counts.get(base, 0)
+        self.counts[base] = count + 1
+        if self.key is not None:
+            return count * self.key.count + self.key.index
+        return count
+
+
+class LazyEmailReplacer(UniqueLazyReplacer):
+    """ Emails from slugified tokens and a random mail extension.
+        With `unique`, occurrences of a (first name, last name) couple are
+        spread over mail extensions (in an order chosen by a run key),
+        then numeric suffixes
+    """
+    MAIL_EXTS = LazyCorpus('mail_exts')
     TPL = '{0}.{1}@{2}.example.com'
+    UNIQUE_TPL = '{0}.{1}{2}@{3}.example.com'
+
+    def _format_unique(self, first, last):
+        if self.run_key is None:
+            self.run_key = run_key(self.rng, 'email', self.key)
+        count = self._count((first, last))
+        size = len(self.MAIL_EXTS)
+        offset = derive_seed(self.run_key, first, last) % size
+        return self.UNIQUE_TPL.format(
+            first, last, number_suffix(count // size),
+            self.MAIL_EXTS[(offset + count) % size])
 
     def apply(self, instance):
-        return self.TPL.format(
-            slugify(getattr(instance, self.tokens[0])),
-            slugify(getattr(instance, self.tokens[1])),
-            choice(self.MAIL_EXTS))
-
-
-class LazyUsernameReplacer(LazyReplacer):
+        first = slugify(getattr(instance, self.tokens[0]))
+        last = slugify(getattr(instance, self.tokens[1]))
+        if self.unique:
+            return self._format_unique(first, last)
+        return self.TPL.format(first, last, self.rng.choice(self.MAIL_EXTS))
+
+    def apply_many(self, instances):
+        firsts = slugify_many([getattr(i, self.tokens[0]) for i in instances])
+        lasts = slugify_many([getattr(i, self.tokens[1]) for i in instances])
+        if self.unique:
+            return [self._format_unique(first, last)
+                    for first, last in zip(firsts, lasts)]
+        return [self.TPL.format(*values) for values in zip(
+            firsts, lasts,
+            pick_many(self.MAIL_EXTS, len(instances), self.rng))]
+
+
+class LazyUsernameReplacer(UniqueLazyReplacer):
+    """ Usernames from slugified tokens. With `unique`, occurrences of a
+        (first name, last name) couple get numeric suffixes
+    """
+
+    def _format(self, first, last):
+        if self.unique:
+            return '{0}.{1}{2}'.format(
+                first, last, number_suffix(self._count((first, last))))
+        return '{0}.{1}'.format(first, last)
 
     def apply(self, instance):
-        return '{0}.{1}'.format(
-            slugify(getattr(instance, self.tokens[0])),
-            slugify(getattr(instance, self.tokens[1])))
+        return self._format(slugify(getattr(instance, self.tokens[0])),
+                            slugify(getattr(instance, self.tokens[1])))
+
+    def apply_many(self, instances):
+        return [self._format(*values) for values in zip(
+            slugify_many([getattr(i, self.tokens[0]) for i in instances]),
+            slugify_many([getattr(i, self.tokens[1]) for i in instances]))]
 
 
 class LazyPasswordReplacer(LazyReplacer):
+    """ Hashes initials of instance : hashes are memoized for each
+        raw password (see djfaker.hashing)
+    """
+
+    def __init__(self, tokens=None, hasher=None, cache_size=None,
+                 pool_size=None):
+        super(LazyPasswordReplacer, self).__init__(tokens)
+        self.hasher = hasher or DJFAKER_PASSWORD_HASHER or 'default'
+        if cache_size is None:
+            cache_size = DJFAKER_PASSWORD_CACHE_SIZE
+        self.cache = PasswordCache(cache_size,
+                                   pool_size or DJFAKER_PASSWORD_POOL_SIZE)
 
     def apply(self, instance):
-        raw_password = '{0}{1}'.format(
-            getattr(instance, self.tokens[0]).upper()[0],
-            getattr(instance, self.tokens[1]).upper()[0])
-        return make_password(raw_password)
+        raw_password = u'{0}{1}'.format(
+            force_text(getattr(instance, self.tokens[0])).upper()[0],
+            force_text(getattr(instance, self.tokens[1])).upper()[0])
+        return self.cache.get(raw_password, self.hasher, self.rng)
 
 
 class LazyCompanyWebsiteReplacer(LazyReplacer):
@@ -156,6 +455,10 @@ class LazyCompanyWebsiteReplacer(LazyReplacer):
         return '{0}.example.com'.format(
             slugify(getattr(instance, self.tokens[0])))
 
+    def apply_many(self, instances):
+        return ['{0}.example.com'.format(slug) for slug in slugify_many(
+            [getattr(i, self.tokens[0]) for i in instances])]
+
 
 class LazyCompanyEmailReplacer(LazyReplacer):
     TPL = '{0}.{1}@{2}.example.com'
@@ -166,6 +469,11 @@ class LazyCompanyEmailReplacer(LazyReplacer):
             slugify(getattr(instance, self.tokens[1])),
             slugify(getattr(instance, self.tokens[2])))
 
+    def apply_many(self, instances):
+        return [self.TPL.format(*values) for values in zip(*[
+            slugify_many([getattr(i, token) for i in instances])
+            for token in self.tokens[:3]])]
+
 
 class TextReplacer(LazyReplacer):
     tpl = None
@@ -177,3 +485,83 @@ class TextReplacer(LazyReplacer):
     def apply(self, instance):
         vals = [getattr(instance, attr) for attr in self.tokens]
         return self.tpl.format(*vals)
+
+    def apply_many(self, instances):
+        if not self.tokens:
+            return [self.tpl.format() for instance in instances]
+        getter = attrgetter(*self.tokens)
+        if len(self.tokens) == 1:
+            return [self.tpl.format(getter(i)) for i in instances]
+        return [self.tpl.format(*getter(i)) for i in instances]
+
+    def as_sql(self, model, connection):
+        return format_sql(model, connection, self.tpl, self.tokens)
+
+
+class PseudonymReplacer(LazyReplacer):
+    """ Wraps `replacer` (simple or lazy) so that an original value (of
+        tokens, usually the replaced field) always gets the same fake value,
+        in all fakers using the same `namespace` (the wrapped replacer class
+        name by default). See djfaker.pseudonyms.
+        Fake values are derived from the original value and
+        DJFAKER_PSEUDONYM_KEY (or the run seed) if one is set, else random
+        values are recorded by the pseudonyms cache. None is not replaced
+    """
+
+    def __init__(self, replacer, tokens, namespace=None, cache=None):
+        super(PseudonymReplacer, self).__init__(tokens)
+        self.replacer = replacer
+        self.namespace = namespace or replacer.__class__.__name__
+        self.cache = cache
+
+    def reset(self, key=None):
+        self.replacer.reset(key)
+
+    def _get_original(self, instance):
+        """ Returns the original value of `instance` as a unicode string,
+            or None
+        """
+        values = [getattr(instance, token) for token in self.tokens]
+        if all(value is None for value in values):
+            return None
+        return u'\x00'.join(force_text(value) for value in values)
+
+    def _generate(self, originals, instances):
+        """ Returns fake values of `originals`, met in `instances` """
+        replacer = self.replacer
+        simple = isinstance(replacer, SimpleReplacer)
+        key = DJFAKER_PSEUDONYM_KEY
+        if key is None:
+            key = getattr(self.rng, 'run_seed', None)
+        if key is None:
+            with replacers_rng([replacer], self.rng):
+                if simple:
+                    return replacer.apply_many(len(originals))
+                return replacer.apply_many(instances)
+        values = []
+        rng = random.Random()
+        with replacers_rng([replacer], rng):
+            for original, instance in zip(originals, instances):
+                rng.seed(derive_seed(key, self.namespace, original))
+                values.append(replacer.apply() if simple
+                              else replacer.apply(instance))
+        return values
+
+    def apply(self, instance):
+        return self.apply_many([instance])[0]
+
+    def apply_many(self, instances):
+        originals = [self._get_original(i) for i in instances]
+        # First instance met for each original value
+        firsts = OrderedDict()
+        for original, instance in zip(originals, instances):
+            if original is not None and original not in firsts:
+                firsts[original] = instance
+        fakes = (self.cache or get_cache()).get_many(
+            self.namespace, list(firsts), lambda missing: self._generate(
+                missing, [firsts[original] for original in missing]))
+        return [None if original is None else fakes[original]
+                for original in originals]
+
+    def get_cardinality(self):
+        return self.replacer.get_cardinality()
@@ -0,0 +1,318 @@
+""" Rewrite : fakes a whole table in a single pass with PostgreSQL COPY.
+
+    Rows are streamed out with COPY TO, faked by groups, and spooled to a
+    temporary file loaded with COPY FROM into a new table (without indexes),
+    which then replaces the original one : indexes, constraints, triggers,
+    grants, foreign keys referencing the table and sequences are rebuilt
+    from the catalog. Unlike UPDATE statements, this leaves no dead rows and
+    builds indexes once. Everything runs in a single transaction, the
+    table being locked against writes.
+
+    Rows which are not selected to be faked are copied unchanged, rows to
+    delete are dropped (if nothing references them, see can_drop()). No
+    signal is sent. Views depending on the table make the rewrite fail.
+"""
+import re
+import tempfile
+
+from django.utils.encoding import force_text
+
+from .deletion import has_signals
+from .writers import RowWriter, atomic
+
+# NULL in COPY text format
+NULL = '\\N'
+
+# Escapes of COPY text format
+ESCAPES = {'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v'}
+ESCAPE_RE = re.compile(r'\\(?:([0-7]{1,3})|x([0-9a-fA-F]{1,2})|(.))')
+
+# Time zones written by PostgreSQL without minutes (+02)
+SHORT_TZ_RE = re.compile(r'[+-]\d{2}$')
+
+# Suffix of the table rows are copied into
+SUFFIX = '_djfaker'
+
+# Longest identifier of PostgreSQL
+MAX_NAME_LENGTH = 63
+
+# Size of the spooled rows kept in memory before using a temporary file
+SPOOL_SIZE = 16 * 1024 * 1024
+
+
+def is_supported(connection):
+    """ Returns True if tables can be rewritten on `connection` """
+    return connection.vendor == 'postgresql'
+
+
+def can_drop(model):
+    """ Returns True if instances of `model` can be dropped by the rewrite :
+        no relation references them, and their deletion is not listened
+    """
+    opts = model._meta
+    related = opts.get_all_related_objects(include_hidden=True) + \
+        opts.get_all_related_many_to_many_objects()
+    return not related and not opts.many_to_many and not has_signals([model])
+
+
+def decode(text):
+    """ Returns the unicode string (or None) of a COPY text format field """
+    if text == NULL:
+        return None
+    if '\\' not in text:
+        return text
+
+    def _unescape(match):
+        octal, hexa, char = match.groups()
+        if octal:
+            return unichr(int(octal, 8))
+        if hexa:
+            return unichr(int(hexa, 16))
+        return ESCAPES.get(char, char)
+    return ESCAPE_RE.sub(_unescape, text)
+
+
+def encode(value):
+    """ Returns the COPY text format field of `value` (a value prepared for
+        the database)
+    """
+    if value is None:
+        return NULL
+    if isinstance(value, bool):
+        return value and 't' or 'f'
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    return force_text(value).replace('\\', '\\\\').replace('\n', '\\n') \
+        .replace('\r', '\\r').replace('\t', '\\t')
+
+
+def parse(field, text):
+    """ Returns the Python value of `field` from a COPY text format field """
+    value = decode(text)
+    if value is None:
+        return None
+    if field.rel:
+        field = field.rel.get_related_field()
+    if field.get_internal_type() == 'DateTimeField' \
+            and SHORT_TZ_RE.search(value):
+        value += ':00'
+    return field.to_python(value)
+
+
+class CopyStream(object):
+    """ File-like object receiving COPY TO output : rows (lists of fields in
+        COPY text format) are handed to `callback` by groups of `size`
+    """
+
+    def __init__(self, callback, size):
+        self.callback = callback
+        self.size = size
+        self.rows = []
+        self.tail = ''
+
+    def write(self, data):
+        lines = (self.tail + data).split('\n')
+        self.tail = lines.pop()
+        for line in lines:
+            self.rows.append(line.decode('utf-8').split('\t'))
+            if len(self.rows) >= self.size:
+                self.flush()
+
+    def flush(self):
+        """ Hands remaining rows to the callback """
+        if self.rows:
+            rows, self.rows = self.rows, []
+            self.callback(rows)
+
+
+class CopyWriter(RowWriter):
+    """ Writes faked instances into their row of the rewritten table :
+        rows of instances handed to write() are given by `rows` ({id of
+        instance: fields}), `columns` being the columns of the rows
+    """
+
+    def __init__(self, model, attrs, connection, columns, unicity=None):
+        super(CopyWriter, self).__init__(model, attrs, unicity)
+        self.connection = connection
+        self.indexes = [columns.index(f.column) for f in self.fields]
+        self.rows = {}
+
+    def write(self, instance, original=None):
+        if self.is_unchanged(instance, original):
+            self.skipped += 1
+        else:
+            row = self.rows[id(instance)]
+            for index, field in zip(self.indexes, self.fields):
+                row[index] = encode(field.get_db_prep_save(
+                    getattr(instance, field.attname),
+                    connection=self.connection))
+            self.written += 1
+        self._written([instance])
+
+
+class TableRewrite(object):
+    """ Rewrites the table of `model` (see module documentation) : rows of
+        `update_qs` are faked by `fake(instances)`, which writes them with
+        `writer` (a CopyWriter), rows of `deletion_qs` (if given) are
+        dropped. Instances are only loaded with `fields` (and primary key),
+        by groups of `size`
+    """
+
+    def __init__(self, model, connection, writer, fake, update_qs,
+                 deletion_qs=None, fields=(), size=1000):
+        self.model = model
+        self.connection = connection
+        self.writer = writer
+        self.fake = fake
+        self.update_qs = update_qs
+        self.deletion_qs = deletion_qs
+        self.size = size
+        opts = model._meta
+        self.table = opts.db_table
+        self.new_table = self.table[:MAX_NAME_LENGTH - len(SUFFIX)] + SUFFIX
+        self.fields = list(opts.local_fields)
+        self.columns = [f.column for f in self.fields]
+        names = set(fields)
+        # (index, field) of loaded fields
+        self.loaded = [(i, f) for i, f in enumerate(self.fields)
+                       if f.primary_key or f.name in names]
+        # Numbers of rows read, faked and dropped
+        self.read = self.faked = self.dropped = 0
+        self.spool = None
+
+    def _quote(self, name):
+        return self.connection.ops.quote_name(name)
+
+    def _get_pks_sql(self, qs):
+        """ Returns SQL selecting primary keys of `qs`, parameters bound """
+        sql, params = qs.order_by().values_list('pk').query \
+            .get_compiler(connection=self.connection).as_sql()
+        return self.connection.cursor().mogrify(sql, params)
+
+    def get_select_sql(self):
+        """ Returns the query whose rows are copied : columns of the table,
+            then whether the row is faked and dropped
+        """
+        pk = self._quote(self.model._meta.pk.column)
+        dropped = 'FALSE'
+        if self.deletion_qs is not None:
+            dropped = '{0} IN ({1})'.format(
+                pk, self._get_pks_sql(self.deletion_qs))
+        return 'SELECT {0}, {1} IN ({2}), {3} FROM {4} ORDER BY {1}'.format(
+            ', '.join(self._quote(c) for c in self.columns), pk,
+            self._get_pks_sql(self.update_qs), dropped,
+            self._quote(self.table))
+
+    def rewrite_rows(self, rows):
+        """ Fakes `rows` (COPY TO output) and spools rows to keep """
+        model = self.model
+        kept, instances = [], []
+        for row in rows:
+            dropped, faked = row.pop(), row.pop()
+            self.read += 1
+            if dropped == 't':
+                self.dropped += 1
+                continue
+            kept.append(row)
+            if faked == 't':
+                instance = model(**dict(
+                    (f.attname, parse(f, row[i])) for i, f in self.loaded))
+                self.writer.rows[id(instance)] = row
+                instances.append(instance)
+        if instances:
+            self.fake(instances)
+            self.faked += len(instances)
+        self.writer.rows.clear()
+        self.spool.write(u''.join(
+            u'\t'.join(row) + u'\n' for row in kept).encode('utf-8'))
+
+    def _fetch(self, cursor, sql):
+        cursor.execute(sql, [self._quote(self.table)])
+        return cursor.fetchall()
+
+    def introspect(self, cursor):
+        """ Returns statements rebuilding the table once replaced :
+            (before the swap, after the swap)
+        """
+        before, after = [], []
+        # Constraints of the table, primary key first, foreign keys last
+        for name, definition in self._fetch(cursor, (
+                "SELECT conname, pg_get_constraintdef(oid) "
+                "FROM pg_constraint WHERE conrelid = %s::regclass "
+                "AND contype IN ('p', 'u', 'x', 'c', 'f') "
+                "ORDER BY position(contype IN 'puxcf'), conname")):
+            after.append('ALTER TABLE {0} ADD CONSTRAINT {1} {2}'.format(
+                self._quote(self.table), self._quote(name), definition))
+        # Indexes which are not built by constraints
+        after.extend(sql for sql, in self._fetch(cursor, (
+            "SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i "
+            "WHERE i.indrelid = %s::regclass AND NOT EXISTS ("
+            "SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid) "
+            "ORDER BY i.indexrelid")))
+        after.extend(sql for sql, in self._fetch(cursor, (
+            "SELECT pg_get_triggerdef(oid) FROM pg_trigger "
+            "WHERE tgrelid = %s::regclass AND NOT tgisinternal "
+            "ORDER BY tgname")))
+        for grantee, privilege in self._fetch(cursor, (
+                "SELECT CASE WHEN a.grantee = 0 THEN 'PUBLIC' "
+                "ELSE quote_ident(pg_get_userbyid(a.grantee)) END, "
+                "a.privilege_type FROM pg_class c, aclexplode(c.relacl) a "
+                "WHERE c.oid = %s::regclass")):
+            after.append('GRANT {0} ON {1} TO {2}'.format(
+                privilege, self._quote(self.table), grantee))
+        # Sequences owned by columns (serial) would be dropped with the table
+        for sequence, column in self._fetch(cursor, (
+                "SELECT s.oid::regclass::text, a.attname FROM pg_depend d "
+                "JOIN pg_class s ON s.oid = d.objid AND s.relkind = 'S' "
+                "JOIN pg_attribute a ON a.attrelid = d.refobjid "
+                "AND a.attnum = d.refobjsubid "
+                "WHERE d.refobjid = %s::regclass AND d.deptype = 'a' "
+                "AND d.classid = 'pg_class'::regclass")):
+            before.append('ALTER SEQUENCE {0} OWNED BY NONE'.format(sequence))
+            after.append('ALTER SEQUENCE {0} OWNED BY {1}.{2}'.format(
+                sequence, self._quote(self.table), self._quote(column)))
+        # Foreign keys of other tables referencing the table
+        for table, name, definition in self._fetch(cursor, (
+                "SELECT conrelid::regclass::text, conname, "
+                "pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE confrelid = %s::regclass AND conrelid <> confrelid "
+                "AND contype = 'f' ORDER BY conrelid, conname")):
+            before.append('ALTER TABLE {0} DROP CONSTRAINT {1}'.format(
+                table, self._quote(name)))
+            after.append('ALTER TABLE {0} ADD CONSTRAINT {1} {2}'.format(
+                table, self._quote(name), definition))
+        return before, after
+
+    def run(self):
+        """ Rewrites the table. Returns number of faked rows """
+        table, new_table = self._quote(self.table), self._quote(self.new_table)
+        columns = ', '.join(self._quote(c) for c in self.columns)
+        using = self.connection.alias
+        self.spool = tempfile.SpooledTemporaryFile(SPOOL_SIZE)
+        try:
+            with atomic(using=using):
+                cursor = self.connection.cursor()
+                cursor.execute('LOCK TABLE {0} IN SHARE MODE'.format(table))
+                before, after = self.introspect(cursor)
+                stream = CopyStream(self.rewrite_rows, self.size)
+                cursor.copy_expert('COPY ({0}) TO STDOUT'.format(
+                    self.get_select_sql()), stream)
+                stream.flush()
+                self.spool.seek(0)
+                cursor.execute(
+                    'CREATE TABLE {0} (LIKE {1} INCLUDING DEFAULTS '
+                    'INCLUDING STORAGE INCLUDING COMMENTS)'.format(
+                        new_table, table))
+                cursor.copy_expert('COPY {0} ({1}) FROM STDIN'.format(
+                    new_table, columns), self.spool)
+                for sql in before:
+                    cursor.execute(sql)
+                cursor.execute('DROP TABLE {0}'.format(table))
+                cursor.execute('ALTER TABLE {0} RENAME TO {1}'.format(
+                    new_table, table))
+                for sql in after:
+                    cursor.execute(sql)
+                cursor.execute('ANALYZE {0}'.format(table))
+        finally:
+            self.spool.close()
+        return self.faked
@@ -0,0 +1,88 @@
+""" Random generators : reproducible faking from a run seed """
+from collections import namedtuple
+from contextlib import contextmanager
+from hashlib import md5
+from random import Random
+
+from django.utils.encoding import smart_str
+
+
+def derive_seed(*parts):
+    """ Returns a 64 bits integer derived from `parts` (any values which
+        can be converted to strings), stable between processes and hosts
+    """
+    key = '\x00'.join(smart_str(part) for part in parts)
+    return int(md5(key).hexdigest()[:16], 16)
+
+
+class Partition(namedtuple('Partition', ['index', 'count', 'key', 'start',
+                                          'stop', 'total'])):
+    """ Partition `index` out of `count` partitions of a faker run : `key`
+        is drawn once for the whole run, so that partitions faked by
+        different processes share their random permutations.
+        Partition fakes rows `start` to `stop` (excluded) out of the `total`
+        rows of the run (by default, an equal share of them)
+    """
+    __slots__ = ()
+
+    def __new__(cls, index, count, key, start=None, stop=None, total=None):
+        if not total:
+            start, stop, total = index, index + 1, count
+        return super(Partition, cls).__new__(
+            cls, index, count, key, start, stop, total)
+
+    def slice(self, size):
+        """ Returns (start, stop) positions of the share of the partition
+            out of `size` values : shares are proportional to the rows of
+            partitions, and disjoint
+        """
+        return size * self.start // self.total, size * self.stop // self.total
+
+
+def run_key(rng, *parts):
+    """ Returns a key for a faker run : derived from the run seed and
+        `parts` if `rng` is a SeededRandom, else from the key of the
+        Partition found in `parts`, else random. The key does not depend
+        on the partition : partitions take disjoint slices of a shared
+        permutation
+    """
+    partitions = [part for part in parts if isinstance(part, Partition)]
+    parts = [None if isinstance(part, Partition) else part for part in parts]
+    if getattr(rng, 'run_seed', None) is not None:
+        return derive_seed(rng.run_seed, rng.namespace, *parts)
+    if partitions:
+        return derive_seed(partitions[0].key, *parts)
+    return rng.getrandbits(64)
+
+
+class SeededRandom(Random):
+    """ Random generator reseeded for each replaced value : values are a
+        pure function of (run seed, namespace, instance pk, attribute),
+        whatever the order in which instances are faked, or the process
+        faking them
+    """
+
+    def __new__(cls, run_seed, namespace=''):
+        # random.Random.__new__ only accepts a seed
+        return Random.__new__(cls)
+
+    def __init__(self, run_seed, namespace=''):
+        self.run_seed = run_seed
+        self.namespace = namespace
+        Random.__init__(self, derive_seed(run_seed, namespace))
+
+    def reseed(self, *parts):
+        """ Seeds generator from run seed, namespace and `parts` """
+        self.seed(derive_seed(self.run_seed, self.namespace, *parts))
+
+
+@contextmanager
+def replacers_rng(replacers, rng):
+    """ Makes `replacers` use `rng` instead of the random module """
+    for replacer in replacers:
+        replacer.rng = rng
+    try:
+        yield rng
+    finally:
+        for replacer in replacers:
+            replacer.__dict__.pop('rng', None)
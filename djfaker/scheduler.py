@@ -0,0 +1,294 @@
+""" Scheduler : runs fakers along the DEPENDS_ON graph, in parallel """
+import random
+import traceback
+from multiprocessing import Manager, current_process
+from multiprocessing.pool import Pool
+
+from django.db import connections, router
+
+from .exceptions import FakerDependencyError, FakerWorkerError
+from .profiling import FakerProfile, NullProfile
+from .registry import registry, get_faker_path
+from .rng import Partition
+from .signals import post_fake_partition
+from .writers import atomic
+
+
+def get_faker(path):
+    """ Returns a ModelFaker subclass from its dotted path
+        (<app>.fakers.<FakerClass>)
+    """
+    return registry.get(path)
+
+
+def check_cycles(graph):
+    """ Raises a FakerDependencyError if `graph` contains a cycle """
+    # 1 : being visited, 2 : visited
+    states = {}
+
+    def _visit(faker, path):
+        states[faker] = 1
+        for dependency in sorted(graph[faker], key=get_faker_path):
+            if states.get(dependency) == 1:
+                cycle = path[path.index(dependency):] + [dependency]
+                raise FakerDependencyError(
+                    [get_faker_path(f) for f in cycle])
+            if dependency not in states:
+                _visit(dependency, path + [dependency])
+        states[faker] = 2
+
+    for faker in sorted(graph, key=get_faker_path):
+        if faker not in states:
+            _visit(faker, [faker])
+
+
+def build_graph(fakers, with_deps=True):
+    """ Returns the dependency graph of `fakers` : {faker: dependencies}
+        If `with_deps` is True, dependencies which are not in `fakers`
+        are added to the graph, else they are ignored
+    """
+    graph = {}
+    todo = list(fakers)
+    while todo:
+        faker = todo.pop()
+        if faker in graph:
+            continue
+        dependencies = set(registry.get_dependencies(faker))
+        if with_deps:
+            todo.extend(dependencies)
+        else:
+            dependencies.intersection_update(fakers)
+        graph[faker] = dependencies
+    check_cycles(graph)
+    return graph
+
+
+def sort_graph(graph):
+    """ Returns fakers of `graph` in the order run_fakers() runs them with
+        a single job : each faker after its dependencies
+    """
+    pending = dict((faker, set(deps)) for faker, deps in graph.items())
+    order = []
+    while pending:
+        ready = sorted([faker for faker, deps in pending.items() if not deps],
+                       key=get_faker_path)
+        for faker in ready:
+            del pending[faker]
+            order.append(faker)
+        for deps in pending.values():
+            deps.difference_update(ready)
+    return order
+
+
+def run_faker(path, no_dels=False, options=None):
+    """ Runs a faker (dependencies are run by the scheduler).
+        Returns (path, profile) : profile is a dict of measures if `profile`
+        option is True
+    """
+    faker = get_faker(path)()
+    faker._run(no_deps=True, no_dels=no_dels, **(options or {}))
+    return path, faker._profile.as_dict()
+
+
+def run_partition(path, partition, pk_range, options=None,
+                  reservations=None):
+    """ Fakes instances of a primary key range (of `partition`, a
+        djfaker.rng.Partition) in a single transaction.
+        Returns (index, count, profile) : profile is a dict of measures if
+        `profile` option is True
+    """
+    options = options or {}
+    faker = get_faker(path)()
+    if options.get('profile'):
+        faker._profile = FakerProfile(path)
+    faker._profile.start()
+    try:
+        with atomic(using=router.db_for_write(faker.FAKER_FOR)):
+            count = faker._run_update(pk_range=pk_range, partition=partition,
+                                      reservations=reservations, **options)
+    finally:
+        faker._profile.stop()
+    return partition.index, count, faker._profile.as_dict()
+
+
+def run_task(func, *args):
+    """ Runs `func` in a pool worker. Returns (result, traceback) :
+        traceback is None if `func` succeeded (a pickled exception would
+        lose it)
+    """
+    try:
+        return func(*args), None
+    except Exception:
+        return None, traceback.format_exc()
+
+
+def close_connections():
+    """ Closes database connections : forked workers must not share them """
+    for connection in connections.all():
+        connection.close()
+
+
+def init_worker():
+    """ Reseeds the random module : forked workers would draw the same
+        values as their parent
+    """
+    random.seed()
+
+
+class WorkerPool(Pool):
+    """ Pool of `processes` workers whose deaths are detected : the task of
+        a worker which died (e.g. killed by the OOM killer) never completes,
+        and the pool replaces the worker silently
+    """
+
+    def __init__(self, processes, initializer=None):
+        super(WorkerPool, self).__init__(processes, initializer)
+        self.pids = set(worker.pid for worker in self._pool)
+
+    def lost_workers(self):
+        """ Returns True if a worker of the pool died """
+        return set(worker.pid for worker in list(self._pool)) != self.pids
+
+
+def _wait(pool, running):
+    """ Returns the result of a task of `running` (a dict of AsyncResult of
+        run_task() in `pool` : task key) once it is completed, and removes
+        it from `running`. Raises a FakerWorkerError if the task failed, or
+        if a worker died (its task is lost)
+    """
+    while True:
+        for result, key in running.items():
+            if result.ready():
+                del running[result]
+                value, error = result.get()
+                if error:
+                    raise FakerWorkerError(key, error)
+                return value
+        if pool.lost_workers():
+            raise FakerWorkerError(
+                ', '.join(sorted(str(key) for key in running.values())),
+                'A worker process died before completing its task')
+        # A timeout keeps the main process interruptible
+        running.keys()[0].wait(0.1)
+
+
+def run_partitions(faker, ranges, profile=None, sizes=None, **options):
+    """ Fakes instances of `faker` split into primary key `ranges`, in
+        parallel : one process (with its own connection and transaction)
+        by range. Unique values are reserved in a mapping shared by
+        processes, and unique replacers hand out disjoint slices of their
+        values to each partition (see djfaker.rng.Partition), sized by the
+        number of instances of its range if `sizes` are given.
+        Ranges are faked one after another in the current process if it is
+        a pool worker itself (which can not have children), or with SQLite
+        (which locks the whole database while writing).
+        Ranges recorded by the journal (if given in `options`) are skipped,
+        completed ranges are recorded.
+        Measures of workers are added to `profile` (a FakerProfile) if it is
+        enabled.
+        Returns number of faked instances
+    """
+    path = get_faker_path(faker)
+    profile = profile or NullProfile()
+    options['profile'] = profile.enabled
+    # Partitions keep their index when completed ones are skipped
+    key = random.getrandbits(64)
+    sizes = sizes or [1] * len(ranges)
+    starts = [sum(sizes[:index]) for index in range(len(ranges))]
+    todo = [(Partition(index, len(ranges), key, starts[index],
+                       starts[index] + sizes[index], sum(sizes)), pk_range)
+            for index, pk_range in enumerate(ranges)]
+    journal = options.get('journal')
+    if journal:
+        todo = [(partition, pk_range) for partition, pk_range in todo
+                if not journal.is_partition_done(path, pk_range)]
+    vendor = connections[router.db_for_write(faker.FAKER_FOR)].vendor
+    done = []
+    running = {}
+    pool = manager = None
+    reservations = {}
+    if len(todo) > 1 and not current_process().daemon \
+            and vendor != 'sqlite':
+        manager = Manager()
+        reservations = manager.dict()
+        close_connections()
+        pool = WorkerPool(len(todo), init_worker)
+
+    try:
+        for partition, pk_range in todo:
+            args = (path, partition, pk_range, options, reservations)
+            if pool:
+                task = pool.apply_async(run_task, (run_partition, ) + args)
+                running[task] = path
+            else:
+                # Errors are raised as is by the current process
+                done.append(run_partition(*args))
+
+        total = 0
+        for i in range(len(todo)):
+            index, count, measures = done.pop(0) if done \
+                else _wait(pool, running)
+            total += count
+            if measures:
+                profile.merge(measures)
+            if journal:
+                journal.partition_done(path, ranges[index])
+            post_fake_partition.send(
+                None, faked_model=faker, partition=index,
+                partitions=len(ranges), pk_range=ranges[index], count=count)
+        return total
+    finally:
+        if pool:
+            pool.terminate()
+            pool.join()
+            manager.shutdown()
+
+
+def run_fakers(fakers, jobs=1, no_deps=False, no_dels=False, **options):
+    """ Runs `fakers` (and their dependencies unless `no_deps`) once their
+        dependencies have been run. If `jobs` > 1, independent fakers are
+        run at the same time by a pool of `jobs` processes, each one with
+        its own database connection.
+        Fakers are run one after another in the current process if it is a
+        pool worker itself (which can not have children), or if one of them
+        writes to SQLite (which locks the whole database while writing).
+        Returns measures of fakers (as dicts) if `profile` option is True
+    """
+    graph = build_graph(fakers, not no_deps)
+    pending = dict((faker, set(deps)) for faker, deps in graph.items())
+    vendors = set(connections[router.db_for_write(faker.FAKER_FOR)].vendor
+                  for faker in graph if faker.FAKER_FOR is not None)
+    done = []
+    running = {}
+    pool = None
+    profiles = []
+    if jobs > 1 and not current_process().daemon \
+            and 'sqlite' not in vendors:
+        close_connections()
+        pool = WorkerPool(jobs, init_worker)
+
+    try:
+        while pending or running or done:
+            ready = [faker for faker, deps in pending.items() if not deps]
+            for faker in sorted(ready, key=get_faker_path):
+                del pending[faker]
+                args = (get_faker_path(faker), no_dels, options)
+                if pool:
+                    task = pool.apply_async(run_task, (run_faker, ) + args)
+                    running[task] = args[0]
+                else:
+                    # Errors are raised as is by the current process
+                    done.append(run_faker(*args))
+
+            path, measures = done.pop(0) if done else _wait(pool, running)
+            if measures:
+                profiles.append(measures)
+            faker = get_faker(path)
+            faker._ran = True
+            for deps in pending.values():
+                deps.discard(faker)
+        return profiles
+    finally:
+        if pool:
+            pool.terminate()
+            pool.join()
@@ -3,3 +3,119 @@ from django.conf import settings
 # Number of times module will try to fake an instance
 # if unicity constraints are broken because of applying replacers
 DJFAKER_MAX_TRIES = getattr(settings, 'DJFAKER_MAX_TRIES', 3)
+
+# Number of faked instances written together by a multi-row UPDATE
+# (can be overriden by ModelFaker.BATCH_SIZE), None to save them one by one
+DJFAKER_BATCH_SIZE = getattr(settings, 'DJFAKER_BATCH_SIZE', None)
+
+# Number of instances loaded together when walking instances to fake
+# (can be overriden by ModelFaker.CHUNK_SIZE), None to load them at once
+DJFAKER_CHUNK_SIZE = getattr(settings, 'DJFAKER_CHUNK_SIZE', None)
+
+# Hasher algorithm used to hash faked passwords (e.g. 'md5' or
+# 'unsalted_md5' are much faster), None for Django default hasher
+DJFAKER_PASSWORD_HASHER = getattr(settings, 'DJFAKER_PASSWORD_HASHER', None)
+
+# Number of distinct raw passwords whose hashes are kept in memory,
+# None to keep all of them
+DJFAKER_PASSWORD_CACHE_SIZE = getattr(
+    settings, 'DJFAKER_PASSWORD_CACHE_SIZE', 1024)
+
+# Number of hashes (with different salts) computed for each raw password,
+# faked instances sharing a raw password get one of them : a larger pool
+# costs more hashing, 1 gives the same hash to all instances sharing a raw
+# password (faked passwords are initials : many instances do)
+DJFAKER_PASSWORD_POOL_SIZE = getattr(settings, 'DJFAKER_PASSWORD_POOL_SIZE', 4)
+
+# Seed making faked values reproducible : each value is derived from the
+# seed, the model, the instance primary key and the replaced attribute
+# (can be overriden by ModelFaker.SEED), None for random values
+DJFAKER_SEED = getattr(settings, 'DJFAKER_SEED', None)
+
+# If True, instances selected by QS_FOR_DELETION and their cascades are
+# deleted by chunks with set-based DELETE statements planned from models
+# metadata, instead of being collected in memory by Django
+# (can be overriden by ModelFaker.FAST_DELETION)
+DJFAKER_FAST_DELETION = getattr(settings, 'DJFAKER_FAST_DELETION', False)
+
+# If True, fast deletion is not used for models whose deletion is listened
+# (pre_delete or post_delete signals), False to skip these signals
+DJFAKER_DELETION_SIGNALS = getattr(settings, 'DJFAKER_DELETION_SIGNALS', True)
+
+# Number of instances deleted together by fast deletion (each chunk in its
+# own transaction)
+DJFAKER_DELETION_CHUNK_SIZE = getattr(
+    settings, 'DJFAKER_DELETION_CHUNK_SIZE', 1000)
+
+# Path of the journal file recording progress of fakers, to resume an
+# interrupted run (--resume) or to fake only changed instances
+# (--incremental), None to disable it
+DJFAKER_JOURNAL = getattr(settings, 'DJFAKER_JOURNAL', None)
+
+# Path of a benchmark.py results file whose measures are used by --plan to
+# estimate times of fakers, None to use builtin measures
+DJFAKER_BENCHMARKS = getattr(settings, 'DJFAKER_BENCHMARKS', None)
+
+# Corpora (word lists used by replacers) read from files written by
+# djfaker.corpus.write_corpus() : {name: path}, e.g. {'last_names':
+# '/srv/corpora/last_names.djfc'}. Other corpora are builtin ones
+DJFAKER_CORPORA = getattr(settings, 'DJFAKER_CORPORA', {})
+
+# Locale of corpora and formats used by replacers (can be overriden by
+# ModelFaker.LOCALE), None for the active language (LANGUAGE_CODE, activated
+# by the command)
+DJFAKER_LOCALE = getattr(settings, 'DJFAKER_LOCALE', 'fr')
+
+# Declarations of locales : {locale: {'formats': {kind: patterns},
+# 'corpora': {name: path of a corpus file or words}}}, completing builtin
+# ones (see djfaker.locales)
+DJFAKER_LOCALES = getattr(settings, 'DJFAKER_LOCALES', {})
+
+# Key from which pseudonyms (see djfaker.pseudonyms) are derived : an
+# original value gets the same fake value in all processes and runs sharing
+# the key. If None, pseudonyms are derived from the run seed, or random
+DJFAKER_PSEUDONYM_KEY = getattr(settings, 'DJFAKER_PSEUDONYM_KEY', None)
+
+# Number of pseudonyms kept in memory when they are recorded by a store
+# (without a store, all of them are kept), None to keep all of them
+DJFAKER_PSEUDONYM_CACHE_SIZE = getattr(
+    settings, 'DJFAKER_PSEUDONYM_CACHE_SIZE', 100000)
+
+# Path of a SQLite file recording pseudonyms, shared by processes and runs,
+# None to use DJFAKER_PSEUDONYM_DATABASE
+DJFAKER_PSEUDONYM_FILE = getattr(settings, 'DJFAKER_PSEUDONYM_FILE', None)
+
+# Alias of the database in which pseudonyms are recorded (table
+# djfaker_pseudonym, created on first use), None to keep them in memory only
+DJFAKER_PSEUDONYM_DATABASE = getattr(
+    settings, 'DJFAKER_PSEUDONYM_DATABASE', None)
+
+# If True, instances are read, faked and written by overlapping stages
+# (see djfaker.pipeline) : a reader thread and a writer thread with their own
+# connections (can be overriden by ModelFaker.PIPELINE)
+DJFAKER_PIPELINE = getattr(settings, 'DJFAKER_PIPELINE', False)
+
+# Number of groups of instances (of 1000 instances) queued between stages of
+# pipelined runs
+DJFAKER_PIPELINE_DEPTH = getattr(settings, 'DJFAKER_PIPELINE_DEPTH', 2)
+
+# Path of the manifest written by djfaker_build_manifest, listing modules
+# defining fakers of each app : djfaker_fake_db only imports them. None (or
+# a missing manifest) to look for `fakers` modules of apps
+DJFAKER_MANIFEST = getattr(settings, 'DJFAKER_MANIFEST', None)
+
+# If True, fakers rewrite their whole table with COPY (see djfaker.rewrite)
+# with PostgreSQL (can be overriden by ModelFaker.REWRITE)
+DJFAKER_REWRITE = getattr(settings, 'DJFAKER_REWRITE', False)
+
+# If True, fakers drop non-unique indexes on replaced columns and disable
+# update triggers of their tables while they run, and tune the connection for
+# bulk writes (see djfaker.maintenance, can be overriden by
+# ModelFaker.MAINTENANCE)
+DJFAKER_MAINTENANCE = getattr(settings, 'DJFAKER_MAINTENANCE', False)
+
+# Settings of connections during maintenance sessions : {vendor: {setting:
+# value}}, None for djfaker.maintenance.TUNINGS (asynchronous commits with
+# PostgreSQL and SQLite)
+DJFAKER_MAINTENANCE_TUNINGS = getattr(
+    settings, 'DJFAKER_MAINTENANCE_TUNINGS', None)
@@ -8,6 +8,19 @@ pre_fake_model = Signal(providing_args=["faked_model"])
 # Sent after faking of a model
 post_fake_model = Signal(providing_args=["faked_model"])
 
+# Sent after faking of a primary key range of a partitioned model
+post_fake_partition = Signal(providing_args=[
+    "faked_model", "partition", "partitions", "pk_range", "count"])
+
+# Sent after fast deletion of instances of a model : `deleted` maps tables
+# to numbers of deleted rows
+post_fake_deletion = Signal(providing_args=["faked_model", "deleted"])
+
+# Sent periodically while faking a model (or a primary key range of a
+# partitioned model) : `count` instances faked at `rate` instances by second
+fake_progress = Signal(providing_args=[
+    "faked_model", "pk_range", "count", "rate"])
+
 # Sent before global faking of all apps
 pre_fake_all = Signal(providing_args=["faked_models"])
 
@@ -1,3 +1,22 @@
 from .base import *
 from .exceptions import *
 from .djfaker_fake_db import *
+from .writers import *
+from .unicity import *
+from .scheduler import *
+from .replacers import *
+from .pushdown import *
+from .plans import *
+from .rng import *
+from .pools import *
+from .journal import *
+from .profiling import *
+from .deletion import *
+from .planner import *
+from .corpus import *
+from .locales import *
+from .pseudonyms import *
+from .pipeline import *
+from .registry import *
+from .rewrite import *
+from .maintenance import *
@@ -1,13 +1,16 @@
-from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.exceptions import ImproperlyConfigured
 from djfaker.replacers import SimpleReplacer, LazyReplacer
 from djfaker.exceptions import FakerUnicityError
+from djfaker.unicity import UnicityChecker
+from djfaker.writers import get_concrete_fields
 from .helpers import FakerBaseTest
-from .testapp.models import FakerTestA, FakerTestB
+from .testapp.models import FakerTestA, FakerTestB, FakerTestC
 from .testapp.fakers import (
-    FakerTestAFaker, FakerTestBFaker,
+    FakerTestAFaker, FakerTestBFaker, FakerTestCFaker,
+    FakerTestAChunkedFaker,
     DummyInvalidFaker1, DummyInvalidFaker2, DummyInvalidFaker3,
     DummyFakerWithoutDeletionQS, DummyFakerWithoutUpdateQS,
-    DummyFakerWithoutReplacers)
+    DummyFakerWithoutReplacers, DummyFakerBrokenUnicity)
 
 
 class ModelFakerTest(FakerBaseTest):
@@ -86,6 +89,103 @@ class ModelFakerTest(FakerBaseTest):
         # Check with no replacer provided : should do nothing
         DummyFakerWithoutReplacers()._run_update()  # How to test it ?
 
+    def test__iter_update_qs(self):
+        """ Test _iter_update_qs method """
+        insts = [FakerTestA.objects.create(prop_w='foo') for i in range(5)]
+        FakerTestA.objects.create(prop_w='bar')
+        pks = [inst.pk for inst in insts]
+        mf = FakerTestAFaker()
+        # All at once
+        with self.assertNumQueries(1):
+            self.assertEqual(pks, [i.pk for i in mf._iter_update_qs()])
+        # By chunks : 2 + 2 + 1
+        with self.assertNumQueries(3):
+            self.assertEqual(
+                pks, [i.pk for i in mf._iter_update_qs(chunk_size=2)])
+        # By chunks : 5 + 0
+        with self.assertNumQueries(2):
+            self.assertEqual(
+                pks, [i.pk for i in mf._iter_update_qs(chunk_size=5)])
+        # Only given fields
+        inst = next(mf._iter_update_qs(fields=['prop_x']))
+        self.assertIn('prop_x', inst.__dict__)
+        self.assertNotIn('prop_y', inst.__dict__)
+
+    def test__get_needed_fields(self):
+        """ Test _get_needed_fields method """
+        mf = FakerTestCFaker()
+        fields = get_concrete_fields(FakerTestC, ['prop_u'])
+        unicity = UnicityChecker(FakerTestC, fields)
+        self.assertEqual(
+            ['prop_u'], mf._get_needed_fields(mf._plan[:1], unicity))
+        self.assertEqual(
+            ['prop_u', 'prop_v'], mf._get_needed_fields(mf._plan[1:], unicity))
+
+    def test__run_update__seed(self):
+        """ Test _run_update method with a seed : values are a function of
+            seed, model and primary key
+        """
+        insts = [FakerTestC.objects.create(prop_u=str(i)) for i in range(4)]
+
+        def fake(seed):
+            FakerTestCFaker()._run_update(seed=seed)
+            return dict(FakerTestC.objects.values_list('pk', 'prop_u'))
+        values = fake(42)
+        self.assertEqual(4, len(set(values.values())))
+        self.assertEqual(values, fake(42))
+        self.assertNotEqual(values, fake(43))
+        # Same values with fewer instances, written by batches, by partitions
+        insts[0].delete()
+        FakerTestCFaker()._run_update(seed=42, batch_size=1, partitions=2)
+        for pk, value in FakerTestC.objects.values_list('pk', 'prop_u'):
+            self.assertEqual(values[pk], value)
+        inst = FakerTestC.objects.get(pk=insts[1].pk)
+        self.assertEqual('{0}-{0}'.format(inst.prop_u), inst.prop_v)
+
+    def test__run_update__chunks(self):
+        """ Test _run_update method with instances loaded by chunks """
+        insts = [FakerTestA.objects.create(prop_w='foo') for i in range(5)]
+        # Faked instances do not match QS_FOR_UPDATE any more
+        FakerTestAChunkedFaker()._run_update()
+        for inst in insts:
+            inst = FakerTestA.objects.get(pk=inst.pk)
+            self.assertEqual('dummyA', inst.prop_w)
+            self.assertEqual('Hello Jack', inst.prop_y)
+
+    def test__get_pk_ranges(self):
+        """ Test _get_pk_ranges method """
+        mf = FakerTestCFaker()
+        self.assertEqual([], mf._get_pk_ranges(3))
+        insts = [FakerTestC.objects.create(prop_u=str(i)) for i in range(7)]
+        first, last = insts[0].pk, insts[-1].pk
+        self.assertEqual(
+            [(first, first + 2), (first + 3, first + 5), (last, last)],
+            mf._get_pk_ranges(3))
+        self.assertEqual([(first, last)], mf._get_pk_ranges(1))
+
+    def test__run_update__partitions(self):
+        """ Test _run_update method with primary key ranges """
+        insts = [FakerTestC.objects.create(prop_u=str(i)) for i in range(7)]
+        self.assertEqual(7, FakerTestCFaker()._run_update(partitions=3))
+        for inst in insts:
+            faked = FakerTestC.objects.get(pk=inst.pk)
+            self.assertEqual('{0}-{0}'.format(faked.prop_u), faked.prop_v)
+        # A single range
+        self.assertEqual(
+            2, FakerTestCFaker()._run_update(pk_range=(insts[0].pk,
+                                                       insts[1].pk)))
+
+    def test__run_update__batch(self):
+        """ Test _run_update method with batched writes """
+        insts = [FakerTestC.objects.create(prop_u=str(i)) for i in range(5)]
+        FakerTestCFaker()._run_update()
+        for inst in insts:
+            faked = FakerTestC.objects.get(pk=inst.pk)
+            self.assertNotEqual(inst.prop_u, faked.prop_u)
+            self.assertEqual('{0}-{0}'.format(faked.prop_u), faked.prop_v)
+        # Batch size can be given at runtime
+        FakerTestAFaker()._run_update(batch_size=10)
+
     def test__run(self):
         """ Test all the whole process ! """
         # Data set
@@ -116,6 +216,19 @@ class ModelFakerTest(FakerBaseTest):
         # Try to re-run a faker should do nothing
         FakerTestAFaker()._run()  # How to test it ?
 
+    def test__run__subclass(self):
+        """ Test _run method of a subclass of a faker already ran """
+
+        class FakerTestASubFaker(FakerTestAFaker):
+            prop_w = 'dummySub'
+
+        FakerTestAFaker()._run(no_deps=True)
+        inst = FakerTestA(prop_w='foo')
+        inst.save()
+        FakerTestASubFaker()._run(no_deps=True)
+        self.assertTrue(FakerTestASubFaker._ran)
+        self.assertEqual('dummySub', FakerTestA.objects.get(pk=inst.pk).prop_w)
+
     def test__run__no_deps(self):
         """ Test _run method with `no_deps` arg True """
         mf = FakerTestAFaker()
@@ -132,11 +245,16 @@ class ModelFakerTest(FakerBaseTest):
 
     def test_broken_unicity(self):
         """ Test broken_unicity """
-        def _mock_validate_unique(inst):
-            _mock_msg = {'prop_unique': 'Imitated broken unicity constraint'}
-            raise ValidationError(_mock_msg)
-        setattr(FakerTestA, "validate_unique", _mock_validate_unique)
-        inst = FakerTestA()
-        inst.save()
-        mf = FakerTestAFaker()
-        self.assertRaises(FakerUnicityError, mf._run_update)
+        FakerTestC.objects.create(prop_u='a')
+        FakerTestC.objects.create(prop_u='b')
+        mf = DummyFakerBrokenUnicity()
+        with self.assertNumQueries(3):
+            # Values loading, instances selection and first instance save
+            # (an UPDATE of replaced fields) : no query is run to check
+            # unicity
+            self.assertRaises(FakerUnicityError, mf._run_update)
+        try:
+            mf._run_update()
+        except FakerUnicityError, e:
+            self.assertEqual(['prop_u'], e.fields)
+            self.assertEqual([('prop_u', )], e.constraints)
@@ -0,0 +1 @@
+""" Django app of the benchmark (see benchmark.py) """
@@ -0,0 +1,74 @@
+""" Representative fakers run by the benchmark (see benchmark.py) """
+from . import models
+from djfaker import data, replacers, ModelFaker
+
+
+class BenchNativeFaker(ModelFaker):
+    """ Builtin values only """
+    FAKER_FOR = models.BenchPerson
+
+    phone = '0000000000'
+    serial = 'X'
+
+
+class BenchSimpleFaker(ModelFaker):
+    """ Simple replacers """
+    FAKER_FOR = models.BenchPerson
+
+    first_name = replacers.ChoiceReplacer(data.FIRST_NAMES)
+    last_name = replacers.ChoiceReplacer(data.LAST_NAMES)
+    phone = replacers.PhoneReplacer()
+    serial = replacers.SerialReplacer()
+
+
+class BenchLazyFaker(ModelFaker):
+    """ Lazy replacers reading replaced fields """
+    FAKER_FOR = models.BenchPerson
+
+    first_name = replacers.ChoiceReplacer(data.FIRST_NAMES)
+    last_name = replacers.ChoiceReplacer(data.LAST_NAMES)
+    email = replacers.LazyEmailReplacer(tokens=['first_name', 'last_name'])
+    serial = replacers.TextReplacer('{0}-{1}', tokens=['first_name', 'phone'])
+
+
+class BenchUniqueFaker(ModelFaker):
+    """ Values checked against a unique constraint """
+    FAKER_FOR = models.BenchPerson
+
+    username = replacers.SerialReplacer(len=12)
+
+
+class BenchUniqueLazyFaker(ModelFaker):
+    """ Collision-free values of a unique field """
+    FAKER_FOR = models.BenchPerson
+
+    first_name = replacers.ChoiceReplacer(data.FIRST_NAMES)
+    last_name = replacers.ChoiceReplacer(data.LAST_NAMES)
+    username = replacers.LazyUsernameReplacer(
+        tokens=['first_name', 'last_name'], unique=True)
+
+
+class BenchPasswordFaker(ModelFaker):
+    """ Hashed passwords """
+    FAKER_FOR = models.BenchPerson
+
+    password = replacers.LazyPasswordReplacer(
+        tokens=['first_name', 'last_name'])
+
+
+class BenchCompanyFaker(ModelFaker):
+    """ First faker of a DEPENDS_ON chain """
+    FAKER_FOR = models.BenchCompany
+
+    name = replacers.CompanyReplacer()
+    website = replacers.LazyCompanyWebsiteReplacer(tokens=['name'])
+
+
+class BenchChainFaker(ModelFaker):
+    """ Last faker of a DEPENDS_ON chain """
+    FAKER_FOR = models.BenchPerson
+    DEPENDS_ON = ('djfaker.tests.benchapp.fakers.BenchCompanyFaker', )
+
+    first_name = replacers.ChoiceReplacer(data.FIRST_NAMES)
+    last_name = replacers.ChoiceReplacer(data.LAST_NAMES)
+    email = replacers.LazyEmailReplacer(tokens=['first_name', 'last_name'])
@@ -0,0 +1,18 @@
+""" Provides models of the benchmark (see benchmark.py) """
+from django.db import models
+
+
+class BenchCompany(models.Model):
+    name = models.CharField(max_length=100)
+    website = models.CharField(max_length=100)
+
+
+class BenchPerson(models.Model):
+    company = models.ForeignKey(BenchCompany, null=True)
+    first_name = models.CharField(max_length=100)
+    last_name = models.CharField(max_length=100)
+    email = models.CharField(max_length=100)
+    username = models.CharField(max_length=100, unique=True)
+    password = models.CharField(max_length=128)
+    phone = models.CharField(max_length=20)
+    serial = models.CharField(max_length=20)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+""" Test corpora """
+import codecs
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.utils.six import StringIO
+
+from djfaker import corpus, replacers
+from djfaker.corpus import Corpus, LazyCorpus, write_corpus, \
+    register_corpus, get_corpus
+from djfaker.exceptions import FakerCorpusError
+from djfaker.pools import ProductPool
+
+
+class CorpusTest(SimpleTestCase):
+    """ Test corpus files and registry """
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+        corpus._corpora.pop('test_names', None)
+
+    def test_corpus(self):
+        count = write_corpus(self.path, [u'Léa', 'Hugo', '', u'Léa', 'Zoé'])
+        self.assertEqual(3, count)
+        words = Corpus(self.path)
+        # The file is mapped on first access
+        self.assertEqual(None, words._map)
+        self.assertEqual(3, len(words))
+        self.assertEqual(u'Léa', words[0])
+        self.assertEqual(u'Zoé', words[2])
+        self.assertEqual(u'Zoé', words[-1])
+        self.assertRaises(IndexError, words.__getitem__, 3)
+        self.assertEqual([u'Léa', u'Hugo', u'Zoé'], list(words))
+        words.close()
+        self.assertEqual(u'Hugo', words[1])
+
+        write_corpus(self.path, [])
+        self.assertEqual([], list(Corpus(self.path)))
+
+    def test_corpus__invalid(self):
+        with open(self.path, 'w') as invalid:
+            invalid.write('first\nsecond\n')
+        self.assertRaises(FakerCorpusError, len, Corpus(self.path))
+        self.assertRaises(FakerCorpusError, len, Corpus(self.path + '.no'))
+
+    def test_registry(self):
+        self.assertRaises(FakerCorpusError, get_corpus, 'test_names')
+        first_names = get_corpus('first_names')
+        self.assertEqual(len(set(first_names)), len(first_names))
+
+        write_corpus(self.path, ['Anna', 'Bob'])
+        register_corpus('test_names', self.path)
+        lazy = LazyCorpus('test_names')
+        self.assertEqual([u'Anna', u'Bob'], list(lazy))
+        self.assertIsInstance(lazy.resolve(), Corpus)
+        register_corpus('test_names', ['Anna', 'Anna', 'Bob'])
+        self.assertEqual(('Anna', 'Bob'), get_corpus('test_names'))
+
+    def test_replacers(self):
+        write_corpus(self.path, ['Anna', 'Bob'])
+        words = Corpus(self.path)
+        replacer = replacers.ChoiceReplacer(words)
+        self.assertTrue(set(replacer.apply_many(10)) <= set(words))
+        self.assertEqual(2, replacer.get_cardinality())
+        # Corpora are not copied by pools
+        pool = ProductPool([words, ['1', '2']])
+        self.assertIs(words, pool.sequences[0])
+        self.assertEqual(u'Bob 1', pool[2])
+        # Builtin replacers use lazy corpora
+        self.assertIsInstance(replacers.CompanyReplacer.COMPANIES, LazyCorpus)
+
+    def test_command(self):
+        fd, text = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            with codecs.open(text, 'w', encoding='utf-8') as lines:
+                lines.write(u'Léa\nHugo\n\nLéa\n')
+            stdout = StringIO()
+            call_command('djfaker_build_corpus', self.path, text,
+                         stdout=stdout)
+        finally:
+            os.remove(text)
+        self.assertEqual([u'Léa', u'Hugo'], list(Corpus(self.path)))
+        self.assertIn('2 word(s)', stdout.getvalue())
@@ -0,0 +1,111 @@
+""" Test set-based deletion """
+from django.db import connection
+from django.db.models import signals
+from django.db.models.deletion import ProtectedError
+
+from djfaker.deletion import DeletionPlan, DELETE, UPDATE, plan_deletion
+from djfaker.signals import post_fake_deletion
+
+from .helpers import FakerBaseTest
+from .testapp.fakers import FakerTestOwnerFaker
+from .testapp.models import FakerTestB, FakerTestOwner, \
+    FakerTestSpecialOwner, FakerTestItem, FakerTestItemNote, \
+    FakerTestWatcher, FakerTestLock, FakerTestNode
+
+
+class DeletionTest(FakerBaseTest):
+    """ Test DeletionPlan and fast deletion of fakers """
+
+    def _create_owner(self, closed=True, model=FakerTestOwner):
+        owner = model.objects.create(closed=closed)
+        item = FakerTestItem.objects.create(owner=owner)
+        FakerTestItemNote.objects.create(item=item)
+        FakerTestItemNote.objects.create(item=item)
+        FakerTestWatcher.objects.create(owner=owner)
+        owner.tags.add(FakerTestB.objects.create(prop_z='tag'))
+        return owner
+
+    def test_plan(self):
+        plan = DeletionPlan(FakerTestOwner, connection)
+        deleted = [op.model for op in plan.operations if op.action == DELETE]
+        through = FakerTestOwner.tags.through
+        for model in (FakerTestItemNote, FakerTestItem, through,
+                      FakerTestSpecialOwner):
+            self.assertTrue(deleted.index(model)
+                            < deleted.index(FakerTestOwner))
+        self.assertTrue(deleted.index(FakerTestItemNote)
+                        < deleted.index(FakerTestItem))
+        self.assertEqual([FakerTestWatcher], [
+            op.model for op in plan.operations if op.action == UPDATE])
+        self.assertEqual([FakerTestLock], [op.model for op in plan.checks])
+        # Parents of a child model are deleted after it
+        plan = DeletionPlan(FakerTestSpecialOwner, connection)
+        deleted = [op.model for op in plan.operations if op.action == DELETE]
+        self.assertTrue(deleted.index(FakerTestSpecialOwner)
+                        < deleted.index(FakerTestOwner))
+        # Circular cascades can not be planned
+        self.assertEqual(None, plan_deletion(FakerTestNode))
+
+    def test__run_deletion(self):
+        closed = [self._create_owner(), self._create_owner(),
+                  self._create_owner(model=FakerTestSpecialOwner)]
+        kept = self._create_owner(closed=False)
+        reports = []
+
+        def receiver(sender, faked_model, deleted, **kwargs):
+            reports.append(deleted)
+        post_fake_deletion.connect(receiver)
+        try:
+            deleted = FakerTestOwnerFaker()._run_deletion()
+        finally:
+            post_fake_deletion.disconnect(receiver)
+
+        self.assertEqual([deleted], reports)
+        self.assertEqual(3, deleted[FakerTestOwner._meta.db_table])
+        self.assertEqual(1, deleted[FakerTestSpecialOwner._meta.db_table])
+        self.assertEqual(3, deleted[FakerTestItem._meta.db_table])
+        self.assertEqual(6, deleted[FakerTestItemNote._meta.db_table])
+        self.assertEqual(
+            3, deleted[FakerTestOwner.tags.through._meta.db_table])
+        self.assertEqual([kept.pk], [
+            o.pk for o in FakerTestOwner.objects.all()])
+        self.assertEqual(1, FakerTestItem.objects.count())
+        self.assertEqual(2, FakerTestItemNote.objects.count())
+        self.assertEqual(1, kept.tags.count())
+        self.assertEqual(4, FakerTestWatcher.objects.count())
+        self.assertEqual(3, FakerTestWatcher.objects.filter(
+            owner__isnull=True).count())
+        self.assertFalse(closed[0].tags.exists())
+
+    def test__run_deletion__chunks(self):
+        for i in range(3):
+            FakerTestOwner.objects.create(closed=True)
+        plan = plan_deletion(FakerTestOwner)
+        statements = len(plan.checks) + len(plan.operations)
+        # A chunk of primary keys is loaded, then the plan is run, until no
+        # primary key is left
+        with self.assertNumStatements(3 * (1 + statements) + 1):
+            deleted = plan.run(FakerTestOwner.objects.all(), 1)
+        self.assertEqual(3, deleted[FakerTestOwner._meta.db_table])
+
+    def test__run_deletion__protected(self):
+        owner = self._create_owner()
+        FakerTestLock.objects.create(owner=owner)
+        self.assertRaises(ProtectedError, FakerTestOwnerFaker()._run_deletion)
+        self.assertEqual(1, FakerTestOwner.objects.count())
+        self.assertEqual(2, FakerTestItemNote.objects.count())
+
+    def test__run_deletion__signals(self):
+        """ Test deletion listened by signals is run by Django """
+        self._create_owner()
+        received = []
+
+        def receiver(sender, instance, **kwargs):
+            received.append(instance)
+        signals.pre_delete.connect(receiver, sender=FakerTestItem)
+        try:
+            self.assertEqual(None, FakerTestOwnerFaker()._run_deletion())
+        finally:
+            signals.pre_delete.disconnect(receiver, sender=FakerTestItem)
+        self.assertEqual(1, len(received))
+        self.assertEqual(0, FakerTestOwner.objects.count())
@@ -1,11 +1,18 @@
 """ Test djfaker_fake_db command """
 from django.core.exceptions import ImproperlyConfigured
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils.six import StringIO
 
-from djfaker.management.commands.djfaker_fake_db import autodiscover_models
+from djfaker.management.commands.djfaker_fake_db import Command, \
+    autodiscover_models
+from djfaker.signals import post_fake_partition, post_fake_deletion, \
+    fake_progress
 
 from .helpers import FakerBaseTest
-from .testapp.fakers import FakerTestAFaker, FakerTestBFaker
+from .testapp.fakers import FakerTestAFaker, FakerTestBFaker, \
+    FakerTestCFaker, FakerTestAChunkedFaker
+from .testapp.models import FakerTestC, FakerTestOwner
 from .testapp2.fakers import DummyEmptyFaker
 
 
@@ -20,6 +27,19 @@ class DJFakerFakeDBTest(FakerBaseTest):
         self.assertIn(FakerTestAFaker, models)
         self.assertIn(FakerTestBFaker, models)
         self.assertIn(DummyEmptyFaker, models)
+        # Variants of other fakers are opted out
+        self.assertNotIn(FakerTestAChunkedFaker, models)
+
+        # Indirect subclasses are run, unless they opt out
+        class FakerTestBSubFaker(FakerTestBFaker):
+            pass
+
+        class FakerTestBVariantFaker(FakerTestBSubFaker):
+            AUTODISCOVER = False
+
+        models = autodiscover_models()
+        self.assertIn(FakerTestBSubFaker, models)
+        self.assertNotIn(FakerTestBVariantFaker, models)
 
         # With app
         models = autodiscover_models('djfaker.tests.testapp')
@@ -44,3 +64,62 @@ class DJFakerFakeDBTest(FakerBaseTest):
                      model='FakerTestAFaker')
         self.assertTrue(FakerTestAFaker._ran)
         self.assertTrue(FakerTestBFaker._ran)
+
+    def test_command__partitions(self):
+        """ Test a command call with partitions """
+        for i in range(4):
+            FakerTestC.objects.create(prop_u=str(i))
+        stdout = StringIO()
+        call_command('djfaker_fake_db',
+                     app='djfaker.tests.testapp',
+                     model='FakerTestCFaker',
+                     partitions=2,
+                     stdout=stdout)
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(2, len(lines))
+        self.assertIn('FakerTestCFaker : partition 1/2', lines[0])
+        self.assertIn('2 instance(s) faked', lines[0])
+
+    def test_command__seed(self):
+        """ Test a command call with a seed """
+        inst = FakerTestC.objects.create(prop_u='foo')
+        values = []
+        for i in range(2):
+            FakerTestCFaker._ran = False
+            call_command('djfaker_fake_db',
+                         app='djfaker.tests.testapp',
+                         model='FakerTestCFaker',
+                         seed='staging')
+            values.append(FakerTestC.objects.get(pk=inst.pk).prop_u)
+        self.assertNotEqual('foo', values[0])
+        self.assertEqual(values[0], values[1])
+
+    def test_command__resume_without_journal(self):
+        """ Test a resumed command call needs a journal """
+        self.assertRaises(CommandError, call_command, 'djfaker_fake_db',
+                          app='djfaker.tests.testapp', resume=True)
+
+    def test_command__fast_deletion(self):
+        """ Test a command call reporting fast deletions """
+        FakerTestOwner.objects.create(closed=True)
+        stdout = StringIO()
+        call_command('djfaker_fake_db',
+                     app='djfaker.tests.testapp',
+                     model='FakerTestOwnerFaker',
+                     fast_deletion=True,
+                     stdout=stdout)
+        self.assertIn('FakerTestOwnerFaker : 1 row(s) deleted from '
+                      'testapp_fakertestowner', stdout.getvalue())
+        self.assertFalse(FakerTestOwner.objects.exists())
+
+    def test_command__receivers(self):
+        """ Test receivers connected by the command are disconnected once
+            fakers have run
+        """
+        command = Command()
+        command.stdout = StringIO()
+        command.handle(app='djfaker.tests.testapp', model='FakerTestCFaker',
+                       progress=1.0)
+        for signal in (post_fake_partition, post_fake_deletion,
+                       fake_progress):
+            self.assertFalse(signal.has_listeners())
@@ -13,3 +13,12 @@ class FakerUnicityErrorTest(FakerBaseTest):
         except FakerUnicityError, e:
             msg = "Can't find a unique value for field(s) : field1, field2"
             self.assertEqual(msg, str(e))
+
+    def test___str____constraints(self):
+        """ Test __str__ method with constraints and faker """
+        e = FakerUnicityError(('field1', 'field2'), [('field1', 'field2')],
+                              FakerUnicityErrorTest)
+        msg = ("FakerUnicityErrorTest : Can't find a unique value for "
+               "field(s) : field1, field2 (broken unique constraint(s) : "
+               "(field1, field2))")
+        self.assertEqual(msg, str(e))
@@ -1,9 +1,12 @@
 """ Some helpers for testing  """
+from contextlib import contextmanager
+
 from django.core.management import call_command
 from django.conf import settings
+from django.db import connections, DEFAULT_DB_ALIAS
 from django.db.models import loading
 from django.test import TestCase
-from .testapp.fakers import FakerTestAFaker, FakerTestBFaker
+from .testapp.fakers import FakerTestAFaker, FakerTestBFaker, FakerTestCFaker
 
 
 class FakerBaseTest(TestCase):
@@ -21,6 +24,29 @@ class FakerBaseTest(TestCase):
         super(FakerBaseTest, self).setUp()
         FakerTestBFaker._ran = False
         FakerTestAFaker._ran = False
+        FakerTestCFaker._ran = False
+
+    @contextmanager
+    def assertNumStatements(self, num, using=DEFAULT_DB_ALIAS):
+        """ assertNumQueries() ignoring savepoints : atomic() blocks nested
+            in the transaction of a test create them since Django 1.6
+        """
+        connection = connections[using]
+        # Renamed by Django 1.8
+        flag = hasattr(connection, 'force_debug_cursor') and \
+            'force_debug_cursor' or 'use_debug_cursor'
+        debug = getattr(connection, flag)
+        setattr(connection, flag, True)
+        start = len(connection.queries)
+        try:
+            yield
+        finally:
+            setattr(connection, flag, debug)
+        queries = [q['sql'] for q in list(connection.queries)[start:]
+                   if 'SAVEPOINT' not in q['sql'].upper()]
+        self.assertEqual(num, len(queries), '%d queries executed, %d '
+                         'expected :\n%s' % (len(queries), num,
+                                              '\n'.join(queries)))
 
     def _post_teardown(self):
         settings.INSTALLED_APPS = self.old_installed_apps
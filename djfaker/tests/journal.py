@@ -0,0 +1,105 @@
+""" Test checkpoint journal """
+import os
+import tempfile
+
+from djfaker.journal import Journal
+from djfaker.scheduler import get_faker_path
+
+from .helpers import FakerBaseTest
+from .testapp.fakers import FakerTestCFaker, FakerTestCIncrementalFaker
+from .testapp.models import FakerTestC
+
+
+class JournalTest(FakerBaseTest):
+    """ Test Journal class and resumed / incremental runs """
+
+    def setUp(self):
+        super(JournalTest, self).setUp()
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        FakerTestCIncrementalFaker._ran = False
+
+    def tearDown(self):
+        os.remove(self.path)
+        super(JournalTest, self).tearDown()
+
+    def test_journal(self):
+        journal = Journal(self.path)
+        journal.checkpoint('a.fakers.A', 10)
+        journal.partition_done('a.fakers.B', (1, 5))
+        journal.done('a.fakers.C', 3)
+        journal.begin('a.fakers.D', 7)
+        journal.begin('a.fakers.D', 8)
+        journal.split('a.fakers.D', [(1, 5), (6, 9)])
+        with open(self.path, 'a') as f:
+            f.write('{"event": "check')
+        journal = Journal(self.path, resume=True)
+        self.assertEqual(10, journal.get_pk('a.fakers.A'))
+        self.assertFalse(journal.is_done('a.fakers.A'))
+        self.assertTrue(journal.is_partition_done('a.fakers.B', [1, 5]))
+        self.assertFalse(journal.is_partition_done('a.fakers.B', [6, 9]))
+        self.assertTrue(journal.is_done('a.fakers.C'))
+        self.assertEqual(3, journal.get_watermark('a.fakers.C'))
+        # A resumed faker keeps its first watermark and ranges
+        self.assertEqual(7, journal.get_begin_watermark('a.fakers.D'))
+        self.assertEqual([(1, 5), (6, 9)], journal.get_ranges('a.fakers.D'))
+        # A new run forgets progress, but not watermarks
+        journal = Journal(self.path)
+        self.assertEqual(None, journal.get_pk('a.fakers.A'))
+        self.assertFalse(journal.is_done('a.fakers.C'))
+        self.assertEqual(3, journal.get_watermark('a.fakers.C'))
+
+    def test_resume(self):
+        insts = [FakerTestC.objects.create(prop_u=str(i)) for i in range(5)]
+        path = get_faker_path(FakerTestCFaker)
+        journal = Journal(self.path)
+        journal.checkpoint(path, insts[2].pk)
+        FakerTestCFaker()._run(journal=Journal(self.path, resume=True))
+        values = FakerTestC.objects.order_by('pk').values_list(
+            'prop_u', flat=True)
+        self.assertEqual(['0', '1', '2'], list(values[:3]))
+        self.assertNotIn('3', values)
+        self.assertNotIn('4', values)
+        journal = Journal(self.path, resume=True)
+        self.assertEqual(insts[4].pk, journal.get_pk(path))
+        self.assertTrue(journal.is_done(path))
+        # Completed fakers are skipped
+        FakerTestCFaker._ran = False
+        FakerTestCFaker()._run(journal=journal)
+        self.assertTrue(FakerTestCFaker._ran)
+        self.assertEqual(list(values), list(FakerTestC.objects.order_by(
+            'pk').values_list('prop_u', flat=True)))
+
+    def test_resume__partitions(self):
+        insts = [FakerTestC.objects.create(prop_u=str(i)) for i in range(4)]
+        path = get_faker_path(FakerTestCFaker)
+        journal = Journal(self.path)
+        journal.split(path, [(insts[0].pk, insts[1].pk),
+                             (insts[2].pk, insts[3].pk)])
+        journal.partition_done(path, (insts[0].pk, insts[1].pk))
+        # Ranges of the first run are kept whatever the number of partitions
+        FakerTestCFaker()._run_update(
+            partitions=3, journal=Journal(self.path, resume=True))
+        values = FakerTestC.objects.order_by('pk').values_list(
+            'prop_u', flat=True)
+        self.assertEqual(['0', '1'], list(values[:2]))
+        self.assertNotIn('2', values)
+        journal = Journal(self.path, resume=True)
+        self.assertTrue(journal.is_partition_done(
+            path, (insts[2].pk, insts[3].pk)))
+
+    def test_incremental(self):
+        old = FakerTestC.objects.create(prop_u='old', version=1)
+        FakerTestCIncrementalFaker()._run(journal=Journal(self.path),
+                                          incremental=True)
+        old = FakerTestC.objects.get(pk=old.pk)
+        self.assertNotEqual('old', old.prop_u)
+        journal = Journal(self.path)
+        path = get_faker_path(FakerTestCIncrementalFaker)
+        self.assertEqual(1, journal.get_watermark(path))
+        new = FakerTestC.objects.create(prop_u='new', version=2)
+        FakerTestCIncrementalFaker._ran = False
+        FakerTestCIncrementalFaker()._run(journal=journal, incremental=True)
+        self.assertNotEqual('new', FakerTestC.objects.get(pk=new.pk).prop_u)
+        self.assertEqual(old.prop_u, FakerTestC.objects.get(pk=old.pk).prop_u)
+        self.assertEqual(2, Journal(self.path).get_watermark(path))
@@ -0,0 +1,89 @@
+""" Test locale providers """
+import random
+import re
+
+from django.test import SimpleTestCase
+
+from djfaker import corpus, locales, replacers, ModelFaker
+from djfaker.corpus import LazyCorpus
+from djfaker.locales import NumberFormat, Provider, get_provider, \
+    active_provider, use_locale, DEFAULT_LOCALE
+
+from .helpers import FakerBaseTest
+from .testapp.models import FakerTestC
+
+
+class LocalesTest(SimpleTestCase):
+    """ Test providers and their use by replacers """
+
+    def setUp(self):
+        locales._providers['zz'] = Provider(
+            'zz', {'phone': ['(+99)#']}, {'last_names': ['ZED', 'ZED']})
+
+    def tearDown(self):
+        locales._providers.pop('zz', None)
+        corpus._corpora.pop('last_names.zz', None)
+
+    def test_number_format(self):
+        number_format = NumberFormat('(+33)%%#######')
+        self.assertEqual(['(+33)', (1, 9, 1), (10000000, 90000000, 1)],
+                         number_format.parts)
+        self.assertEqual(9 * 90000000, number_format.cardinality)
+        number_format = NumberFormat('0#-##')
+        self.assertEqual('0%01d-%02d', number_format.tpl)
+        for value in number_format.apply_many(20, random):
+            self.assertTrue(re.match(r'^0\d-\d\d$', value), value)
+
+    def test_get_provider(self):
+        self.assertEqual(DEFAULT_LOCALE, get_provider().locale)
+        self.assertEqual('de', get_provider('de_CH').locale)
+        self.assertIs(get_provider('de'), get_provider('de-ch'))
+        self.assertEqual(DEFAULT_LOCALE, get_provider('xx').locale)
+        # Missing formats are the ones of the default locale
+        self.assertEqual(
+            ['(+1)%##%######'],
+            [f.pattern for f in get_provider('en-us').get_formats(
+                'mobile', 'phone')])
+        self.assertEqual(get_provider().get_formats('mobile'),
+                         get_provider('en-us').get_formats('mobile'))
+
+    def test_use_locale(self):
+        replacer = replacers.PhoneReplacer()
+        with use_locale('zz') as provider:
+            self.assertIs(provider, active_provider())
+            self.assertEqual(10, len(set(replacer.apply_many(100))))
+            self.assertEqual(10, replacer.get_cardinality())
+            # Formats are compiled once by provider
+            self.assertIs(provider, replacer._formats[0])
+            self.assertEqual(('ZED', ), LazyCorpus('last_names').resolve())
+            self.assertEqual(get_provider().get_corpus('first_names'),
+                             LazyCorpus('first_names').resolve())
+        self.assertIsNot(provider, active_provider())
+        self.assertTrue(replacer.apply().startswith('(+33)'))
+        self.assertNotEqual(('ZED', ), LazyCorpus('last_names').resolve())
+
+    def test_mobile_replacer(self):
+        with use_locale('de'):
+            values = replacers.MobileReplacer().apply_many(50)
+        prefixes = set(value[:7] for value in values)
+        self.assertTrue(prefixes <= set(['(+49)15', '(+49)16', '(+49)17']))
+
+
+class LocaleFakerTest(FakerBaseTest):
+    """ Test locale of fakers """
+
+    def test_faker_locale(self):
+        class Faker(ModelFaker):
+            FAKER_FOR = FakerTestC
+            LOCALE = 'it'
+            prop_v = replacers.PhoneReplacer()
+
+        for i in range(3):
+            FakerTestC.objects.create(prop_u=str(i))
+        Faker()._run_update()
+        for value in FakerTestC.objects.values_list('prop_v', flat=True):
+            self.assertTrue(value.startswith('(+39)0'), value)
+        # The locale option overrides it
+        Faker()._run_update(locale='es', batch_size=2)
+        for value in FakerTestC.objects.values_list('prop_v', flat=True):
+            self.assertTrue(value.startswith('(+34)9'), value)
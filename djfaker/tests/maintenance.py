@@ -0,0 +1,115 @@
+""" Test maintenance sessions """
+from unittest import skipUnless
+
+from django.db import connection
+
+from djfaker import ModelFaker, replacers
+from djfaker.maintenance import MaintenanceSession, get_tables, \
+    maintenance_session
+
+from .helpers import FakerBaseTest
+from .testapp.models import FakerTestA, FakerTestSpecialOwner
+
+TABLE = 'testapp_fakertesta'
+
+# Indexes and triggers of TABLE created by tests
+SCHEMA = [
+    ('index', 'djfaker_test_w',
+     'CREATE INDEX djfaker_test_w ON testapp_fakertesta (prop_w)'),
+    ('index', 'djfaker_test_x',
+     'CREATE INDEX djfaker_test_x ON testapp_fakertesta (prop_x)'),
+    ('index', 'djfaker_test_unique_w',
+     'CREATE UNIQUE INDEX djfaker_test_unique_w '
+     'ON testapp_fakertesta (prop_w, id)'),
+    ('trigger', 'djfaker_test_update_w',
+     'CREATE TRIGGER djfaker_test_update_w AFTER UPDATE OF prop_w '
+     'ON testapp_fakertesta BEGIN SELECT 1; END'),
+    ('trigger', 'djfaker_test_update',
+     'CREATE TRIGGER djfaker_test_update AFTER UPDATE '
+     'ON testapp_fakertesta BEGIN SELECT 1; END'),
+    ('trigger', 'djfaker_test_update_old',
+     'CREATE TRIGGER djfaker_test_update_old AFTER UPDATE OF old '
+     'ON testapp_fakertesta BEGIN SELECT 1; END'),
+    ('trigger', 'djfaker_test_insert',
+     'CREATE TRIGGER djfaker_test_insert AFTER INSERT '
+     'ON testapp_fakertesta BEGIN SELECT 1; END'),
+]
+
+
+class BrokenReplacer(replacers.SimpleReplacer):
+    """ Fails while instances are faked """
+
+    def apply(self):
+        raise ValueError()
+
+
+class MaintenanceTest(FakerBaseTest):
+    """ Test maintenance sessions (DDL commits with SQLite : created rows,
+        indexes and triggers are removed by tearDown)
+    """
+
+    def setUp(self):
+        super(MaintenanceTest, self).setUp()
+        if connection.vendor == 'sqlite':
+            cursor = connection.cursor()
+            for kind, name, sql in SCHEMA:
+                cursor.execute(sql)
+
+    def tearDown(self):
+        if connection.vendor == 'sqlite':
+            # Rows are deleted by the transaction DDL commits
+            FakerTestA.objects.all().delete()
+            cursor = connection.cursor()
+            for kind, name, sql in SCHEMA:
+                cursor.execute('DROP {0} IF EXISTS {1}'.format(kind, name))
+        super(MaintenanceTest, self).tearDown()
+
+    def _get_schema(self):
+        cursor = connection.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE tbl_name = %s "
+                       "AND name LIKE 'djfaker_test_%%'", [TABLE])
+        return set(name for name, in cursor.fetchall())
+
+    def _get_synchronous(self):
+        cursor = connection.cursor()
+        cursor.execute('PRAGMA synchronous')
+        return cursor.fetchone()[0]
+
+    def test_get_tables(self):
+        self.assertEqual({TABLE: set(['prop_w', 'old'])},
+                         get_tables(FakerTestA, ['prop_w', 'old', 'id']))
+        # Fields stored in parent tables
+        self.assertEqual(
+            {'testapp_fakertestowner': set(['closed']),
+             'testapp_fakertestspecialowner': set(['level'])},
+            get_tables(FakerTestSpecialOwner, ['closed', 'level']))
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite catalog is read')
+    def test_session(self):
+        schema = self._get_schema()
+        synchronous = self._get_synchronous()
+        with MaintenanceSession(connection, {TABLE: set(['prop_w'])},
+                                {'synchronous': 'OFF'}):
+            self.assertEqual(schema - set(
+                ['djfaker_test_w', 'djfaker_test_update_w',
+                 'djfaker_test_update']), self._get_schema())
+            self.assertEqual(0, self._get_synchronous())
+        self.assertEqual(schema, self._get_schema())
+        self.assertEqual(synchronous, self._get_synchronous())
+        # Disabled sessions do nothing
+        with maintenance_session(FakerTestA, ['prop_w'], False):
+            self.assertEqual(schema, self._get_schema())
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite catalog is read')
+    def test_failed_run(self):
+
+        class BrokenFaker(ModelFaker):
+            FAKER_FOR = FakerTestA
+            MAINTENANCE = True
+            prop_x = BrokenReplacer()
+
+        FakerTestA.objects.create()
+        schema = self._get_schema()
+        self.assertRaises(ValueError, BrokenFaker()._run, no_deps=True)
+        # Indexes and triggers are rebuilt
+        self.assertEqual(schema, self._get_schema())
@@ -0,0 +1,102 @@
+""" Test pipelined runs """
+import threading
+
+from django.test import SimpleTestCase
+
+from djfaker.pipeline import Pipeline, Sequential
+from djfaker.profiling import FakerProfile
+
+from .helpers import FakerBaseTest
+from .testapp.fakers import FakerTestCFaker
+from .testapp.models import FakerTestC
+
+
+class DummyWriter(object):
+    """ Records written values and the threads writing them """
+
+    def __init__(self, fail_on=None):
+        self.written = []
+        self.threads = set()
+        self.flushed = 0
+        self.fail_on = fail_on
+
+    def get_values(self, instance):
+        return (instance, )
+
+    def write(self, instance, original=None):
+        if instance == self.fail_on:
+            raise ValueError(instance)
+        self.threads.add(threading.current_thread().name)
+        self.written.append((instance, original))
+
+    def flush(self):
+        self.flushed += 1
+
+
+class PipelineTest(SimpleTestCase):
+    """ Test Pipeline and Sequential stages """
+
+    def _run(self, stages, fail_on=None):
+        with stages:
+            for group in stages:
+                for value in group:
+                    if value == fail_on:
+                        raise KeyError(value)
+                    stages.target.write(value * 10, (value, ))
+        return stages
+
+    def test_pipeline(self):
+        writer = DummyWriter()
+        profile = FakerProfile('Faker')
+        groups = [[1, 2], [3], [4, 5]]
+        self._run(Pipeline(iter(groups), writer, profile, depth=1))
+        self.assertEqual([(10, (1, )), (20, (2, )), (30, (3, )),
+                          (40, (4, )), (50, (5, ))], writer.written)
+        self.assertEqual(1, writer.flushed)
+        self.assertNotIn(threading.current_thread().name, writer.threads)
+        self.assertIn('write', profile.phases)
+
+        writer = DummyWriter()
+        self._run(Sequential(iter(groups), writer, profile))
+        self.assertEqual(5, len(writer.written))
+        self.assertEqual(set([threading.current_thread().name]),
+                         writer.threads)
+
+    def test_errors(self):
+        def _source():
+            yield [1]
+            raise IOError('reader')
+
+        profile = FakerProfile('Faker')
+        # Errors of stages are raised in the calling thread
+        self.assertRaises(IOError, self._run,
+                          Pipeline(_source(), DummyWriter(), profile))
+        writer = DummyWriter(fail_on=20)
+        groups = [[i] for i in range(100)]
+        self.assertRaises(ValueError, self._run,
+                          Pipeline(iter(groups), writer, profile))
+        self.assertEqual(0, writer.flushed)
+        # Errors of the calling thread stop other stages
+        writer = DummyWriter()
+        stages = Pipeline(iter(groups), writer, profile, depth=1)
+        self.assertRaises(KeyError, self._run, stages, fail_on=5)
+        self.assertFalse(stages.reading.is_alive())
+        self.assertFalse(stages.writing.is_alive())
+        self.assertEqual(0, writer.flushed)
+
+
+class PipelinedFakerTest(FakerBaseTest):
+    """ Test pipelined fakers """
+
+    def test_is_pipelined(self):
+        faker = FakerTestCFaker()
+        self.assertFalse(faker._is_pipelined())
+        # SQLite locks the whole database while writing
+        self.assertFalse(faker._is_pipelined(pipeline=True))
+
+    def test_run_update(self):
+        for i in range(3):
+            FakerTestC.objects.create(prop_u=str(i))
+        self.assertEqual(3, FakerTestCFaker()._run_update(pipeline=True))
+        self.assertEqual(0, FakerTestC.objects.filter(
+            prop_u__in=['0', '1', '2']).count())
@@ -0,0 +1,145 @@
+""" Test dry-run planner """
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.utils.six import StringIO
+
+from djfaker import replacers, ModelFaker
+from djfaker.planner import Costs, plan_faker, plan_run, format_plan, \
+    format_duration, EXHAUSTED, AT_RISK, WRITE_COSTS
+from djfaker.plans import NATIVE, SIMPLE, LAZY
+
+from .helpers import FakerBaseTest
+from .testapp.fakers import FakerTestAFaker, FakerTestBFaker, \
+    FakerTestCFaker, FakerTestAPushdownFaker, FakerTestOwnerFaker
+from .testapp.models import FakerTestA, FakerTestB, FakerTestC, \
+    FakerTestOwner
+
+
+class PlannerTest(FakerBaseTest):
+    """ Test plans of fakers runs """
+
+    def test_plan_run(self):
+        FakerTestB.objects.create(prop_z='foo')
+        FakerTestA.objects.create(old=True)
+        FakerTestA.objects.create()
+        FakerTestA.objects.create(prop_w='bar')
+        plans = plan_run([FakerTestAFaker])
+        self.assertEqual([FakerTestBFaker, FakerTestAFaker],
+                         [p.faker for p in plans])
+        plan = plans[1]
+        self.assertEqual(1, plan.deletion)
+        self.assertEqual(None, plan.cascades)
+        self.assertEqual(2, plan.update)
+        self.assertEqual(3, plan.rows)
+        self.assertEqual('row', plan.writer)
+        self.assertEqual([('prop_w', NATIVE), ('prop_x', SIMPLE),
+                          ('prop_y', LAZY)],
+                         [(attr, kind) for attr, kind, n, p in plan.steps])
+        self.assertEqual('ChoiceReplacer', plan.steps[1][2])
+        self.assertEqual([], plan.risks)
+        self.assertTrue(plan.estimate > 0)
+        # Nothing is written
+        self.assertEqual(3, FakerTestA.objects.count())
+        self.assertEqual(2, FakerTestA.objects.filter(prop_w='foo').count())
+
+        # Without dependencies nor deletions, with options
+        plans = plan_run([FakerTestAFaker], no_deps=True, no_dels=True,
+                         batch_size=10)
+        self.assertEqual([FakerTestAFaker], [p.faker for p in plans])
+        self.assertEqual(None, plans[0].deletion)
+        self.assertEqual('batch', plans[0].writer)
+
+    def test_plan_faker__pushdown(self):
+        plan = plan_faker(FakerTestAPushdownFaker)
+        self.assertTrue(all(pushed for a, k, n, pushed in plan.steps))
+        plan = plan_faker(FakerTestAPushdownFaker, seed='foo')
+        self.assertFalse(any(pushed for a, k, n, pushed in plan.steps))
+
+    def test_plan_faker__fast_deletion(self):
+        FakerTestOwner.objects.create(closed=True)
+        plan = plan_faker(FakerTestOwnerFaker)
+        self.assertEqual(1, plan.deletion)
+        self.assertIn(FakerTestOwner._meta.db_table, plan.cascades)
+        self.assertEqual(1, FakerTestOwner.objects.count())
+
+    def test_risks(self):
+        class PoolFaker(ModelFaker):
+            FAKER_FOR = FakerTestC
+            prop_u = replacers.ChoiceUniqueReplacer(['a', 'b'])
+
+        class ChoiceFaker(ModelFaker):
+            FAKER_FOR = FakerTestC
+            prop_u = replacers.ChoiceReplacer(['a', 'b', 'c'])
+
+        class EmptyFaker(ModelFaker):
+            FAKER_FOR = FakerTestC
+            prop_u = replacers.ChoiceReplacer([])
+
+        # No value for no row
+        self.assertEqual([], plan_faker(EmptyFaker).risks)
+        for i in range(3):
+            FakerTestC.objects.create(prop_u=str(i))
+        self.assertEqual([], plan_faker(FakerTestCFaker).risks)
+        # The pool is exhausted
+        risks = plan_faker(PoolFaker).risks
+        self.assertEqual([(EXHAUSTED, ['prop_u'])],
+                         [(level, names) for level, names, m in risks])
+        # Values of the last instances would be taken
+        risks = plan_faker(ChoiceFaker).risks
+        self.assertEqual([(AT_RISK, ['prop_u'])],
+                         [(level, names) for level, names, m in risks])
+        FakerTestC.objects.create(prop_u='3')
+        risks = plan_faker(ChoiceFaker).risks
+        self.assertEqual([(EXHAUSTED, ['prop_u'])],
+                         [(level, names) for level, names, m in risks])
+        self.assertIn('! prop_u : exhausted', '\n'.join(format_plan([
+            plan_faker(ChoiceFaker)])))
+
+    def test_costs(self):
+        costs = Costs()
+        self.assertEqual(costs.replacers['PhoneReplacer'][1],
+                         costs.get_replacer_cost(replacers.MobileReplacer()))
+        self.assertEqual(
+            costs.replacers['EmailReplacer(unique)'][0],
+            costs.get_replacer_cost(replacers.EmailReplacer(unique=True),
+                                    seeded=True))
+
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            with open(path, 'w') as results:
+                for engine, rate in (('sqlite', 1000.0), ('postgresql', 1.0)):
+                    results.write(json.dumps({
+                        'mode': 'micro', 'engine': engine, 'results': [{
+                            'replacer': 'PhoneReplacer', 'apply': 2.0,
+                            'apply_many': rate}]}) + '\n')
+                    results.write(json.dumps({
+                        'mode': 'fakers', 'engine': engine, 'results': [{
+                            'scenario': 'native', 'strategy': 'batch',
+                            'rows_per_second': rate}]}) + '\n')
+            costs = Costs.load(path, 'sqlite')
+        finally:
+            os.remove(path)
+        self.assertEqual(1000.0,
+                         costs.get_replacer_cost(replacers.MobileReplacer()))
+        self.assertEqual(1000.0, costs.writes['batch'])
+        self.assertEqual(WRITE_COSTS['row'], costs.writes['row'])
+
+    def test_format_duration(self):
+        self.assertEqual('1.5s', format_duration(1.5))
+        self.assertEqual('2m05s', format_duration(125))
+        self.assertEqual('14h00m10s', format_duration(14 * 3600 + 10))
+
+    def test_command__plan(self):
+        FakerTestC.objects.create(prop_u='foo')
+        stdout = StringIO()
+        call_command('djfaker_fake_db', app='djfaker.tests.testapp',
+                     model='FakerTestCFaker', plan=True, stdout=stdout)
+        output = stdout.getvalue()
+        self.assertIn('Plan : 1 faker(s)', output)
+        self.assertIn('prop_u : simple (SerialReplacer)', output)
+        self.assertIn('Update : 1 of 1 instance(s), batch writes', output)
+        self.assertEqual(['foo'], [c.prop_u for c in FakerTestC.objects.all()])
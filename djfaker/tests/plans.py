@@ -0,0 +1,64 @@
+""" Test compiled replacer plans """
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+from djfaker import replacers, ModelFaker
+from djfaker.plans import Step, NATIVE, SIMPLE, LAZY
+from .testapp.models import FakerTestA
+from .testapp.fakers import FakerTestAFaker
+
+
+class PlanTest(SimpleTestCase):
+    """ Test plans compiled when faker classes are created """
+
+    def test_plan(self):
+        plan = FakerTestAFaker._plan
+        self.assertEqual(['prop_w', 'prop_x', 'prop_y'],
+                         [step.attr for step in plan])
+        self.assertEqual([NATIVE, SIMPLE, LAZY], [step.kind for step in plan])
+        self.assertEqual(Step('prop_w', 'dummyA', NATIVE), plan[0])
+        self.assertIs(FakerTestAFaker.prop_x, plan[1].replacer)
+
+    def test_skipped_attributes(self):
+        class Faker(ModelFaker):
+            FAKER_FOR = FakerTestA
+            BATCH_SIZE = 10
+            prop_w = 'foo'
+
+            def helper(self):
+                pass
+        self.assertEqual(['prop_w'], [step.attr for step in Faker._plan])
+        self.assertEqual((), ModelFaker._plan)
+
+    def test_lazy_order(self):
+        class Faker(ModelFaker):
+            FAKER_FOR = FakerTestA
+            prop_w = replacers.TextReplacer('{0}', ['prop_x'])
+            prop_x = replacers.TextReplacer('{0}', ['prop_y'])
+            prop_y = replacers.TextReplacer('{0}!', ['prop_y'])
+        self.assertEqual(['prop_y', 'prop_x', 'prop_w'],
+                         [step.attr for step in Faker._plan])
+
+    def test_circular_lazy_replacers(self):
+        with self.assertRaises(ImproperlyConfigured) as cm:
+            class Faker(ModelFaker):
+                FAKER_FOR = FakerTestA
+                prop_w = replacers.TextReplacer('{0}', ['prop_x'])
+                prop_x = replacers.TextReplacer('{0}', ['prop_w'])
+        self.assertIn('prop_w -> prop_x -> prop_w', str(cm.exception))
+
+    def test_unknown_field(self):
+        with self.assertRaises(ImproperlyConfigured) as cm:
+            class Faker(ModelFaker):
+                FAKER_FOR = FakerTestA
+                prop_foo = 'foo'
+        self.assertEqual("Faker.prop_foo : FakerTestA has no field 'prop_foo'",
+                         str(cm.exception))
+
+    def test_unknown_token(self):
+        with self.assertRaises(ImproperlyConfigured) as cm:
+            class Faker(ModelFaker):
+                FAKER_FOR = FakerTestA
+                prop_w = replacers.TextReplacer('{0}', ['prop_foo'])
+        self.assertEqual("Faker.prop_w : token 'prop_foo' is not a field of "
+                         "FakerTestA", str(cm.exception))
@@ -0,0 +1,173 @@
+""" Test pools of unique values """
+from django.test import SimpleTestCase
+
+from djfaker import replacers
+from djfaker.exceptions import FakerPoolExhaustedError
+from djfaker.pools import (
+    ListPool, ProductPool, Permutation, KeyedPermutation, PoolCursor,
+    name_pool, number_suffixes)
+from djfaker.rng import Partition, SeededRandom, replacers_rng
+from .replacers import Dummy
+
+
+class PoolsTest(SimpleTestCase):
+    """ Test pools, permutations and cursors """
+
+    def test_product_pool(self):
+        pool = ProductPool([['a', 'b', 'a'], [1, 2, 3]], '{0}{1}')
+        self.assertEqual(6, len(pool))
+        self.assertEqual(['a1', 'a2', 'a3', 'b1', 'b2', 'b3'],
+                         [pool[i] for i in range(len(pool))])
+        self.assertRaises(IndexError, pool.__getitem__, 6)
+        self.assertEqual('a 1', ProductPool([['a'], [1]])[0])
+
+    def test_name_pool(self):
+        pool = name_pool(range(1000))
+        self.assertTrue(len(pool) > 10 ** 6)
+        values = PoolCursor(pool, True).draw(1000)
+        self.assertEqual(1000, len(set(values)))
+
+    def test_permutation(self):
+        self.assertEqual(range(100), sorted(Permutation(100)))
+        permutation = Permutation(10 ** 9)
+        for i in range(100):
+            permutation.next()
+        self.assertTrue(len(permutation.swaps) <= 100)
+        self.assertEqual(list(Permutation(10, SeededRandom(1))),
+                         list(Permutation(10, SeededRandom(1))))
+
+    def test_keyed_permutation(self):
+        for size in (1, 2, 7, 64, 1000):
+            permutation = KeyedPermutation(size, 42)
+            self.assertEqual(range(size),
+                             sorted(permutation[i] for i in range(size)))
+        values = [KeyedPermutation(1000, key)[0] for key in range(20)]
+        self.assertTrue(len(set(values)) > 1)
+        self.assertEqual(KeyedPermutation(10 ** 12, 1)[123],
+                         KeyedPermutation(10 ** 12, 1)[123])
+        self.assertRaises(IndexError, KeyedPermutation(10, 1).__getitem__, 10)
+
+    def test_number_suffixes(self):
+        self.assertEqual(['', '.1', '.2'], number_suffixes(3))
+
+    def test_cursor(self):
+        cursor = PoolCursor(ListPool('abc'))
+        self.assertEqual(['c', 'b'], cursor.draw(2))
+        with self.assertRaises(FakerPoolExhaustedError) as cm:
+            cursor.draw(2)
+        self.assertEqual(
+            "<ListPool: 3 values> : Pool of unique values exhausted : "
+            "2 value(s) requested, 1 left (2/3 drawn)", str(cm.exception))
+        self.assertEqual(['a'], cursor.draw())
+        cursor = PoolCursor(ListPool('abc'), shuffle=True)
+        self.assertEqual(['a', 'b', 'c'], sorted(cursor.draw(3)))
+        cursor = PoolCursor(ListPool('abc'), key=42)
+        self.assertEqual(['a', 'b', 'c'], sorted(cursor.draw(3)))
+
+    def test_cursor__partitions(self):
+        pool = ListPool('abcde')
+        cursors = [PoolCursor(pool, partition=Partition(i, 2, 1))
+                   for i in range(2)]
+        self.assertEqual(['e', 'd'], cursors[0].draw(2))
+        self.assertRaises(FakerPoolExhaustedError, cursors[0].draw)
+        self.assertEqual(['c', 'b', 'a'], cursors[1].draw(3))
+        values = []
+        for i in range(3):
+            values.extend(PoolCursor(pool, key=42, partition=Partition(
+                i, 3, 42)).draw(2 if i else 1))
+        self.assertEqual(list('abcde'), sorted(values))
+        self.assertRaises(ValueError, PoolCursor, pool, True,
+                          partition=Partition(0, 2, 42))
+
+    def test_cursor__partition_sizes(self):
+        """ Test shares of partitions are sized by their number of rows """
+        pool = ListPool(range(10))
+        sizes = [PoolCursor(pool, partition=Partition(i, 3, 42, *bounds)).size
+                 for i, bounds in enumerate([(0, 1, 5), (1, 5, 5), (5, 5, 5)])]
+        self.assertEqual([2, 8, 0], sizes)
+
+    def test_choice_unique_replacer(self):
+        choices = ['a', 'b', 'c']
+        replacer = replacers.ChoiceUniqueReplacer(choices, with_shuffle=True)
+        self.assertEqual(choices, sorted(replacer.apply_many(3)))
+        self.assertRaises(FakerPoolExhaustedError, replacer.apply)
+        self.assertEqual(['a', 'b', 'c'], choices)
+        # Each run has its own cursor
+        replacer.reset()
+        self.assertEqual(choices, sorted(replacer.apply_many(3)))
+        # Values generated on demand
+        replacer = replacers.ChoiceUniqueReplacer(pool=name_pool(range(10)))
+        self.assertEqual(100, len(set(replacer.apply_many(100))))
+
+    def test_choice_unique_replacer__seed(self):
+        replacer = replacers.ChoiceUniqueReplacer(range(100), True)
+        values = []
+        for i in range(2):
+            replacer.reset()
+            with replacers_rng([replacer], SeededRandom(42)):
+                values.append(replacer.apply_many(10))
+        self.assertEqual(values[0], values[1])
+
+    def test_choice_unique_replacer__partitions(self):
+        for with_shuffle in (False, True):
+            replacer = replacers.ChoiceUniqueReplacer(
+                map(str, range(6)), with_shuffle)
+            values = []
+            for index in range(2):
+                replacer.reset(Partition(index, 2, 42))
+                values.extend(replacer.apply_many(3))
+            self.assertEqual(map(str, range(6)), sorted(values))
+
+
+class UniqueReplacersTest(SimpleTestCase):
+    """ Test collision-free email and username replacers """
+
+    def test_email_replacer(self):
+        replacer = replacers.EmailReplacer(unique=True, suffixes=2)
+        values = replacer.apply_many(20000) + [replacer.apply()]
+        self.assertEqual(20001, len(set(values)))
+        replacer.reset()
+        self.assertEqual(100, len(set(replacer.apply_many(100))))
+
+    def test_email_replacer__seed(self):
+        replacer = replacers.EmailReplacer(unique=True)
+        values = []
+        for i in range(2):
+            replacer.reset()
+            with replacers_rng([replacer], SeededRandom(42)):
+                values.append(replacer.apply_many(10))
+        self.assertEqual(values[0], values[1])
+
+    def test_lazy_email_replacer(self):
+        instances = [Dummy(first='John', last='Doe') for i in range(10)]
+        replacer = replacers.LazyEmailReplacer(['first', 'last'], True)
+        values = replacer.apply_many(instances[:9])
+        values.append(replacer.apply(instances[9]))
+        self.assertEqual(10, len(set(values)))
+        for value in values:
+            self.assertTrue(value.startswith('john.doe'), value)
+        self.assertEqual(4, len([v for v in values if '@' in v
+                                 and v.startswith('john.doe@')]))
+
+    def test_lazy_username_replacer(self):
+        instances = [Dummy(first='John', last='Doe') for i in range(3)]
+        replacer = replacers.LazyUsernameReplacer(['first', 'last'], True)
+        self.assertEqual(['john.doe', 'john.doe.1', 'john.doe.2'],
+                         replacer.apply_many(instances))
+        replacer.reset()
+        self.assertEqual('john.doe', replacer.apply(instances[0]))
+
+    def test_unique_replacers__partitions(self):
+        instances = [Dummy(first='Jean', last='Dupont') for i in range(2)]
+        for replacer in (
+                replacers.EmailReplacer(unique=True),
+                replacers.LazyEmailReplacer(['first', 'last'], True),
+                replacers.LazyUsernameReplacer(['first', 'last'], True)):
+            values = []
+            for index in range(3):
+                replacer.reset(Partition(index, 3, 42))
+                if isinstance(replacer, replacers.LazyReplacer):
+                    values.extend(replacer.apply_many(instances))
+                else:
+                    values.extend(replacer.apply_many(2))
+            self.assertEqual(6, len(set(values)), values)
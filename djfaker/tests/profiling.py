@@ -0,0 +1,116 @@
+""" Test profiling of fakers runs """
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.utils.six import StringIO
+
+from djfaker.profiling import FakerProfile, NullProfile, format_summary
+from djfaker.scheduler import get_faker_path, run_fakers
+from djfaker.signals import fake_progress
+
+from .helpers import FakerBaseTest
+from .testapp.fakers import FakerTestCFaker
+from .testapp.models import FakerTestC
+
+
+class ProfilingTest(FakerBaseTest):
+    """ Test FakerProfile and profiled runs """
+
+    def test_profile(self):
+        profile = FakerProfile('a.fakers.AFaker')
+        profile.start()
+        with profile.timer('write'):
+            FakerTestC.objects.count()
+        with profile.replacer_timer('prop_u'):
+            pass
+        profile.stop()
+        self.assertEqual(1, profile.queries)
+        self.assertTrue(profile.total > 0)
+        self.assertIn('write', profile.phases)
+        self.assertIn('prop_u', profile.replacers)
+
+        profile.merge({'rows': 2, 'retries': 1, 'queries': 3,
+                       'peak_memory': 0, 'phases': {'write': 1.0},
+                       'replacers': {'prop_v': 1.0}})
+        data = profile.as_dict()
+        self.assertEqual(2, data['rows'])
+        self.assertEqual(4, data['queries'])
+        self.assertTrue(data['phases']['write'] >= 1.0)
+        self.assertIn('prop_v', data['replacers'])
+
+        # Queries are not counted any more
+        FakerTestC.objects.count()
+        self.assertEqual(4, profile.queries)
+
+    def test_null_profile(self):
+        profile = NullProfile()
+        profile.start()
+        with profile.timer('write'):
+            profile.rows += 1
+        profile.stop()
+        self.assertEqual(0, profile.rows)
+        self.assertEqual(None, profile.as_dict())
+
+    def test_run_fakers__profile(self):
+        for i in range(3):
+            FakerTestC.objects.create(prop_u=str(i))
+        self.assertEqual([], run_fakers([FakerTestCFaker]))
+        FakerTestCFaker._ran = False
+        profiles = run_fakers([FakerTestCFaker], profile=True)
+        self.assertEqual(1, len(profiles))
+        profile = profiles[0]
+        self.assertEqual(get_faker_path(FakerTestCFaker), profile['faker'])
+        self.assertEqual(3, profile['rows'])
+        self.assertEqual(3, profile['written'] + profile['skipped'])
+        self.assertTrue(profile['queries'] > 0)
+        for phase in ('deletion', 'generation', 'unicity', 'write'):
+            self.assertIn(phase, profile['phases'])
+        self.assertEqual(set(['prop_u', 'prop_v']),
+                         set(profile['replacers']))
+
+        lines = format_summary(profiles)
+        self.assertIn('Rows/s', lines[0])
+        self.assertIn('FakerTestCFaker', lines[2])
+        self.assertIn('  FakerTestCFaker.prop_u : ', '\n'.join(lines))
+
+    def test_run_fakers__profile_partitions(self):
+        for i in range(4):
+            FakerTestC.objects.create(prop_u=str(i))
+        profiles = run_fakers([FakerTestCFaker], profile=True, partitions=2)
+        self.assertEqual(4, profiles[0]['rows'])
+        self.assertIn('prop_u', profiles[0]['replacers'])
+
+    def test_progress(self):
+        for i in range(3):
+            FakerTestC.objects.create(prop_u=str(i))
+        reports = []
+
+        def receiver(sender, count, rate, **kwargs):
+            reports.append(count)
+        fake_progress.connect(receiver)
+        try:
+            FakerTestCFaker()._run_update(progress=1e-9)
+        finally:
+            fake_progress.disconnect(receiver)
+        self.assertEqual(3, reports[-1])
+
+    def test_command__profile(self):
+        FakerTestC.objects.create(prop_u='foo')
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        stdout = StringIO()
+        try:
+            call_command('djfaker_fake_db',
+                         app='djfaker.tests.testapp',
+                         model='FakerTestCFaker',
+                         profile=True, profile_json=path,
+                         stdout=stdout)
+            with open(path) as f:
+                profiles = json.load(f)
+        finally:
+            os.remove(path)
+        self.assertEqual(1, profiles[0]['rows'])
+        self.assertIn('FakerTestCFaker', stdout.getvalue())
+        self.assertIn('Replacers :', stdout.getvalue())
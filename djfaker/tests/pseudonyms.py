@@ -0,0 +1,194 @@
+""" Test pseudonyms """
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase, TransactionTestCase
+
+from djfaker import replacers, ModelFaker
+from djfaker.exceptions import FakerUnicityError
+from djfaker.pseudonyms import PseudonymCache, FileStore, DatabaseStore
+from djfaker.rng import SeededRandom
+
+from .helpers import FakerBaseTest
+from .testapp.models import FakerTestA, FakerTestC
+
+
+class Dummy(object):
+    """ A dummy instance for lazy replacers """
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class CounterReplacer(replacers.SimpleReplacer):
+    """ Generates 1, 2, 3... """
+
+    def __init__(self):
+        self.count = 0
+
+    def apply(self):
+        self.count += 1
+        return self.count
+
+
+class PseudonymCacheTest(SimpleTestCase):
+    """ Test pseudonyms cache and file store """
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.store = FileStore(os.path.join(self.tmp, 'pseudonyms.sqlite'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_cache(self):
+        cache = PseudonymCache(size=1)
+        generated = []
+
+        def generate(originals):
+            generated.extend(originals)
+            return [o.upper() for o in originals]
+        self.assertEqual({'a': 'A', 'b': 'B'},
+                         cache.get_many('ns', ['a', 'b'], generate))
+        self.assertEqual({'a': 'A', 'c': 'C'},
+                         cache.get_many('ns', ['a', 'c'], generate))
+        self.assertEqual(['a', 'b', 'c'], generated)
+        # Without a store, values are never forgotten
+        self.assertEqual(3, len(cache.values))
+        cache.get_many('other', ['a'], generate)
+        self.assertEqual(['a', 'b', 'c', 'a'], generated)
+
+    def test_file_store(self):
+        self.assertEqual({}, self.store.get_many('ns', [u'a']))
+        self.assertEqual({u'a': 1, u'b': [2]},
+                         self.store.add_many('ns', {u'a': 1, u'b': [2]}))
+        # Recorded values are kept
+        self.assertEqual({u'a': 1, u'c': 3},
+                         self.store.add_many('ns', {u'a': 4, u'c': 3}))
+        self.assertEqual({u'b': [2]}, self.store.get_many('ns', [u'b', u'd']))
+        self.assertEqual({}, self.store.get_many('other', [u'a']))
+        # Original values are not recorded
+        with open(self.store.path, 'rb') as store:
+            self.assertNotIn('\x00a\x00', store.read())
+        self.store.clear('ns')
+        self.assertEqual({}, self.store.get_many('ns', [u'a']))
+
+    def test_cache_store(self):
+        cache = PseudonymCache(size=2, store=self.store)
+        replacer = replacers.PseudonymReplacer(
+            CounterReplacer(), ['email'], cache=cache)
+        instances = [Dummy(email=e) for e in 'abcab']
+        self.assertEqual([1, 2, 3, 1, 2], replacer.apply_many(instances))
+        self.assertEqual(2, len(cache.values))
+        # Values forgotten by the cache are read from the store, as well as
+        # values generated by other processes
+        other = replacers.PseudonymReplacer(
+            CounterReplacer(), ['email'], cache=PseudonymCache(
+                store=FileStore(self.store.path)))
+        self.assertEqual([3, 1, 2, 1], other.apply_many(instances[2:] + [
+            Dummy(email='d')]))
+
+
+class PseudonymReplacerTest(SimpleTestCase):
+    """ Test PseudonymReplacer """
+
+    def test_apply_many(self):
+        replacer = replacers.PseudonymReplacer(
+            replacers.EmailReplacer(), ['email'], cache=PseudonymCache())
+        instances = [Dummy(email=e) for e in ('a', 'b', 'a', None, 'b')]
+        values = replacer.apply_many(instances)
+        self.assertEqual(values[0], values[2])
+        self.assertEqual(values[1], values[4])
+        self.assertEqual(None, values[3])
+        self.assertEqual(values[1], replacer.apply(Dummy(email='b')))
+        self.assertEqual('EmailReplacer', replacer.namespace)
+        self.assertEqual(replacers.EmailReplacer().get_cardinality(),
+                         replacer.get_cardinality())
+
+    def test_lazy_replacer(self):
+        replacer = replacers.PseudonymReplacer(
+            replacers.LazyUsernameReplacer(['first', 'last']),
+            ['first', 'last'], cache=PseudonymCache())
+        self.assertEqual(['a.b', 'a.c', 'a.b'], replacer.apply_many([
+            Dummy(first='a', last='b'), Dummy(first='a', last='c'),
+            Dummy(first='a', last='b')]))
+
+    def test_seed(self):
+        values = []
+        for i in range(2):
+            replacer = replacers.PseudonymReplacer(
+                replacers.SerialReplacer(), ['serial'],
+                cache=PseudonymCache())
+            replacer.rng = SeededRandom('seed')
+            values.append(replacer.apply_many(
+                [Dummy(serial=s) for s in ('a', 'b', 'c')][i:]))
+        self.assertEqual(values[0][1:], values[1])
+
+
+class DatabaseStoreTest(TransactionTestCase):
+    """ Test pseudonyms recorded in database (DDL commits with SQLite) """
+
+    def test_database_store(self):
+        store = DatabaseStore()
+        self.assertEqual({u'a': 'x'}, store.add_many('ns', {u'a': 'x'}))
+        self.assertEqual({u'a': 'x', u'b': 'y'},
+                         store.add_many('ns', {u'a': 'z', u'b': 'y'}))
+        self.assertEqual({u'b': 'y'}, DatabaseStore().get_many('ns', [u'b']))
+        store.clear()
+        self.assertEqual({}, store.get_many('ns', [u'a', u'b']))
+
+
+class PseudonymFakerTest(FakerBaseTest):
+    """ Test pseudonyms shared by fakers """
+
+    def setUp(self):
+        super(PseudonymFakerTest, self).setUp()
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_fakers(self):
+        cache = PseudonymCache(store=FileStore(
+            os.path.join(self.tmp, 'pseudonyms.sqlite')))
+
+        class AFaker(ModelFaker):
+            FAKER_FOR = FakerTestA
+            prop_w = replacers.PseudonymReplacer(
+                replacers.EmailReplacer(), ['prop_w'], 'email', cache)
+
+        class CFaker(ModelFaker):
+            FAKER_FOR = FakerTestC
+            prop_v = replacers.PseudonymReplacer(
+                replacers.EmailReplacer(), ['prop_v'], 'email', cache)
+
+        for email in ('a', 'b', 'a'):
+            FakerTestA.objects.create(prop_w=email)
+        for i, email in enumerate(('b', 'c')):
+            FakerTestC.objects.create(prop_u=str(i), prop_v=email)
+        AFaker()._run_update(batch_size=2)
+        cache.clear()
+        CFaker()._run_update()
+        a = list(FakerTestA.objects.order_by('pk').values_list(
+            'prop_w', flat=True))
+        c = list(FakerTestC.objects.order_by('pk').values_list(
+            'prop_v', flat=True))
+        self.assertEqual(a[0], a[2])
+        self.assertEqual(a[1], c[0])
+        self.assertNotIn(c[1], a)
+        self.assertTrue(c[1].endswith('.example.com'))
+
+    def test_retries(self):
+        """ Retries pseudonymize original values again, never fake ones """
+        cache = PseudonymCache()
+
+        class CFaker(ModelFaker):
+            FAKER_FOR = FakerTestC
+            prop_u = replacers.PseudonymReplacer(
+                replacers.ChoiceReplacer(['same']), ['prop_u'], 'u', cache)
+
+        for i in range(2):
+            FakerTestC.objects.create(prop_u=str(i))
+        self.assertRaises(FakerUnicityError, CFaker()._run_update)
+        self.assertEqual(set([('u', '0'), ('u', '1')]), set(cache.values))
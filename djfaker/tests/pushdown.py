@@ -0,0 +1,137 @@
+""" Test pushdown """
+import re
+from unittest import skipUnless
+
+from django.db import connection
+
+from djfaker import replacers
+from djfaker.locales import use_locale
+from djfaker.pushdown import format_sql, run_pushdown, get_filtered_fields
+
+from .helpers import FakerBaseTest
+from .testapp.models import FakerTestA, FakerTestC, FakerTestNode
+from .testapp.fakers import FakerTestAPushdownFaker, FakerTestCPushdownFaker, \
+    FakerTestAManyChoicesFaker
+
+
+class PushdownTest(FakerBaseTest):
+    """ Test replacers compiled to SQL """
+
+    def _run(self, replacer, field='prop_x'):
+        field = FakerTestA._meta.get_field(field)
+        sql, params = replacer.as_sql(FakerTestA, connection)
+        run_pushdown(FakerTestA, connection, FakerTestA.objects.all(),
+                     [[(field, sql, params)]])
+        return FakerTestA.objects.values_list(field.name, flat=True)
+
+    def setUp(self):
+        super(PushdownTest, self).setUp()
+        for i in range(10):
+            FakerTestA.objects.create(prop_w=str(i))
+
+    def test_choice_replacer(self):
+        values = self._run(replacers.ChoiceReplacer(choices=['a', 'b']))
+        self.assertTrue(set(values).issubset(set(['a', 'b'])))
+        self.assertEqual(None, replacers.ChoiceReplacer().as_sql(
+            FakerTestA, connection))
+
+    def test_phone_replacer(self):
+        for value in self._run(replacers.PhoneReplacer()):
+            self.assertTrue(re.match(r'^\(\+33\)[1-9]\d{8}$', value), value)
+
+    def test_mobile_replacer__locale(self):
+        with use_locale('de'):
+            values = self._run(replacers.MobileReplacer())
+        for value in values:
+            self.assertTrue(re.match(r'^\(\+49\)1[567][1-9]\d{7,8}$', value),
+                            value)
+
+    def test_serial_replacer(self):
+        values = self._run(replacers.SerialReplacer())
+        self.assertEqual(10, len(set(values)))
+        for value in values:
+            self.assertTrue(re.match(r'^[0-9A-F]{12}$', value), value)
+        values = self._run(replacers.SerialReplacer(20, True))
+        for value in values:
+            self.assertTrue(re.match(r'^\d{20}$', value), value)
+        # Digits are drawn uniformly, not mapped from hexadecimal letters
+        self.assertTrue(set(''.join(values)) & set('6789'))
+
+    def test_text_replacer(self):
+        replacer = replacers.TextReplacer(tpl='{0}-{1}%', tokens=['prop_w',
+                                                                 'prop_y'])
+        self.assertEqual(
+            set(['%d-oxo%%' % i for i in range(10)]), set(self._run(replacer)))
+        # Can not be compiled
+        for tpl, tokens in (('{0:>3}', ['prop_w']), ('{0!r}', ['prop_w']),
+                            ('{1}', ['prop_w']), ('{0}', ['old']),
+                            ('{0.foo}', ['prop_w'])):
+            self.assertEqual(
+                None, format_sql(FakerTestA, connection, tpl, tokens))
+
+    def test__run_update(self):
+        """ Test a faker fully run by the database """
+        FakerTestA.objects.update(prop_w='foo')
+        # Load of primary keys (in a temporary table with PostgreSQL) and
+        # 2 updates : simple replacers first, then lazy ones
+        with self.assertNumStatements(3):
+            self.assertEqual(10, FakerTestAPushdownFaker()._run_update())
+        for inst in FakerTestA.objects.all():
+            self.assertEqual('dummyA', inst.prop_w)
+            self.assertEqual('Jack', inst.prop_x)
+            self.assertEqual('Hello Jack', inst.prop_y)
+
+    def test__run_update__mixed(self):
+        """ Test unique fields are faked in Python, then lazy replacers """
+        for i in range(3):
+            FakerTestC.objects.create(prop_u=str(i))
+        mf = FakerTestCPushdownFaker()
+        self.assertEqual(3, mf._run_update())
+        for inst in FakerTestC.objects.all():
+            self.assertEqual('{0}-{0}'.format(inst.prop_u), inst.prop_v)
+
+    def test__run_update__many_choices(self):
+        """ Test replacers binding too many parameters are run in Python """
+        FakerTestA.objects.update(prop_w='foo')
+        mf = FakerTestAManyChoicesFaker()
+        self.assertEqual(10, mf._run_update(batch_size=100))
+        for inst in FakerTestA.objects.all():
+            self.assertEqual('dummyA', inst.prop_w)
+            self.assertEqual('Hello {0}'.format(inst.prop_x), inst.prop_y)
+            self.assertTrue(0 <= int(inst.prop_x) < 1000)
+
+    def test_get_filtered_fields(self):
+        qs = FakerTestA.objects.filter(prop_w='foo', old=False)
+        self.assertEqual(['prop_w', 'old'],
+                         get_filtered_fields(FakerTestA, connection, qs))
+        self.assertEqual([], get_filtered_fields(
+            FakerTestA, connection, FakerTestA.objects.all()))
+        # Columns of joined tables are not matched, raw conditions are
+        self.assertEqual([], get_filtered_fields(
+            FakerTestNode, connection,
+            FakerTestNode.objects.filter(parent__parent__id=1)))
+        self.assertEqual(['prop_x'], get_filtered_fields(
+            FakerTestA, connection,
+            FakerTestA.objects.extra(where=['prop_x = %s'], params=['a'])))
+
+    @skipUnless(connection.vendor == 'sqlite', 'Primary keys are stored in a '
+                'temporary table by other backends')
+    def test_run_pushdown__chunks(self):
+        """ Test primary keys are read by chunks when several statements are
+            needed, updated columns not changing instances to update
+        """
+        fields = [FakerTestA._meta.get_field(name)
+                  for name in ('prop_x', 'prop_y')]
+        stages = [[(field, '%s', ['baz'])] for field in fields]
+        old, connection.features.max_query_params = getattr(
+            connection.features, 'max_query_params', None), 4
+        try:
+            # 4 chunks of 3 primary keys, updated by 2 statements each
+            with self.assertNumStatements(12):
+                self.assertEqual(10, run_pushdown(
+                    FakerTestA, connection,
+                    FakerTestA.objects.filter(prop_x='bar'), stages))
+        finally:
+            connection.features.max_query_params = old
+        self.assertEqual(10, FakerTestA.objects.filter(
+            prop_x='baz', prop_y='baz').count())
@@ -0,0 +1,118 @@
+""" Test fakers registry """
+import json
+import os
+import shutil
+import tempfile
+import warnings
+
+from django.core.management import call_command
+from django.utils.six import StringIO
+
+from djfaker import ModelFaker
+from djfaker.exceptions import FakerManifestWarning
+from djfaker.registry import registry, discover, read_manifest, \
+    write_manifest, get_app_mtime, get_faker_path
+
+from .helpers import FakerBaseTest
+from .testapp.fakers import FakerTestAFaker, FakerTestBFaker, \
+    FakerTestAChunkedFaker, FakerTestAManyChoicesFaker
+from .testapp.models import FakerTestA
+from .testapp2.fakers import DummyEmptyFaker
+
+APPS = ['djfaker.tests.testapp', 'djfaker.tests.testapp2',
+        'django.contrib.sessions']
+
+
+class RegistryTest(FakerBaseTest):
+    """ Test fakers registry and manifest """
+
+    def setUp(self):
+        super(RegistryTest, self).setUp()
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'manifest.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_registry(self):
+        fakers = registry.get_all()
+        self.assertNotIn(ModelFaker, fakers)
+        # Indirect subclasses are registered too
+        self.assertIn(FakerTestAManyChoicesFaker, fakers)
+        self.assertLess(fakers.index(FakerTestAFaker),
+                        fakers.index(FakerTestAChunkedFaker))
+        self.assertIn(FakerTestAChunkedFaker,
+                      registry.get_label_fakers('testapp'))
+        self.assertNotIn(DummyEmptyFaker,
+                         registry.get_label_fakers('testapp'))
+        self.assertIn(DummyEmptyFaker, registry.get_module_fakers(
+            'djfaker.tests.testapp2'))
+        self.assertEqual([], registry.get_module_fakers('djfaker.tests.test'))
+        model_fakers = registry.get_model_fakers(FakerTestA)
+        self.assertIn(FakerTestAChunkedFaker, model_fakers)
+        self.assertNotIn(FakerTestBFaker, model_fakers)
+        self.assertEqual(FakerTestAFaker,
+                         registry.get(get_faker_path(FakerTestAFaker)))
+
+    def test_dependencies(self):
+        dependencies = registry.get_dependencies(FakerTestAFaker)
+        self.assertEqual((FakerTestBFaker, ), dependencies)
+        # Resolved once
+        self.assertIs(dependencies,
+                      registry.get_dependencies(FakerTestAFaker))
+
+        class LocalFaker(ModelFaker):
+            FAKER_FOR = FakerTestA
+            DEPENDS_ON = [get_faker_path(FakerTestAFaker)]
+
+        self.assertIn(LocalFaker, registry.get_model_fakers(FakerTestA))
+        self.assertEqual((FakerTestAFaker, ),
+                         registry.get_dependencies(LocalFaker))
+        # Registering a faker forgets resolved dependencies
+        self.assertIsNot(dependencies,
+                         registry.get_dependencies(FakerTestAFaker))
+
+    def test_manifest(self):
+        count = sum(len(registry.get_module_fakers(app)) for app in APPS)
+        self.assertEqual(count, write_manifest(self.path, APPS))
+        manifest = read_manifest(self.path)
+        self.assertEqual({
+            'djfaker.tests.testapp': ['djfaker.tests.testapp.fakers'],
+            'djfaker.tests.testapp2': ['djfaker.tests.testapp2.fakers'],
+            'django.contrib.sessions': []}, manifest['modules'])
+        self.assertEqual(['django.contrib.sessions'],
+                         list(manifest['mtimes']))
+        # Apps of the manifest are not imported
+        discover(['djfaker.tests.missing'],
+                 {'modules': {'djfaker.tests.missing': []}})
+        self.assertRaises(ImportError, discover, ['djfaker.tests.missing'],
+                          manifest)
+        self.assertEqual(None, read_manifest(None))
+        self.assertEqual(None, read_manifest(self.path + '.missing'))
+        with open(self.path, 'w') as output:
+            json.dump({'version': 0, 'modules': {}}, output)
+        self.assertEqual(None, read_manifest(self.path))
+
+    def test_command(self):
+        with self.settings(INSTALLED_APPS=APPS):
+            out = StringIO()
+            call_command('djfaker_build_manifest', self.path, stdout=out)
+        self.assertIn('faker(s)', out.getvalue())
+        self.assertEqual(['djfaker.tests.testapp.fakers'], read_manifest(
+            self.path)['modules']['djfaker.tests.testapp'])
+
+    def test_stale_manifest(self):
+        app = 'djfaker.tests.testapp2'
+        manifest = {'modules': {app: []},
+                    'mtimes': {app: get_app_mtime(app)}}
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            discover([app], manifest)
+            self.assertEqual([], caught)
+            # The app gained fakers since the manifest was written
+            manifest['mtimes'][app][1] -= 1
+            discover([app], manifest)
+        self.assertEqual([FakerManifestWarning],
+                         [warning.category for warning in caught])
+        self.assertIn('djfaker.tests.testapp2.fakers',
+                      str(caught[0].message))
@@ -0,0 +1,146 @@
+""" Test replacers """
+import re
+
+from django.contrib.auth.hashers import check_password
+from django.test import SimpleTestCase
+
+from djfaker import replacers
+from djfaker.hashing import PasswordCache
+from djfaker.replacers import pick_many, slugify_many
+
+
+class Dummy(object):
+    """ A dummy instance for lazy replacers """
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class ReplacersApplyManyTest(SimpleTestCase):
+    """ Test apply_many method of builtin replacers """
+
+    def test_pick_many(self):
+        values = pick_many(['a', 'b'], 50)
+        self.assertEqual(50, len(values))
+        self.assertEqual(set(['a', 'b']), set(values))
+
+    def test_slugify_many(self):
+        self.assertEqual(['chloe', 'jean-luc', 'chloe'],
+                         slugify_many([u'Chlo\xe9', 'Jean Luc', u'Chlo\xe9']))
+
+    def test_simple_replacer(self):
+        class CounterReplacer(replacers.SimpleReplacer):
+            count = 0
+
+            def apply(self):
+                self.count += 1
+                return self.count
+        self.assertEqual([1, 2, 3], CounterReplacer().apply_many(3))
+
+    def test_choice_replacer(self):
+        values = replacers.ChoiceReplacer(choices=['a']).apply_many(3)
+        self.assertEqual(['a', 'a', 'a'], values)
+
+    def test_choice_unique_replacer(self):
+        replacer = replacers.ChoiceUniqueReplacer(choices=['a', 'b', 'c'])
+        self.assertEqual(['c', 'b'], replacer.apply_many(2))
+        self.assertRaises(IndexError, replacer.apply_many, 2)
+        self.assertEqual(['a'], replacer.apply_many(1))
+
+    def test_company_replacer(self):
+        for value in replacers.CompanyReplacer().apply_many(10):
+            self.assertEqual(2, len(value.split(' ')))
+
+    def test_email_replacer(self):
+        regexp = re.compile(r'^[a-z-]+\.[a-z-]+@[a-z]+\.example\.com$')
+        for value in replacers.EmailReplacer().apply_many(10):
+            self.assertTrue(regexp.match(value), value)
+        self.assertTrue(regexp.match(replacers.EmailReplacer().apply()))
+
+    def test_phone_replacer(self):
+        regexp = re.compile(r'^\(\+33\)[1-9]\d{8}$')
+        for value in replacers.PhoneReplacer().apply_many(10):
+            self.assertTrue(regexp.match(value), value)
+        for value in replacers.MobileReplacer().apply_many(10):
+            self.assertTrue(regexp.match(value), value)
+
+    def test_serial_replacer(self):
+        values = replacers.SerialReplacer().apply_many(10)
+        self.assertEqual(10, len(set(values)))
+        for value in values:
+            self.assertTrue(re.match(r'^[0-9A-F]{12}$', value), value)
+        for value in replacers.SerialReplacer(20, True).apply_many(10):
+            self.assertTrue(re.match(r'^\d{20}$', value), value)
+
+    def test_lazy_replacer(self):
+        instances = [Dummy(name='Foo Bar'), Dummy(name='Baz')]
+        replacer = replacers.LazyUsernameReplacer(tokens=['name', 'name'])
+        self.assertEqual(['foo-bar.foo-bar', 'baz.baz'],
+                         replacer.apply_many(instances))
+        replacer = replacers.LazyCompanyWebsiteReplacer(tokens=['name'])
+        self.assertEqual(['foo-bar.example.com', 'baz.example.com'],
+                         replacer.apply_many(instances))
+        replacer = replacers.LazyCompanyEmailReplacer(
+            tokens=['name', 'name', 'name'])
+        self.assertEqual(['foo-bar.foo-bar@foo-bar.example.com',
+                          'baz.baz@baz.example.com'],
+                         replacer.apply_many(instances))
+        replacer = replacers.LazyEmailReplacer(tokens=['name', 'name'])
+        for value in replacer.apply_many(instances):
+            self.assertTrue(value.startswith(('foo-bar.foo-bar@', 'baz.baz@')))
+        replacer = replacers.MethodCallbackReplacer(tokens=['keys'])
+        self.assertEqual([['a'], ['b']], replacer.apply_many(
+            [{'a': 1}, {'b': 1}]))
+
+    def test_text_replacer(self):
+        instances = [Dummy(a=1, b=2), Dummy(a=3, b=4)]
+        replacer = replacers.TextReplacer(tpl='{0}-{1}', tokens=['a', 'b'])
+        self.assertEqual(['1-2', '3-4'], replacer.apply_many(instances))
+        replacer = replacers.TextReplacer(tpl='{0}', tokens=['a'])
+        self.assertEqual(['1', '3'], replacer.apply_many(instances))
+        replacer = replacers.TextReplacer(tpl='foo')
+        self.assertEqual(['foo', 'foo'], replacer.apply_many(instances))
+
+
+class PasswordCacheTest(SimpleTestCase):
+    """ Test memoized password hashing """
+
+    def test_memoized(self):
+        cache = PasswordCache(size=2, pool_size=1)
+        value = cache.get('AB', 'md5')
+        self.assertTrue(value.startswith('md5$'))
+        self.assertTrue(check_password('AB', value))
+        self.assertEqual(value, cache.get('AB', 'md5'))
+        self.assertNotEqual(value, cache.get('AB', 'sha1'))
+
+    def test_lru(self):
+        cache = PasswordCache(size=2)
+        cache.get('AB', 'md5')
+        cache.get('CD', 'md5')
+        cache.get('AB', 'md5')
+        cache.get('EF', 'md5')
+        self.assertEqual([('AB', 'md5', None), ('EF', 'md5', None)],
+                         cache.hashes.keys())
+
+    def test_pool(self):
+        cache = PasswordCache(pool_size=3)
+        values = set(cache.get('AB', 'md5') for i in range(50))
+        self.assertEqual(3, len(values))
+        for value in values:
+            self.assertTrue(check_password('AB', value))
+        # Several salts by default
+        cache = PasswordCache()
+        self.assertTrue(len(set(cache.get('AB', 'md5')
+                                for i in range(50))) > 1)
+
+    def test_lazy_password_replacer(self):
+        replacer = replacers.LazyPasswordReplacer(
+            tokens=['first', 'last'], hasher='md5', pool_size=1)
+        values = replacer.apply_many([Dummy(first='john', last='doe'),
+                                      Dummy(first='jane', last='dae')])
+        self.assertEqual(values[0], values[1])
+        self.assertTrue(check_password('JD', values[0]))
+        values = replacer.apply_many([Dummy(first=u'\xc9lise', last='doe'),
+                                      Dummy(first='\xc3\x89mile', last='doe')])
+        self.assertTrue(check_password(u'\xc9D', values[0]))
+        self.assertTrue(check_password(u'\xc9D', values[1]))
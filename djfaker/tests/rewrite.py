@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+""" Test tables rewritten with COPY """
+import datetime
+from io import BytesIO
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import SimpleTestCase
+
+from djfaker.rewrite import CopyStream, CopyWriter, TableRewrite, \
+    decode, encode, parse, can_drop, is_supported
+from djfaker.unicity import UnicityChecker
+
+from .helpers import FakerBaseTest
+from .testapp.fakers import FakerTestAFaker, FakerTestCFaker
+from .testapp.models import FakerTestA, FakerTestC, FakerTestItem, \
+    FakerTestOwner
+
+
+class CopyFormatTest(SimpleTestCase):
+    """ Test COPY text format """
+
+    def test_decode_encode(self):
+        for value in (u'foo', u'', u'a\tb\nc\\d\re', u'été \\N'):
+            self.assertEqual(value, decode(encode(value)))
+        self.assertEqual('\\N', encode(None))
+        self.assertEqual(None, decode('\\N'))
+        self.assertEqual('a\\\\N', encode(u'a\\N'))
+        self.assertEqual('t', encode(True))
+        self.assertEqual('2024-02-29', encode(datetime.date(2024, 2, 29)))
+        self.assertEqual(u'\x08A\x0b', decode('\\b\\101\\x0b'))
+
+    def test_parse(self):
+        fields = dict((f.name, f) for f in FakerTestA._meta.fields)
+        self.assertEqual(False, parse(fields['old'], 'f'))
+        self.assertEqual(3, parse(fields['id'], '3'))
+        self.assertEqual(None, parse(fields['prop_w'], '\\N'))
+        self.assertEqual(2, parse(FakerTestItem._meta.get_field('owner'), '2'))
+
+    def test_stream(self):
+        groups = []
+        stream = CopyStream(groups.append, 2)
+        for data in ('1\ta\n2\t', 'b\n3\tc', '\n'):
+            stream.write(data)
+        stream.flush()
+        self.assertEqual([[[u'1', u'a'], [u'2', u'b']], [[u'3', u'c']]],
+                         groups)
+
+
+class RewriteTest(FakerBaseTest):
+    """ Test rows rewritten by fakers """
+
+    def _get_rewrite(self, faker, deletion_qs=None):
+        model = faker.FAKER_FOR
+        attrs = [step.attr for step in faker._plan]
+        unicity = UnicityChecker(model, [
+            f for f in model._meta.fields if f.name in attrs])
+        writer = CopyWriter(model, attrs, connection, [
+            f.column for f in model._meta.local_fields], unicity)
+
+        def fake(instances):
+            faker()._fake_group(instances, faker._plan, unicity, writer)
+        table = TableRewrite(
+            model, connection, writer, fake, faker()._get_update_qs(),
+            deletion_qs, faker()._get_needed_fields(faker._plan, unicity))
+        table.spool = BytesIO()
+        return table
+
+    def test_rewrite_rows(self):
+        table = self._get_rewrite(FakerTestAFaker)
+        table.rewrite_rows([
+            [u'1', u'foo', u'bar', u'oxo', u'f', u't', u'f'],
+            [u'2', u'x\\ty', u'bar', u'oxo', u'f', u'f', u'f'],
+            [u'3', u'foo', u'bar', u'oxo', u't', u'f', u't'],
+        ])
+        self.assertEqual(
+            u'1\tdummyA\tJack\tHello Jack\tf\n2\tx\\ty\tbar\toxo\tf\n',
+            table.spool.getvalue().decode('utf-8'))
+        self.assertEqual((3, 1, 1), (table.read, table.faked, table.dropped))
+        self.assertEqual(1, table.writer.written)
+
+    def test_rewrite_rows__unicity(self):
+        FakerTestC.objects.create(prop_u='1')
+        table = self._get_rewrite(FakerTestCFaker)
+        table.rewrite_rows([[u'1', u'x', u'foo', u'0', u't', u'f'],
+                            [u'2', u'y', u'foo', u'0', u't', u'f']])
+        rows = [l.split('\t') for l in table.spool.getvalue().splitlines()]
+        self.assertNotEqual(rows[0][1], rows[1][1])
+        self.assertEqual(u'%s-%s' % (rows[1][1], rows[1][1]), rows[1][2])
+
+    def test_can_drop(self):
+        self.assertTrue(can_drop(FakerTestA))
+        self.assertFalse(can_drop(FakerTestOwner))
+        self.assertFalse(can_drop(FakerTestItem))
+        # Only PostgreSQL rewrites tables
+        self.assertEqual(connection.vendor == 'postgresql',
+                         FakerTestAFaker()._is_rewritten(True))
+        self.assertFalse(FakerTestAFaker()._is_rewritten(False))
+
+    @skipUnless(is_supported(connection), 'Tables are rewritten by '
+                'PostgreSQL')
+    def test_run(self):
+        for prop_w, old in (('foo', False), ('keep', False), ('foo', True)):
+            FakerTestA.objects.create(prop_w=prop_w, old=old)
+        for i in range(3):
+            FakerTestC.objects.create(prop_u=str(i))
+        FakerTestAFaker()._run(no_deps=True, rewrite=True)
+        self.assertEqual(
+            [('dummyA', 'Hello Jack'), ('keep', 'oxo')],
+            list(FakerTestA.objects.order_by('pk').values_list(
+                'prop_w', 'prop_y')))
+        self.assertEqual(3, FakerTestCFaker()._run_update(rewrite=True))
+        values = FakerTestC.objects.values_list('prop_u', flat=True)
+        self.assertEqual(3, len(set(values)))
+        # Indexes, constraints and sequences are rebuilt
+        FakerTestC.objects.create(prop_u='new')
+        self.assertRaises(Exception, FakerTestC.objects.create,
+                          prop_u='new')
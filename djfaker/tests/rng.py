@@ -0,0 +1,45 @@
+""" Test seeded random generators """
+from django.test import SimpleTestCase
+
+from djfaker import replacers
+from djfaker.hashing import PasswordCache
+from djfaker.rng import derive_seed, SeededRandom, replacers_rng
+
+
+class RngTest(SimpleTestCase):
+    """ Test reproducible random generators """
+
+    def test_derive_seed(self):
+        self.assertEqual(derive_seed(42, 'a', 1), derive_seed('42', u'a', 1))
+        self.assertNotEqual(derive_seed(42, 'a', 1), derive_seed(42, 'a', 2))
+        self.assertTrue(0 <= derive_seed(u'\xe9') < 2 ** 64)
+
+    def test_seeded_random(self):
+        rng = SeededRandom(42, 'app.Model')
+        rng.reseed(1, 'name')
+        value = rng.random()
+        rng.reseed(2, 'name')
+        self.assertNotEqual(value, rng.random())
+        rng.reseed(1, 'name')
+        self.assertEqual(value, rng.random())
+        other = SeededRandom(42, 'app.Other')
+        other.reseed(1, 'name')
+        self.assertNotEqual(value, other.random())
+
+    def test_replacers_rng(self):
+        replacer = replacers.SerialReplacer()
+        rng = SeededRandom(42)
+        with replacers_rng([replacer, replacer], rng):
+            rng.reseed(1)
+            value = replacer.apply()
+            rng.reseed(1)
+            self.assertEqual([value], replacer.apply_many(1))
+        self.assertEqual(replacers.random, replacer.rng)
+
+    def test_seeded_password_cache(self):
+        value = PasswordCache().get('AB', 'md5', SeededRandom(42))
+        self.assertEqual(
+            value, PasswordCache().get('AB', 'md5', SeededRandom(42)))
+        self.assertNotEqual(value, PasswordCache().get('AB', 'md5'))
+        self.assertNotEqual(
+            value, PasswordCache().get('AB', 'md5', SeededRandom(43)))
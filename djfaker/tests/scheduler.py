@@ -0,0 +1,126 @@
+""" Test scheduler """
+import os
+from unittest import skipIf, skipUnless
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+
+from djfaker.exceptions import FakerDependencyError, FakerWorkerError
+from djfaker.scheduler import (
+    get_faker, get_faker_path, build_graph, sort_graph, run_faker,
+    run_task, run_fakers, WorkerPool, _wait)
+from djfaker.signals import pre_fake_model
+
+from .helpers import FakerBaseTest
+from .testapp.fakers import FakerTestAFaker, FakerTestBFaker, FakerTestCFaker
+from .testapp.models import FakerTestB
+from .testapp2.fakers import DummyCyclicFaker1, DummyCyclicFaker2
+
+
+class SchedulerTest(FakerBaseTest):
+    """ Test scheduler functions """
+
+    def test_get_faker(self):
+        path = 'djfaker.tests.testapp.fakers.FakerTestAFaker'
+        self.assertEqual(FakerTestAFaker, get_faker(path))
+        self.assertEqual(path, get_faker_path(FakerTestAFaker))
+
+    def test_build_graph(self):
+        graph = build_graph([FakerTestAFaker])
+        self.assertEqual({FakerTestAFaker: set([FakerTestBFaker]),
+                          FakerTestBFaker: set()}, graph)
+        # Without dependencies
+        graph = build_graph([FakerTestAFaker], with_deps=False)
+        self.assertEqual({FakerTestAFaker: set()}, graph)
+        graph = build_graph([FakerTestAFaker, FakerTestBFaker], False)
+        self.assertEqual(set([FakerTestBFaker]), graph[FakerTestAFaker])
+
+    def test_sort_graph(self):
+        graph = build_graph([FakerTestAFaker, FakerTestCFaker])
+        self.assertEqual([FakerTestBFaker, FakerTestCFaker, FakerTestAFaker],
+                         sort_graph(graph))
+
+    def test_build_graph__cycle(self):
+        try:
+            build_graph([DummyCyclicFaker1])
+        except FakerDependencyError, e:
+            self.assertEqual([get_faker_path(DummyCyclicFaker1),
+                              get_faker_path(DummyCyclicFaker2),
+                              get_faker_path(DummyCyclicFaker1)], e.cycle)
+        else:
+            self.fail('FakerDependencyError not raised')
+
+    def test_run_faker(self):
+        path = get_faker_path(DummyCyclicFaker1)
+        self.assertRaises(ImproperlyConfigured, run_faker, path)
+        result, error = run_task(run_faker, path)
+        self.assertIn('ImproperlyConfigured', error)
+        path, measures = run_faker(get_faker_path(FakerTestBFaker))
+        self.assertEqual(get_faker_path(FakerTestBFaker), path)
+        self.assertTrue(FakerTestBFaker._ran)
+
+    def test_run_fakers(self):
+        """ Test fakers are run after their dependencies """
+        ran = []
+
+        def _receiver(sender, faked_model, **kwargs):
+            ran.append(faked_model)
+        pre_fake_model.connect(_receiver)
+        try:
+            run_fakers([FakerTestAFaker, FakerTestCFaker])
+        finally:
+            pre_fake_model.disconnect(_receiver)
+        self.assertEqual(
+            [FakerTestBFaker, FakerTestCFaker, FakerTestAFaker], ran)
+        self.assertTrue(FakerTestAFaker._ran)
+
+    def test_run_fakers__no_deps(self):
+        run_fakers([FakerTestAFaker], no_deps=True)
+        self.assertTrue(FakerTestAFaker._ran)
+        self.assertFalse(FakerTestBFaker._ran)
+
+    @skipIf(connection.vendor == 'sqlite', 'SQLite fakers are not run in '
+            'parallel')
+    def test_run_fakers__jobs(self):
+        run_fakers([FakerTestAFaker, FakerTestCFaker], jobs=2)
+        self.assertTrue(FakerTestAFaker._ran)
+        self.assertTrue(FakerTestCFaker._ran)
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite fakers are run one '
+                'after another')
+    def test_run_fakers__jobs_sqlite(self):
+        FakerTestB.objects.create(prop_z='b')
+        run_fakers([FakerTestAFaker], jobs=2)
+        self.assertTrue(FakerTestAFaker._ran)
+        # Instances are faked through the connection of the test
+        self.assertEqual('dummyB', FakerTestB.objects.get().prop_z)
+
+    def test_run_fakers__error(self):
+        # Errors of fakers run by the current process are raised as is
+        self.assertRaises(TypeError, run_fakers, [FakerTestAFaker],
+                          no_deps=True, unknown_option=True)
+
+    def test__wait(self):
+        pool = WorkerPool(1)
+        try:
+            running = {pool.apply_async(run_task, (int, '1')): 'one'}
+            self.assertEqual(1, _wait(pool, running))
+            self.assertEqual({}, running)
+            running = {pool.apply_async(run_task, (int, 'x')): 'x'}
+            with self.assertRaises(FakerWorkerError) as cm:
+                _wait(pool, running)
+            self.assertIn('ValueError', cm.exception.traceback)
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def test__wait__lost_worker(self):
+        pool = WorkerPool(1)
+        try:
+            running = {pool.apply_async(os._exit, (1, )): 'lost'}
+            with self.assertRaises(FakerWorkerError) as cm:
+                _wait(pool, running)
+            self.assertEqual('lost', cm.exception.faker)
+        finally:
+            pool.terminate()
+            pool.join()
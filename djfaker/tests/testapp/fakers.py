@@ -25,6 +25,55 @@ class FakerTestBFaker(ModelFaker):
     prop_z = 'dummyB'
 
 
+class FakerTestCFaker(ModelFaker):
+    """ Faker for FakerTestC model, written by batches """
+    FAKER_FOR = models.FakerTestC
+    BATCH_SIZE = 2
+
+    prop_u = replacers.SerialReplacer()
+    prop_v = replacers.TextReplacer(tpl='{0}-{0}', tokens=['prop_u'])
+
+
+class FakerTestAChunkedFaker(FakerTestAFaker):
+    """ Faker for FakerTestA model, loading only needed fields by chunks """
+    AUTODISCOVER = False
+    CHUNK_SIZE = 2
+    ONLY_NEEDED_FIELDS = True
+
+
+class FakerTestAPushdownFaker(FakerTestAFaker):
+    """ Faker for FakerTestA model, run by the database """
+    AUTODISCOVER = False
+    PUSHDOWN = True
+
+
+class FakerTestAManyChoicesFaker(FakerTestAPushdownFaker):
+    """ Faker for FakerTestA model, with too many choices to run in database
+    """
+    AUTODISCOVER = False
+    prop_x = replacers.ChoiceReplacer(choices=map(str, range(1000)))
+
+
+class FakerTestCPushdownFaker(FakerTestCFaker):
+    """ Faker for FakerTestC model, mixing SQL and Python replacers """
+    AUTODISCOVER = False
+    PUSHDOWN = True
+
+
+class FakerTestCIncrementalFaker(FakerTestCFaker):
+    """ Faker for FakerTestC model, which can fake only changed instances """
+    AUTODISCOVER = False
+    WATERMARK = 'version'
+
+
+class FakerTestOwnerFaker(ModelFaker):
+    """ Faker deleting closed owners with set-based statements """
+    FAKER_FOR = models.FakerTestOwner
+    QS_FOR_DELETION = lambda x: models.FakerTestOwner.objects.filter(
+        closed=True)
+    FAST_DELETION = True
+
+
 class DummyFakerWithoutDeletionQS(ModelFaker):
     """ A dummy faker to test behavior when QS_FOR_DELETION is not provided """
     FAKER_FOR = models.FakerTestA
@@ -55,3 +104,10 @@ class DummyInvalidFaker3(ModelFaker):
     """ A dummy invalid faker because QS_FOR_UPDATE is not a callable """
     FAKER_FOR = models.FakerTestA
     QS_FOR_UPDATE = 'foo'
+
+
+class DummyFakerBrokenUnicity(ModelFaker):
+    """ A dummy faker which can not satisfy unicity constraints """
+    FAKER_FOR = models.FakerTestC
+
+    prop_u = 'constant'
@@ -11,3 +11,41 @@ class FakerTestA(models.Model):
 
 class FakerTestB(models.Model):
     prop_z = models.CharField(max_length=100)
+
+
+class FakerTestC(models.Model):
+    prop_u = models.CharField(max_length=100, unique=True)
+    prop_v = models.CharField(max_length=100, default='foo')
+    version = models.IntegerField(default=0)
+
+
+class FakerTestOwner(models.Model):
+    """ Root of cascades deleted by djfaker.deletion """
+    closed = models.BooleanField(default=False)
+    tags = models.ManyToManyField(FakerTestB)
+
+
+class FakerTestSpecialOwner(FakerTestOwner):
+    level = models.IntegerField(default=0)
+
+
+class FakerTestItem(models.Model):
+    owner = models.ForeignKey(FakerTestOwner)
+
+
+class FakerTestItemNote(models.Model):
+    item = models.ForeignKey(FakerTestItem)
+
+
+class FakerTestWatcher(models.Model):
+    owner = models.ForeignKey(FakerTestOwner, null=True,
+                              on_delete=models.SET_NULL)
+
+
+class FakerTestLock(models.Model):
+    owner = models.ForeignKey(FakerTestOwner, on_delete=models.PROTECT)
+
+
+class FakerTestNode(models.Model):
+    """ Self-referencing model : deletion can not be planned """
+    parent = models.ForeignKey('self', null=True)
@@ -4,3 +4,13 @@ from djfaker import ModelFaker
 
 class DummyEmptyFaker(ModelFaker):
     pass
+
+
+class DummyCyclicFaker1(ModelFaker):
+    """ A dummy faker depending on a faker which depends on it """
+    DEPENDS_ON = ('djfaker.tests.testapp2.fakers.DummyCyclicFaker2', )
+
+
+class DummyCyclicFaker2(ModelFaker):
+    """ A dummy faker depending on a faker which depends on it """
+    DEPENDS_ON = ('djfaker.tests.testapp2.fakers.DummyCyclicFaker1', )
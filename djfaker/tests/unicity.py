@@ -0,0 +1,89 @@
+""" Test unicity engine """
+import threading
+
+from djfaker.unicity import UnicityChecker
+from djfaker.writers import BatchWriter, get_concrete_fields
+
+from .helpers import FakerBaseTest
+from .testapp.models import FakerTestC
+
+
+class UnicityCheckerTest(FakerBaseTest):
+    """ Test UnicityChecker class """
+
+    def setUp(self):
+        super(UnicityCheckerTest, self).setUp()
+        self.inst1 = FakerTestC.objects.create(prop_u='a')
+        self.inst2 = FakerTestC.objects.create(prop_u='b')
+        fields = get_concrete_fields(FakerTestC, ['prop_u', 'prop_v'])
+        self.unicity = UnicityChecker(FakerTestC, fields)
+
+    def test_checks(self):
+        """ Test only constraints on given fields are checked """
+        self.assertEqual([(FakerTestC, ('prop_u', ))], self.unicity.checks)
+        fields = get_concrete_fields(FakerTestC, ['prop_v'])
+        self.assertEqual([], UnicityChecker(FakerTestC, fields).checks)
+
+    def test_check(self):
+        """ Test values are loaded once and checked in memory """
+        with self.assertNumQueries(1):
+            self.inst1.prop_u = 'b'
+            self.assertEqual([('prop_u', )], self.unicity.check(self.inst1))
+            self.inst1.prop_u = 'a'
+            self.assertEqual([], self.unicity.check(self.inst1))
+            self.inst1.prop_u = 'c'
+            self.assertEqual([], self.unicity.check(self.inst1))
+            self.inst1.prop_u = None
+            self.assertEqual([], self.unicity.check(self.inst1))
+
+    def test_reserve(self):
+        """ Test old values are released once instance is written """
+        self.inst1.prop_u = 'c'
+        self.unicity.check(self.inst1)
+        self.unicity.reserve(self.inst1)
+        self.inst2.prop_u = 'c'
+        self.assertEqual([('prop_u', )], self.unicity.check(self.inst2))
+        self.inst2.prop_u = 'a'
+        self.assertEqual([('prop_u', )], self.unicity.check(self.inst2))
+        self.unicity.release([self.inst1])
+        self.assertEqual([], self.unicity.check(self.inst2))
+
+    def test_release__thread(self):
+        """ Test values are released from another thread under the lock """
+        self.inst1.prop_u = 'c'
+        self.unicity.check(self.inst1)
+        self.unicity.reserve(self.inst1)
+        thread = threading.Thread(target=self.unicity.release,
+                                  args=([self.inst1], ))
+        with self.unicity.lock:
+            thread.start()
+            thread.join(0.1)
+            self.assertTrue(thread.is_alive())
+        thread.join()
+        self.inst2.prop_u = 'a'
+        self.assertEqual([], self.unicity.check(self.inst2))
+
+    def test_reservations(self):
+        """ Test new values are reserved in a shared mapping """
+        reservations = {}
+        fields = get_concrete_fields(FakerTestC, ['prop_u'])
+        unicity1 = UnicityChecker(FakerTestC, fields, reservations)
+        unicity2 = UnicityChecker(FakerTestC, fields, reservations)
+        self.inst1.prop_u = 'c'
+        self.assertEqual([], unicity1.check(self.inst1))
+        self.inst2.prop_u = 'c'
+        self.assertEqual([('prop_u', )], unicity2.check(self.inst2))
+        self.assertEqual({(('prop_u', ), (u'c', )): self.inst1.pk},
+                         reservations)
+
+    def test_batch_writer(self):
+        """ Test old values are released when a batch is written """
+        writer = BatchWriter(FakerTestC, ['prop_u'], 10, self.unicity)
+        self.inst1.prop_u = 'c'
+        self.unicity.check(self.inst1)
+        self.unicity.reserve(self.inst1)
+        writer.write(self.inst1)
+        self.inst2.prop_u = 'a'
+        self.assertEqual([('prop_u', )], self.unicity.check(self.inst2))
+        writer.flush()
+        self.assertEqual([], self.unicity.check(self.inst2))
@@ -0,0 +1,158 @@
+""" Test writers """
+from unittest import skipIf
+
+from django.db import transaction
+from django.db.models import signals
+from django.test import TransactionTestCase
+
+from djfaker import replacers, ModelFaker
+from djfaker.profiling import FakerProfile
+from djfaker.writers import RowWriter, BatchWriter, commit_on_success, \
+    get_concrete_fields
+
+from .helpers import FakerBaseTest
+from .testapp.models import FakerTestA, FakerTestC
+
+
+@skipIf(hasattr(transaction, 'atomic'), 'atomic() is used since Django 1.6')
+class CommitOnSuccessTest(TransactionTestCase):
+    """ Test transactions of Django < 1.6 """
+
+    def test_nested(self):
+        with self.assertRaises(ValueError):
+            with commit_on_success():
+                FakerTestA.objects.create()
+                with commit_on_success():
+                    FakerTestA.objects.create()
+                # The inner block did not commit the outer transaction
+                raise ValueError()
+        self.assertEqual(0, FakerTestA.objects.count())
+        with commit_on_success():
+            FakerTestA.objects.create()
+        self.assertEqual(1, FakerTestA.objects.count())
+
+
+class GetConcreteFieldsTest(FakerBaseTest):
+    """ Test get_concrete_fields function """
+
+    def test_get_concrete_fields(self):
+        fields = get_concrete_fields(FakerTestC, ['id', 'prop_v', 'foo'])
+        self.assertEqual(['prop_v'], [f.name for f in fields])
+
+
+class BatchWriterTest(FakerBaseTest):
+    """ Test BatchWriter class """
+
+    def setUp(self):
+        super(BatchWriterTest, self).setUp()
+        self.inst1 = FakerTestC.objects.create(prop_u='a')
+        self.inst2 = FakerTestC.objects.create(prop_u='b')
+        self.inst3 = FakerTestC.objects.create(prop_u='c')
+
+    def test_write(self):
+        """ Test instances are written when batch is full or flushed """
+        writer = BatchWriter(FakerTestC, ['prop_u'], 2)
+        for inst, value in ((self.inst1, 'x'), (self.inst2, 'y'),
+                            (self.inst3, 'z')):
+            inst.prop_u = value
+            inst.prop_v = 'not written'
+            writer.write(inst)
+        qs = FakerTestC.objects.order_by('pk')
+        self.assertEqual([('x', 'foo'), ('y', 'foo'), ('c', 'foo')],
+                         list(qs.values_list('prop_u', 'prop_v')))
+        writer.flush()
+        self.assertEqual([('x', 'foo'), ('y', 'foo'), ('z', 'foo')],
+                         list(qs.values_list('prop_u', 'prop_v')))
+
+    def test_write__chunks(self):
+        """ Test a batch can be split in several UPDATE statements """
+        writer = BatchWriter(FakerTestC, ['prop_u', 'prop_v'], 3)
+        self.assertEqual(
+            [2, 1],
+            [len(c) for c in writer._get_chunks([1, 2, 3], range(249))])
+        for inst in (self.inst1, self.inst2, self.inst3):
+            inst.prop_v = 'bar'
+            writer.write(inst)
+        self.assertEqual(3, FakerTestC.objects.filter(prop_v='bar').count())
+
+    def test_signals(self):
+        """ Test pre_save and post_save signals are sent """
+        received = []
+
+        def _receiver(sender, instance, update_fields, **kwargs):
+            received.append((instance.pk, update_fields))
+        signals.pre_save.connect(_receiver, sender=FakerTestC)
+        signals.post_save.connect(_receiver, sender=FakerTestC)
+        try:
+            writer = BatchWriter(FakerTestC, ['prop_v'], 10)
+            writer.write(self.inst1)
+            self.assertEqual([], received)
+            writer.flush()
+        finally:
+            signals.pre_save.disconnect(_receiver, sender=FakerTestC)
+            signals.post_save.disconnect(_receiver, sender=FakerTestC)
+        fields = frozenset(['prop_v'])
+        self.assertEqual(
+            [(self.inst1.pk, fields), (self.inst1.pk, fields)], received)
+
+    def test_write__unchanged(self):
+        """ Test unchanged instances are skipped """
+        writer = BatchWriter(FakerTestC, ['prop_u'], 2)
+        originals = [writer.get_values(inst)
+                     for inst in (self.inst1, self.inst2, self.inst3)]
+        self.inst2.prop_u = 'y'
+        # The second batch is not written
+        with self.assertNumStatements(1):
+            for inst, original in zip((self.inst1, self.inst2, self.inst3),
+                                      originals):
+                writer.write(inst, original)
+            writer.flush()
+        self.assertEqual((1, 2), (writer.written, writer.skipped))
+        self.assertEqual(self.inst3.pk, writer.last_pk)
+        self.assertEqual(['a', 'y', 'c'], list(FakerTestC.objects.order_by(
+            'pk').values_list('prop_u', flat=True)))
+
+
+class RowWriterTest(FakerBaseTest):
+    """ Test RowWriter class """
+
+    def test_write(self):
+        inst = FakerTestC.objects.create(prop_u='a')
+        inst.prop_u = 'b'
+        inst.prop_v = 'not written'
+        RowWriter(FakerTestC, ['prop_u']).write(inst)
+        self.assertEqual(('b', 'foo'), FakerTestC.objects.values_list(
+            'prop_u', 'prop_v').get(pk=inst.pk))
+
+    def test_write__unchanged(self):
+        inst = FakerTestC.objects.create(prop_u='a')
+        writer = RowWriter(FakerTestC, ['prop_u'])
+        original = writer.get_values(inst)
+        with self.assertNumStatements(0):
+            writer.write(inst, original)
+        inst.prop_u = 'b'
+        with self.assertNumStatements(1):
+            writer.write(inst, original)
+        self.assertEqual((1, 1), (writer.written, writer.skipped))
+        self.assertEqual('b', FakerTestC.objects.get(pk=inst.pk).prop_u)
+
+
+class UnchangedInstancesTest(FakerBaseTest):
+    """ Test instances left unchanged by replacers are not written """
+
+    def test_run_update(self):
+        class Faker(ModelFaker):
+            FAKER_FOR = FakerTestA
+            prop_x = replacers.ChoiceReplacer(['Jack'])
+
+        john = FakerTestA.objects.create(prop_x='John')
+        for i in range(2):
+            FakerTestA.objects.create(prop_x='Jack')
+        for batch_size in (None, 2):
+            faker = Faker()
+            faker._profile = FakerProfile('Faker')
+            self.assertEqual(3, faker._run_update(batch_size=batch_size))
+            self.assertEqual((3, 1, 2), (faker._profile.rows,
+                                         faker._profile.written,
+                                         faker._profile.skipped))
+            FakerTestA.objects.filter(pk=john.pk).update(prop_x='John')
@@ -0,0 +1,155 @@
+""" Unicity engine : checks unique constraints of faked instances in memory """
+import threading
+
+from django.core.exceptions import ValidationError
+from django.db import connections, router
+
+
+class UnicityChecker(object):
+    """ Checks and reserves values of unique constraints involving replaced
+        fields.
+
+        Values already taken are loaded once per run (one query per unique
+        constraint), then generated values are checked and reserved in
+        memory. Each value is associated to the pk of the row owning it :
+        the old value of a faked row is released when the row is written,
+        so the in-memory state always follows the database one.
+
+        Database is only queried for values which can not be compared
+        in memory (not convertible values, unique_for_date constraints).
+
+        When instances are faked by several processes, `reservations` is
+        a mapping shared between them (a multiprocessing.Manager dict) in
+        which new values are atomically reserved. Pipelined runs release
+        values from their writer thread : the in-memory state is guarded
+        by a lock.
+    """
+
+    def __init__(self, model, fields, reservations=None):
+        self.model = model
+        self.reservations = reservations
+        self.using = router.db_for_write(model)
+        self.connection = connections[self.using]
+        names = set(f.name for f in fields)
+        unique_checks, date_checks = model()._get_unique_checks()
+        # (model_class, field names) for each constraint
+        self.checks = [(model_class, check)
+                       for model_class, check in unique_checks
+                       if names.intersection(check)]
+        self.date_checks = [check for check in date_checks
+                            if names.intersection(check[2:])]
+        # check -> {values: pk}, check -> {pk: values}
+        self.taken = {}
+        self.owned = {}
+        # pk -> values released once instance is written
+        self.released = {}
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    def get_field_names(self):
+        """ Returns names of fields read to check unique constraints """
+        names = set()
+        for model_class, check in self.checks:
+            names.update(check)
+        for model_class, lookup_type, field, unique_for in self.date_checks:
+            names.update((field, unique_for))
+        return names
+
+    def _get_key(self, model_class, check, values):
+        """ Returns comparable values, or None if values can not be compared
+            in memory
+        """
+        key = []
+        for name, value in zip(check, values):
+            if value is None:
+                # NULL values never break unicity
+                return ()
+            field = model_class._meta.get_field(name)
+            try:
+                value = field.to_python(value)
+                hash(value)
+            except (ValidationError, ValueError, TypeError):
+                return None
+            if (self.connection.vendor == 'mysql'
+                    and isinstance(value, basestring)):
+                # Default MySQL collations ignore case and trailing spaces
+                value = value.rstrip(' ').lower()
+            key.append(value)
+        return tuple(key)
+
+    def _get_instance_key(self, instance, model_class, check):
+        opts = model_class._meta
+        values = [getattr(instance, opts.get_field(name).attname)
+                  for name in check]
+        return self._get_key(model_class, check, values)
+
+    def load(self):
+        """ Loads values already taken for each unique constraint """
+        for model_class, check in self.checks:
+            taken, owned = {}, {}
+            qs = model_class._default_manager.using(self.using)
+            for row in qs.values_list('pk', *check).iterator():
+                key = self._get_key(model_class, check, row[1:])
+                if key:
+                    taken[key] = row[0]
+                    owned[row[0]] = key
+            self.taken[check] = taken
+            self.owned[check] = owned
+        self.loaded = True
+
+    def check(self, instance):
+        """ Returns unique constraints (tuples of field names) broken
+            by `instance`
+        """
+        if not self.loaded:
+            self.load()
+        broken = []
+        for model_class, check in self.checks:
+            pk = instance._get_pk_val(model_class._meta)
+            key = self._get_instance_key(instance, model_class, check)
+            if key is None:
+                # Ambiguous values : ask database
+                lookup = dict((str(name), getattr(instance, name))
+                              for name in check)
+                qs = model_class._default_manager.using(self.using)
+                if qs.filter(**lookup).exclude(pk=pk).exists():
+                    broken.append(check)
+                continue
+            with self.lock:
+                taken = key and self.taken[check].get(key, pk) != pk
+            if taken:
+                broken.append(check)
+            elif key and self.reservations is not None \
+                    and self.reservations.setdefault((check, key), pk) != pk:
+                # Reserved by another process
+                broken.append(check)
+        if self.date_checks:
+            for name in instance._perform_date_checks(self.date_checks):
+                broken.append((name, ))
+        return broken
+
+    def reserve(self, instance):
+        """ Reserves values of `instance`. Its old values are still reserved
+            until `release` is called
+        """
+        for model_class, check in self.checks:
+            pk = instance._get_pk_val(model_class._meta)
+            key = self._get_instance_key(instance, model_class, check)
+            with self.lock:
+                old_key = self.owned[check].get(pk)
+                if old_key is not None and old_key != key:
+                    self.released.setdefault(instance.pk, []).append(
+                        (check, old_key))
+                if key:
+                    self.taken[check][key] = pk
+                    self.owned[check][pk] = key
+                else:
+                    self.owned[check].pop(pk, None)
+
+    def release(self, instances):
+        """ Releases old values of written `instances` """
+        with self.lock:
+            for instance in instances:
+                for check, key in self.released.pop(instance.pk, []):
+                    if self.taken[check].get(key) == instance.pk:
+                        del self.taken[check][key]
@@ -0,0 +1,218 @@
+""" Writers : persist faked instances in database """
+import re
+from contextlib import contextmanager
+
+from django.db import connections, router, transaction
+from django.db.models import signals
+
+
+@contextmanager
+def commit_on_success(using=None):
+    """ Django < 1.6 compatibility : commit_on_success does not nest (an
+        inner block would commit the transaction of an outer one), so a
+        transaction is only managed if none is already. Nested blocks have
+        no savepoint : an error rolls the whole transaction back
+    """
+    if transaction.is_managed(using=using):
+        yield
+    else:
+        with transaction.commit_on_success(using=using):
+            yield
+
+atomic = getattr(transaction, 'atomic', None) or commit_on_success
+
+# SQLite can not bind more than 999 parameters in a single statement
+SQLITE_MAX_QUERY_PARAMS = 999
+
+# Length, precision or scale of a database type, e.g. varchar(100)
+TYPE_MODIFIER_RE = re.compile(r'\s*\(\s*\d+\s*(?:,\s*\d+\s*)?\)')
+
+
+def get_max_params(connection):
+    """ Returns the number of parameters a statement can bind on
+        `connection`, or None if it is not limited
+    """
+    max_params = getattr(connection.features, 'max_query_params', None)
+    if max_params is None and connection.vendor == 'sqlite':
+        max_params = SQLITE_MAX_QUERY_PARAMS
+    return max_params
+
+
+def get_concrete_fields(model, attrs):
+    """ Returns concrete fields of `model` matching attributes `attrs`
+        (field names or attnames). Primary key is never returned.
+    """
+    return [f for f in model._meta.fields
+            if not f.primary_key and (f.name in attrs or f.attname in attrs)]
+
+
+class RowWriter(object):
+    """ Saves faked instances one by one (one UPDATE per instance), only
+        replaced columns being written. Instances whose replaced values are
+        unchanged are skipped
+    """
+
+    def __init__(self, model, attrs, unicity=None):
+        self.model = model
+        self.fields = get_concrete_fields(model, attrs)
+        # UnicityChecker whose old values are released once written
+        self.unicity = unicity
+        # Primary key of the last written (or skipped) instance
+        self.last_pk = None
+        # Numbers of written and skipped instances
+        self.written = 0
+        self.skipped = 0
+
+    def _written(self, instances):
+        if instances:
+            self.last_pk = instances[-1].pk
+        if self.unicity:
+            self.unicity.release(instances)
+
+    def get_values(self, instance):
+        """ Returns values of written fields of `instance` : given to
+            write() before replacers are applied, they tell whether the
+            instance changed
+        """
+        return tuple(getattr(instance, f.attname) for f in self.fields)
+
+    def set_values(self, instance, values):
+        """ Restores `values` (get_values() result) of `instance`. Cached
+            related objects are dropped : they are loaded again if needed
+        """
+        for field, value in zip(self.fields, values):
+            setattr(instance, field.attname, value)
+            if field.rel:
+                instance.__dict__.pop(field.get_cache_name(), None)
+
+    def is_unchanged(self, instance, original=None):
+        """ Returns True if `original` values (get_values() result) are
+            still the ones of `instance`
+        """
+        return original is not None and self.get_values(instance) == original
+
+    def write(self, instance, original=None):
+        """ Writes a faked (and validated) instance, unless its values are
+            still `original` ones
+        """
+        if self.is_unchanged(instance, original):
+            self.skipped += 1
+        else:
+            instance.save(update_fields=[f.name for f in self.fields])
+            self.written += 1
+        self._written([instance])
+
+    def flush(self):
+        """ Writes instances which could be waiting """
+        pass
+
+
+class BatchWriter(RowWriter):
+    """ Collects faked instances and writes them by chunks of `batch_size`,
+        each chunk in its own transaction, with multi-row UPDATE statements
+        which only touch replaced columns. Unchanged instances are skipped.
+        pre_save and post_save signals are sent for each instance.
+    """
+
+    def __init__(self, model, attrs, batch_size, unicity=None):
+        super(BatchWriter, self).__init__(model, attrs, unicity)
+        self.batch_size = batch_size
+        self.using = router.db_for_write(model)
+        self.instances = []
+        # Instances of the batch which are unchanged (not written)
+        self.unchanged = set()
+
+    def write(self, instance, original=None):
+        self.instances.append(instance)
+        if self.is_unchanged(instance, original):
+            self.unchanged.add(id(instance))
+        if len(self.instances) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.instances:
+            return
+        # Skipped instances are only released with their batch, which keeps
+        # last_pk below instances waiting to be written
+        batch, self.instances = self.instances, []
+        instances = [i for i in batch if id(i) not in self.unchanged]
+        self.skipped += len(batch) - len(instances)
+        self.written += len(instances)
+        self.unchanged = set()
+        if self.fields and instances:
+            update_fields = frozenset(f.name for f in self.fields)
+            with atomic(using=self.using):
+                for instance in instances:
+                    signals.pre_save.send(
+                        sender=self.model, instance=instance,
+                        raw=False, using=self.using,
+                        update_fields=update_fields)
+                for model, fields in self._get_tables():
+                    for chunk in self._get_chunks(instances, fields):
+                        self._update(chunk, model, fields)
+                for instance in instances:
+                    signals.post_save.send(
+                        sender=self.model, instance=instance,
+                        created=False, raw=False, using=self.using,
+                        update_fields=update_fields)
+        self._written(batch)
+
+    def _get_tables(self):
+        """ Returns (model, fields) couples : with multi-table inheritance,
+            written fields can be stored in parent models tables
+        """
+        tables = {}
+        for field in self.fields:
+            tables.setdefault(field.model, []).append(field)
+        return tables.items()
+
+    def _get_chunks(self, instances, fields):
+        """ Splits `instances` to respect database parameters limit """
+        max_params = get_max_params(connections[self.using])
+        size = len(instances)
+        if max_params:
+            # Each instance binds its pk and a value for each field in the
+            # CASE clauses, and its pk in the WHERE clause
+            size = max(1, max_params // (2 * len(fields) + 1))
+        for i in range(0, len(instances), size):
+            yield instances[i:i + size]
+
+    def _update(self, instances, model, fields):
+        """ Writes `fields` of `instances` stored in `model` table
+            with a single UPDATE statement :
+            UPDATE table SET col = CASE pk WHEN ... THEN ... END, ...
+            WHERE pk IN (...)
+        """
+        connection = connections[self.using]
+        qn = connection.ops.quote_name
+        pk = model._meta.pk
+        pk_values = [
+            pk.get_db_prep_value(instance._get_pk_val(model._meta), connection)
+            for instance in instances]
+
+        assignments, params = [], []
+        for field in fields:
+            placeholder = '%s'
+            db_type = field.db_type(connection)
+            if connection.vendor == 'postgresql' and db_type:
+                # Parameters in a CASE clause are not typed by PostgreSQL.
+                # Without modifiers, the assignment checks values (a cast
+                # to varchar(n) would silently truncate them)
+                placeholder = 'CAST(%%s AS %s)' % TYPE_MODIFIER_RE.sub(
+                    '', db_type)
+            whens = []
+            for pk_value, instance in zip(pk_values, instances):
+                whens.append('WHEN %%s THEN %s' % placeholder)
+                params.append(pk_value)
+                params.append(field.get_db_prep_save(
+                    getattr(instance, field.attname), connection=connection))
+            assignments.append('%s = CASE %s %s END' % (
+                qn(field.column), qn(pk.column), ' '.join(whens)))
+
+        sql = 'UPDATE %s SET %s WHERE %s IN (%s)' % (
+            qn(model._meta.db_table),
+            ', '.join(assignments),
+            qn(pk.column),
+            ', '.join(['%s'] * len(pk_values)))
+        params.extend(pk_values)
+        connection.cursor().execute(sql, params)